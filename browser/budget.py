@@ -0,0 +1,174 @@
+"""
+orçamento de tempo por página e por estratégia: prazos checados nos
+laços de clique e aplicados como teto das esperas (wait_until_settled).
+Estouros são registrados por página e no resumo da execução.
+"""
+
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# prazo de cada estratégia, contado a partir do início dela
+# (vai além do prazo da página: Power BI / forms são longos por natureza),
+# mas nunca além do teto da página (PAGE_CEILING_SEC)
+STRATEGY_BUDGET_SEC = {
+    "powerbi": 600,
+    "form_state": 900,
+    "list_links": 15,
+    "accordion": 15,
+    "tables": 20,
+    "document_library": 20,
+    "js_pdf_links": 15,
+    "aggressive": 30,
+}
+
+DEFAULT_STRATEGY_BUDGET_SEC = 30
+
+# teto absoluto da página, contado da abertura: soma de todas as fases
+# (override por seed no browser fallback: "page_ceiling_sec"; lá ainda
+# limitado ao que resta do orçamento de tempo da entidade)
+PAGE_CEILING_SEC = 900
+
+
+_logger = logging.getLogger("SCRAPER_PLANOS")
+
+_budgets = weakref.WeakKeyDictionary()
+_budgets_lock = threading.Lock()
+
+_totals = {"pages": 0, "overruns": Counter()}
+_totals_lock = threading.Lock()
+
+
+class Budget:
+    """
+    Prazo da página + pilha de prazos das estratégias em andamento:
+    `expired()` vale para a fase mais interna (ou para a página).
+    Nenhum prazo passa do teto (`ceiling`) contado da criação.
+    """
+
+    def __init__(self, label: str, seconds: float | None, ceiling: float | None = None):
+        now = time.monotonic()
+        self.label = label
+        # teto 0 = prazo já esgotado (não "sem teto")
+        self._ceiling = now + max(0.0, ceiling) if ceiling is not None else None
+        self._deadline = self._capped(now + seconds) if seconds else self._ceiling
+        self._phases = []
+        self.overruns = []
+
+    def _capped(self, deadline: float) -> float:
+        if self._ceiling is None:
+            return deadline
+        return min(deadline, self._ceiling)
+
+    def _current(self):
+        if self._phases:
+            return self._phases[-1]
+        return "page", self._deadline
+
+    def remaining(self) -> float:
+        _, deadline = self._current()
+        if deadline is None:
+            return float("inf")
+        return max(0.0, deadline - time.monotonic())
+
+    def remaining_ms(self, cap_ms: int) -> int:
+        """
+        `cap_ms` limitado ao que sobra do prazo atual.
+        """
+        return int(min(cap_ms, self.remaining() * 1000))
+
+    def expired(self, where: str = "") -> bool:
+        name, deadline = self._current()
+        if deadline is None or time.monotonic() < deadline:
+            return False
+
+        self._overrun(name, where)
+        return True
+
+    def ceiling_reached(self, where: str = "") -> bool:
+        """
+        Teto da página passou: nenhuma fase nova deveria começar.
+        """
+        if self._ceiling is None or time.monotonic() < self._ceiling:
+            return False
+
+        self._overrun("ceiling", where)
+        return True
+
+    def _overrun(self, name: str, where: str):
+        if name not in self.overruns:
+            self.overruns.append(name)
+            with _totals_lock:
+                _totals["overruns"][name] += 1
+            _logger.warning(
+                f"[BUDGET] Prazo de '{name}' estourado"
+                + (f" ({where})" if where else "")
+                + f": restante ignorado em {self.label}"
+            )
+
+    @contextmanager
+    def phase(self, name: str, seconds: float | None = None):
+        seconds = seconds or STRATEGY_BUDGET_SEC.get(name, DEFAULT_STRATEGY_BUDGET_SEC)
+        self._phases.append((name, self._capped(time.monotonic() + seconds)))
+        try:
+            yield self
+        finally:
+            self._phases.pop()
+
+
+# sem orçamento (páginas fora do browser fallback)
+UNLIMITED = Budget("", None)
+
+
+# =========================================================
+# API DO MÓDULO
+# =========================================================
+def start_page_budget(
+    page,
+    seconds: float,
+    label: str = "",
+    ceiling: float | None = PAGE_CEILING_SEC,
+) -> Budget:
+    budget = Budget(label or page.url, seconds, ceiling)
+    with _budgets_lock:
+        _budgets[page] = budget
+    with _totals_lock:
+        _totals["pages"] += 1
+    return budget
+
+
+def share_budget(page, budget: Budget):
+    """
+    Página auxiliar (partição paralela) herda o prazo de quem a abriu.
+    """
+    if budget is not UNLIMITED:
+        with _budgets_lock:
+            _budgets[page] = budget
+
+
+def page_budget(target) -> Budget:
+    # Frame tem .page; Page não
+    page = getattr(target, "page", None) or target
+    with _budgets_lock:
+        return _budgets.get(page, UNLIMITED)
+
+
+def log_budget_summary(logger):
+    with _totals_lock:
+        pages = _totals["pages"]
+        overruns = dict(_totals["overruns"])
+
+    if not pages:
+        return
+
+    logger.info(
+        f"[BUDGET] {pages} páginas com orçamento, "
+        f"{sum(overruns.values())} estouros {overruns or ''}"
+    )
@@ -0,0 +1,155 @@
+"""
+colheita do DOM em um único page.evaluate: âncoras, atributos data-*,
+onclick, visibilidade e células de tabela num snapshot estruturado.
+As estratégias filtram o snapshot em Python (sem round trip por elemento).
+"""
+
+from dataclasses import dataclass, field
+
+
+# span/div com texto maior que isso são contêineres, não botões
+MAX_CLICKABLE_TEXT = 200
+
+# textos de âncora são cortados aqui (só servem para filtros semânticos)
+MAX_ANCHOR_TEXT = 500
+
+
+HARVEST_JS = """
+([maxClickable, maxAnchor]) => {
+    const els = [];
+    const ids = new Map();
+    const elements = [];
+
+    const isVisible = (el) => {
+        const r = el.getBoundingClientRect();
+        if (!r.width || !r.height) return false;
+        return getComputedStyle(el).visibility !== 'hidden';
+    };
+
+    const textOf = (el) => (el.innerText || '').trim();
+
+    const ref = (el, text) => {
+        if (ids.has(el)) return ids.get(el);
+        const hid = els.length;
+        ids.set(el, hid);
+        els.push(el);
+        elements.push({
+            hid,
+            tag: el.tagName.toLowerCase(),
+            href: el.getAttribute('href'),
+            url: el.tagName === 'A' && el.href ? String(el.href) : null,
+            text,
+            visible: isVisible(el),
+            target: el.getAttribute('target'),
+            onclick: el.getAttribute('onclick'),
+            data_href: el.getAttribute('data-href'),
+            data_url: el.getAttribute('data-url'),
+        });
+        return hid;
+    };
+
+    const anchors = [];
+    for (const a of document.querySelectorAll('a[href]')) {
+        anchors.push(ref(a, textOf(a).slice(0, maxAnchor)));
+    }
+
+    const clickables = [];
+    for (const el of document.querySelectorAll('a, button, span, div')) {
+        if (ids.has(el)) {
+            clickables.push(ids.get(el));
+            continue;
+        }
+        const t = textOf(el);
+        if ((el.tagName === 'SPAN' || el.tagName === 'DIV') && t.length > maxClickable) {
+            continue;
+        }
+        clickables.push(ref(el, t.slice(0, maxAnchor)));
+    }
+
+    const jsElements = [];
+    for (const el of document.querySelectorAll('[onclick], [data-href], [data-url]')) {
+        jsElements.push(ref(el, textOf(el).slice(0, maxAnchor)));
+    }
+
+    const tables = [];
+    for (const t of document.querySelectorAll('table')) {
+        const rows = [];
+        for (const tr of t.querySelectorAll('tr')) {
+            const row = Array.from(tr.querySelectorAll('th, td')).map(c => (c.innerText || '').trim());
+            if (row.length) rows.push(row);
+        }
+        tables.push(rows);
+    }
+
+    // referências vivas para clicar depois sem re-consultar o DOM
+    window.__efpcHarvest = els;
+
+    return {url: location.href, elements, anchors, clickables, jsElements, tables};
+}
+"""
+
+
+@dataclass
+class HarvestedElement:
+    hid: int
+    tag: str
+    href: str | None
+    url: str | None
+    text: str
+    visible: bool
+    target: str | None = None
+    onclick: str | None = None
+    data_href: str | None = None
+    data_url: str | None = None
+
+
+@dataclass
+class DomSnapshot:
+    url: str
+    elements: list = field(default_factory=list)
+
+    # listas abaixo apontam para os mesmos HarvestedElement de `elements`
+    anchors: list = field(default_factory=list)       # a[href]
+    clickables: list = field(default_factory=list)    # a, button, span/div curtos
+    js_elements: list = field(default_factory=list)   # [onclick], [data-href], [data-url]
+    tables: list = field(default_factory=list)        # [[[cell, ...], ...], ...]
+
+
+def snapshot_from_raw(raw: dict) -> DomSnapshot:
+    elements = [HarvestedElement(**e) for e in raw.get("elements", [])]
+
+    return DomSnapshot(
+        url=raw.get("url", ""),
+        elements=elements,
+        anchors=[elements[i] for i in raw.get("anchors", [])],
+        clickables=[elements[i] for i in raw.get("clickables", [])],
+        js_elements=[elements[i] for i in raw.get("jsElements", [])],
+        tables=raw.get("tables", []),
+    )
+
+
+def harvest_dom(page) -> DomSnapshot:
+    raw = page.evaluate(HARVEST_JS, [MAX_CLICKABLE_TEXT, MAX_ANCHOR_TEXT])
+    return snapshot_from_raw(raw)
+
+
+def element_handle(page, el: HarvestedElement):
+    """
+    ElementHandle do elemento colhido (None se o documento mudou).
+    """
+    handle = page.evaluate_handle(
+        "(hid) => (window.__efpcHarvest || [])[hid] || null", el.hid
+    )
+    return handle.as_element()
+
+
+async def harvest_dom_async(page) -> DomSnapshot:
+    raw = await page.evaluate(HARVEST_JS, [MAX_CLICKABLE_TEXT, MAX_ANCHOR_TEXT])
+    return snapshot_from_raw(raw)
+
+
+async def element_handle_async(page, el: HarvestedElement):
+    handle = await page.evaluate_handle(
+        "(hid) => (window.__efpcHarvest || [])[hid] || null", el.hid
+    )
+    return handle.as_element()
@@ -0,0 +1,277 @@
+"""
+interceptação de documentos na camada de rede (context.route):
+cada documento atravessa a rede uma única vez — o corpo buscado pelo
+route.fetch() vai para o blob store e o mesmo response é devolvido
+ao browser (ou o request é abortado)
+"""
+
+import asyncio
+import threading
+from urllib.parse import urlparse
+
+from config import FILE_EXTENSIONS
+from downloader.http_client import record_transfer
+from storage.archive import archive_mode, record_exchange, replay_exchange
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# requests que passam pelo interceptador (o resto segue direto)
+INTERCEPT_RESOURCE_TYPES = {"document", "xhr", "fetch", "other"}
+
+DOCUMENT_CONTENT_TYPES = (
+    "application/pdf",
+    "application/x-pdf",
+    "application/octet-stream",
+    "application/zip",
+    "application/msword",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument",
+)
+
+# corpos menores que isso são stubs / páginas de erro
+MIN_DOCUMENT_BYTES = 5000
+
+FETCH_TIMEOUT_MS = 40000
+
+
+def is_document_response(url: str, content_type: str, disposition: str = "") -> bool:
+    ct = (content_type or "").lower()
+
+    if "text/html" in ct or "json" in ct or "javascript" in ct:
+        return False
+
+    if any(t in ct for t in DOCUMENT_CONTENT_TYPES):
+        # octet-stream genérico só conta com extensão ou attachment
+        if "octet-stream" in ct:
+            return (
+                urlparse(url).path.lower().endswith(FILE_EXTENSIONS)
+                or "attachment" in (disposition or "").lower()
+            )
+        return True
+
+    return False
+
+
+def _source_page_url(request) -> str:
+    """
+    Página que originou o request; popups são atribuídos a quem os abriu.
+    """
+    try:
+        page = request.frame.page
+        opener = page.opener()
+        return (opener or page).url
+    except Exception:
+        return ""
+
+
+async def _source_page_url_async(request) -> str:
+    try:
+        page = request.frame.page
+        opener = await page.opener()
+        return (opener or page).url
+    except Exception:
+        return ""
+
+
+def _intercepts(request) -> bool:
+    return (
+        request.resource_type in INTERCEPT_RESOURCE_TYPES
+        and request.method == "GET"
+        and urlparse(request.url).scheme in ("http", "https")
+    )
+
+
+def _replayed_document(url):
+    """
+    Replay: (headers, corpo) do documento gravado para a URL.
+    None = não é documento gravado (segue para o HAR do contexto).
+    """
+    hit = replay_exchange("GET", url)
+    if hit is None:
+        return None
+
+    status, _reason, headers, body = hit
+    headers = {k.lower(): v for k, v in headers.items()}
+
+    if status != 200 or not is_document_response(
+        url,
+        headers.get("content-type", ""),
+        headers.get("content-disposition", ""),
+    ):
+        return None
+
+    return headers, body
+
+
+def _is_document(url, response) -> bool:
+    headers = response.headers
+    return response.status == 200 and is_document_response(
+        url,
+        headers.get("content-type", ""),
+        headers.get("content-disposition", ""),
+    )
+
+
+# =========================================================
+# INTERCEPTADOR
+# =========================================================
+class DocumentInterceptor:
+    """
+    Instalado por contexto (cobre popups e iframes). `mode`:
+      "fulfill" -> o browser recebe o mesmo response (sem novo download)
+      "abort"   -> o browser não recebe o documento
+    """
+
+    def __init__(self, entidade, state, downloader, logger, mode="fulfill"):
+        self.entidade = entidade
+        self.state = state
+        self.downloader = downloader
+        self.logger = logger
+        self.mode = mode
+
+        self.captured = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def install(self, context):
+        context.route("**/*", self._handle)
+
+    def install_async(self, context):
+        """
+        Versão para o playwright.async_api; devolve a coroutine do route.
+        """
+        return context.route("**/*", self._handle_async)
+
+    def _claim(self, url) -> bool:
+        with self._lock:
+            if url in self._in_flight or url in self.state.visited_files:
+                return False
+            self._in_flight.add(url)
+            return True
+
+    def _handle(self, route):
+        request = route.request
+
+        if not _intercepts(request):
+            route.fallback()
+            return
+
+        url = request.url
+        response = None
+
+        if archive_mode() == "replay":
+            replayed = _replayed_document(url)
+            if replayed is None:
+                route.fallback()
+                return
+            headers, body = replayed
+
+        else:
+            try:
+                # redirects ficam com o browser: o fulfill mantém a URL original
+                response = route.fetch(max_redirects=0, timeout=FETCH_TIMEOUT_MS)
+            except Exception:
+                route.fallback()
+                return
+
+            if not _is_document(url, response):
+                route.fulfill(response=response)
+                return
+
+            body = response.body()
+            headers = response.headers
+            record_transfer(url, "browser_route")
+            record_exchange("GET", url, response.status, headers, body)
+
+        if len(body) >= MIN_DOCUMENT_BYTES and self._claim(url):
+            self._persist(url, body, request.resource_type, _source_page_url(request))
+
+        if self.mode == "abort":
+            route.abort("aborted")
+        elif response is None:
+            route.fulfill(status=200, headers=headers, body=body)
+        else:
+            route.fulfill(response=response, body=body)
+
+    async def _handle_async(self, route):
+        request = route.request
+
+        if not _intercepts(request):
+            await route.fallback()
+            return
+
+        url = request.url
+        response = None
+
+        if archive_mode() == "replay":
+            replayed = await asyncio.to_thread(_replayed_document, url)
+            if replayed is None:
+                await route.fallback()
+                return
+            headers, body = replayed
+
+        else:
+            try:
+                response = await route.fetch(max_redirects=0, timeout=FETCH_TIMEOUT_MS)
+            except Exception:
+                await route.fallback()
+                return
+
+            if not _is_document(url, response):
+                await route.fulfill(response=response)
+                return
+
+            body = await response.body()
+            headers = response.headers
+            record_transfer(url, "browser_route")
+            await asyncio.to_thread(
+                record_exchange, "GET", url, response.status, headers, body
+            )
+
+        if len(body) >= MIN_DOCUMENT_BYTES and self._claim(url):
+            # disco / hash fora do event loop
+            await asyncio.to_thread(
+                self._persist,
+                url,
+                body,
+                request.resource_type,
+                await _source_page_url_async(request),
+            )
+
+        if self.mode == "abort":
+            await route.abort("aborted")
+        elif response is None:
+            await route.fulfill(status=200, headers=headers, body=body)
+        else:
+            await route.fulfill(response=response, body=body)
+
+    def _persist(self, url, body, resource_type, source_page):
+        try:
+            self.logger.info(
+                f"[{self.entidade}] Documento interceptado ({resource_type}): {url}"
+            )
+
+            self.downloader(
+                session=None,
+                url=url,
+                state=self.state,
+                source_page=source_page,
+                anchor_text=f"interceptado:{resource_type}",
+                detected_year=None,
+                entidade=self.entidade,
+                content_override=body,
+            )
+
+            self.state.visited_files.add(url)
+
+            with self._lock:
+                self.captured += 1
+
+        except Exception as e:
+            self.logger.error(f"[{self.entidade}] Erro ao persistir {url}: {e}")
+
+        finally:
+            with self._lock:
+                self._in_flight.discard(url)
@@ -0,0 +1,445 @@
+"""
+pool de browsers: um Chromium por worker, contextos isolados por entidade
+"""
+
+import logging
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from playwright.sync_api import sync_playwright
+
+from browser.budget import page_budget, share_budget
+from browser.settle import install_settle_tracking, wait_until_settled
+
+from storage.archive import install_browser_archive
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+LAUNCH_TIMEOUT_MS = 30000
+
+# recicla o BrowserContext depois de N páginas abertas...
+MAX_PAGES_PER_CONTEXT = 25
+
+# ...ou quando o heap JS somado das páginas passar deste limite
+MAX_CONTEXT_MEMORY_MB = 512
+
+# teto de workers (= processos Chromium) do processo inteiro
+MAX_BROWSER_WORKERS = 6
+
+# workers além dos do browser fallback, livres para páginas de partição
+PARTITION_WORKERS = 2
+
+
+_local = threading.local()
+
+_workers = None
+_workers_lock = threading.Lock()
+
+_logger = logging.getLogger("SCRAPER_PLANOS")
+
+
+# =========================================================
+# CONTEXTO ALUGADO (UM POR ENTIDADE)
+# =========================================================
+class ContextLease:
+    """
+    BrowserContext isolado entregue pelo pool.
+    Use `new_page()` para abrir páginas: é ali que o contexto
+    é reciclado quando passa do limite de páginas ou de memória.
+    """
+
+    def __init__(self, pool, entidade, logger=None, **context_kwargs):
+        self.pool = pool
+        self.entidade = entidade
+        self.logger = logger
+        self.context_kwargs = context_kwargs
+
+        self.context = None
+        self.pages_opened = 0
+        self.recycles = 0
+
+        # reaplicados a cada contexto novo (ex: context.route)
+        self._setup_hooks = []
+
+        self._open()
+
+    def _open(self):
+        browser = self.pool.start()
+        self.context = browser.new_context(**self.context_kwargs)
+        self.pages_opened = 0
+
+        # antes dos hooks: rotas registradas depois têm prioridade
+        install_browser_archive(self.context, self.entidade)
+
+        for hook in self._setup_hooks:
+            hook(self.context)
+
+    def on_context(self, hook):
+        """
+        Registra `hook(context)`: roda agora e depois de cada reciclagem.
+        """
+        self._setup_hooks.append(hook)
+        hook(self.context)
+
+    def memory_mb(self) -> float:
+        """
+        Heap JS usado pelas páginas abertas do contexto (Chromium only).
+        """
+        total = 0
+        for page in self.context.pages:
+            try:
+                total += page.evaluate(
+                    "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+                ) or 0
+            except Exception:
+                continue
+
+        return total / (1024 * 1024)
+
+    def _should_recycle(self) -> bool:
+        if self.pages_opened >= self.pool.max_pages_per_context:
+            return True
+
+        return self.memory_mb() >= self.pool.max_context_memory_mb
+
+    def recycle(self):
+        if self.logger:
+            self.logger.info(
+                f"[{self.entidade}] Reciclando BrowserContext "
+                f"(pages={self.pages_opened})"
+            )
+
+        try:
+            self.context.close()
+        except Exception:
+            pass
+
+        self.recycles += 1
+        self._open()
+
+    def new_page(self):
+        if self._should_recycle():
+            self.recycle()
+
+        page = self.context.new_page()
+        self.pages_opened += 1
+        return page
+
+    def close(self):
+        if self.context is None:
+            return
+
+        try:
+            self.context.close()
+        except Exception:
+            pass
+
+        self.context = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# =========================================================
+# POOL (UM CHROMIUM POR THREAD / WORKER)
+# =========================================================
+class BrowserPool:
+    """
+    Lança o Chromium uma única vez e entrega contextos isolados.
+    Objetos do playwright.sync_api são presos à thread que os criou,
+    por isso existe um pool por thread (ver `get_browser_pool`).
+    """
+
+    def __init__(
+        self,
+        headless=True,
+        max_pages_per_context=MAX_PAGES_PER_CONTEXT,
+        max_context_memory_mb=MAX_CONTEXT_MEMORY_MB,
+    ):
+        self.headless = headless
+        self.max_pages_per_context = max_pages_per_context
+        self.max_context_memory_mb = max_context_memory_mb
+
+        self._playwright = None
+        self._browser = None
+
+    def start(self):
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+
+        self._browser = self._playwright.chromium.launch(
+            headless=self.headless,
+            timeout=LAUNCH_TIMEOUT_MS,
+        )
+        return self._browser
+
+    def lease(self, entidade, logger=None, **context_kwargs) -> ContextLease:
+        return ContextLease(self, entidade, logger=logger, **context_kwargs)
+
+    def close(self):
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+
+def get_browser_pool() -> BrowserPool:
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = BrowserPool()
+        _local.pool = pool
+    return pool
+
+
+def _close_thread_pool():
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        return False
+
+    pool.close()
+    _local.pool = None
+    return True
+
+
+# =========================================================
+# WORKERS (THREADS LONGAS, CADA UMA COM SEU CHROMIUM)
+# =========================================================
+class BrowserWorkers:
+    """
+    Threads de vida longa para rodar trabalho de browser em paralelo.
+    Cada worker usa o próprio `get_browser_pool()` e o fecha na
+    própria thread ao encerrar (exigência do sync_api).
+    """
+
+    def __init__(self, size):
+        self.size = 0
+        self._tasks = queue.Queue()
+        self._threads = []
+        self.grow(size)
+
+    def grow(self, size):
+        """
+        Acrescenta threads até `size` (teto MAX_BROWSER_WORKERS), sem
+        derrubar as que estão rodando.
+        """
+        size = min(size, MAX_BROWSER_WORKERS)
+
+        while self.size < size:
+            t = threading.Thread(
+                target=self._loop,
+                name=f"browser-worker-{self.size}",
+                daemon=True,
+            )
+            self._threads.append(t)
+            self.size += 1
+            t.start()
+
+    def _loop(self):
+        while True:
+            job = self._tasks.get()
+            if job is None:
+                break
+
+            fn, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        _close_thread_pool()
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        self._tasks.put((fn, args, future))
+        return future
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+
+        for t in self._threads:
+            t.join()
+
+
+def get_browser_workers(size) -> BrowserWorkers:
+    """
+    Workers compartilhados pelo processo; cresce se pedirem mais (quem
+    chama pode estar num worker: nada é encerrado aqui).
+    """
+    global _workers
+
+    with _workers_lock:
+        if _workers is None:
+            _workers = BrowserWorkers(size)
+        elif _workers.size < size:
+            _workers.grow(size)
+
+        return _workers
+
+
+def shutdown_browser_pools(logger=None):
+    """
+    Encerra os workers e o Chromium da thread atual (chamado no fim do main).
+    """
+    global _workers
+
+    with _workers_lock:
+        if _workers is not None:
+            _workers.shutdown()
+            _workers = None
+
+    _close_thread_pool()
+
+    if logger:
+        logger.info("Pool de browsers encerrado.")
+
+
+# =========================================================
+# PARTIÇÃO DE TRABALHO ENTRE PÁGINAS DA MESMA URL
+# =========================================================
+PARTITION_PAGE_TIMEOUT_MS = 30000
+PARTITION_LOAD_CAP_MS = 6000
+
+
+def partition(items: list, parallelism: int, min_per_partition: int = 2) -> list[list]:
+    """
+    Round-robin: cada partição recebe itens espalhados pela lista.
+    """
+    n = max(1, min(parallelism, len(items) // max(1, min_per_partition)))
+    return [items[i::n] for i in range(n)]
+
+
+@dataclass
+class PageSetup:
+    """
+    Como a página foi montada (contexto, rotas, logger): páginas de
+    partição abertas a partir dela recebem a mesma montagem.
+    """
+    context_kwargs: dict = field(default_factory=dict)
+    context_hooks: list = field(default_factory=list)    # hook(context)
+    page_hooks: list = field(default_factory=list)       # hook(page)
+    logger: logging.Logger | None = None
+
+
+_page_setups = weakref.WeakKeyDictionary()
+_page_setups_lock = threading.Lock()
+
+
+def set_page_setup(page, setup: PageSetup):
+    with _page_setups_lock:
+        _page_setups[page] = setup
+
+
+def page_setup(page) -> PageSetup:
+    with _page_setups_lock:
+        return _page_setups.get(page) or PageSetup()
+
+
+def _run_on_new_page(url, items, run_items, entidade, prepare_page, budget, setup):
+    """
+    Roda numa thread de BrowserWorkers: contexto próprio com a mesma
+    montagem (rotas, interceptador), mesma URL e o mesmo prazo da página
+    que dividiu o trabalho.
+    """
+    with get_browser_pool().lease(
+        entidade, logger=setup.logger, **setup.context_kwargs
+    ) as lease:
+        for hook in setup.context_hooks:
+            lease.on_context(hook)
+
+        page = lease.new_page()
+        set_page_setup(page, setup)
+        share_budget(page, budget)
+        install_settle_tracking(page)
+        for hook in setup.page_hooks:
+            hook(page)
+        if prepare_page:
+            prepare_page(page)
+
+        page.goto(url, wait_until="domcontentloaded", timeout=PARTITION_PAGE_TIMEOUT_MS)
+        wait_until_settled(page, PARTITION_LOAD_CAP_MS, f"partição {entidade}")
+
+        return run_items(page, items)
+
+
+def run_partitioned(
+    page,
+    items,
+    run_items,
+    parallelism,
+    entidade,
+    prepare_page=None,
+    min_per_partition=2,
+):
+    """
+    `run_items(page, itens) -> resultados`. A primeira partição roda na
+    página atual; as demais em páginas novas carregando a mesma URL, nos
+    workers compartilhados (Chromium de cada worker, teto do processo).
+    Partição que não achou worker livre quando a atual termina é
+    cancelada e roda em série aqui. `prepare_page(page)` roda antes do
+    goto (listeners que precisam ver o load).
+    """
+    parts = partition(items, parallelism, min_per_partition)
+
+    if len(parts) == 1:
+        return run_items(page, items)
+
+    budget = page_budget(page)
+    setup = page_setup(page)
+    logger = setup.logger or _logger
+
+    workers = get_browser_workers(PARTITION_WORKERS)
+
+    futures = [
+        workers.submit(
+            _run_on_new_page,
+            page.url, part, run_items, entidade, prepare_page, budget, setup,
+        )
+        for part in parts[1:]
+    ]
+
+    outputs = list(run_items(page, parts[0]))
+
+    for part, future in zip(parts[1:], futures):
+        # workers ocupados (ex: todos no browser fallback): faz aqui
+        if future.cancel():
+            logger.info(
+                f"[{entidade}] Sem worker livre, partição de {len(part)} itens em série"
+            )
+            outputs.extend(run_items(page, part))
+            continue
+
+        try:
+            outputs.extend(future.result())
+        except Exception as e:
+            # refaz a partição na página atual
+            logger.warning(
+                f"[{entidade}] Partição de {len(part)} itens falhou ({e}), refazendo em série"
+            )
+            outputs.extend(run_items(page, part))
+
+    return outputs
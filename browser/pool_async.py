@@ -0,0 +1,247 @@
+"""
+pool de browser para o engine async (playwright.async_api): um Chromium
+num event loop dedicado, contextos isolados por entidade e várias
+páginas concorrentes no mesmo loop
+"""
+
+import asyncio
+import threading
+
+from playwright.async_api import async_playwright
+
+from storage.archive import install_browser_archive_async
+from browser.pool import (
+    LAUNCH_TIMEOUT_MS,
+    MAX_CONTEXT_MEMORY_MB,
+    MAX_PAGES_PER_CONTEXT,
+)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+# =========================================================
+# CONTEXTO ALUGADO (UM POR ENTIDADE)
+# =========================================================
+class AsyncContextLease:
+    """
+    Equivalente async do ContextLease: mesma regra de reciclagem
+    (páginas abertas / heap JS), hooks reaplicados a cada contexto novo.
+    Use com `async with` (o contexto abre no __aenter__).
+    """
+
+    def __init__(self, pool, entidade, logger=None, **context_kwargs):
+        self.pool = pool
+        self.entidade = entidade
+        self.logger = logger
+        self.context_kwargs = context_kwargs
+
+        self.context = None
+        self.pages_opened = 0
+        self.recycles = 0
+
+        self._setup_hooks = []
+
+    async def _open(self):
+        browser = await self.pool.start()
+        self.context = await browser.new_context(**self.context_kwargs)
+        self.pages_opened = 0
+
+        await install_browser_archive_async(self.context, self.entidade)
+
+        for hook in self._setup_hooks:
+            await hook(self.context)
+
+    async def on_context(self, hook):
+        """
+        Registra `await hook(context)`: roda agora e depois de cada reciclagem.
+        """
+        self._setup_hooks.append(hook)
+        await hook(self.context)
+
+    async def memory_mb(self) -> float:
+        total = 0
+        for page in self.context.pages:
+            try:
+                total += await page.evaluate(
+                    "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+                ) or 0
+            except Exception:
+                continue
+
+        return total / (1024 * 1024)
+
+    async def _should_recycle(self) -> bool:
+        if self.pages_opened >= self.pool.max_pages_per_context:
+            return True
+
+        return await self.memory_mb() >= self.pool.max_context_memory_mb
+
+    async def recycle(self):
+        if self.logger:
+            self.logger.info(
+                f"[{self.entidade}] Reciclando BrowserContext "
+                f"(pages={self.pages_opened})"
+            )
+
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+
+        self.recycles += 1
+        await self._open()
+
+    async def new_page(self):
+        if await self._should_recycle():
+            await self.recycle()
+
+        page = await self.context.new_page()
+        self.pages_opened += 1
+        return page
+
+    async def close(self):
+        if self.context is None:
+            return
+
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+
+        self.context = None
+
+    async def __aenter__(self):
+        await self._open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+
+# =========================================================
+# POOL (UM CHROMIUM NO LOOP DO ENGINE)
+# =========================================================
+class AsyncBrowserPool:
+    def __init__(
+        self,
+        headless=True,
+        max_pages_per_context=MAX_PAGES_PER_CONTEXT,
+        max_context_memory_mb=MAX_CONTEXT_MEMORY_MB,
+    ):
+        self.headless = headless
+        self.max_pages_per_context = max_pages_per_context
+        self.max_context_memory_mb = max_context_memory_mb
+
+        self._playwright = None
+        self._browser = None
+
+        # workers concorrentes pedem o browser ao mesmo tempo
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._start_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            self._browser = await self._playwright.chromium.launch(
+                headless=self.headless,
+                timeout=LAUNCH_TIMEOUT_MS,
+            )
+            return self._browser
+
+    def lease(self, entidade, logger=None, **context_kwargs) -> AsyncContextLease:
+        return AsyncContextLease(self, entidade, logger=logger, **context_kwargs)
+
+    async def close(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+
+# =========================================================
+# ENGINE (EVENT LOOP PRÓPRIO, NUMA THREAD PRÓPRIA)
+# =========================================================
+class AsyncBrowserEngine:
+    """
+    Event loop de vida longa numa thread dedicada: o Chromium async
+    sobrevive entre entidades e não divide thread com o sync_api.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.pool = None
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="browser-async-engine",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro):
+        """
+        Roda `coro` no loop do engine e bloqueia até o resultado.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get_pool(self) -> AsyncBrowserPool:
+        # só é chamado de dentro do loop do engine
+        if self.pool is None:
+            self.pool = AsyncBrowserPool()
+        return self.pool
+
+    def shutdown(self):
+        if self.pool is not None:
+            try:
+                self.run(self.pool.close())
+            except Exception:
+                pass
+            self.pool = None
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def get_async_engine() -> AsyncBrowserEngine:
+    global _engine
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncBrowserEngine()
+        return _engine
+
+
+def shutdown_async_engine(logger=None):
+    global _engine
+
+    with _engine_lock:
+        engine, _engine = _engine, None
+
+    if engine is None:
+        return
+
+    engine.shutdown()
+
+    if logger:
+        logger.info("Engine async de browser encerrado.")
@@ -0,0 +1,228 @@
+"""
+perfil de bloqueio de recursos (page.route) para os crawls via browser:
+o fallback só precisa de DOM, XHR e documentos
+"""
+
+import base64
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from discovery.domain_guard import BLOCKED_DOMAINS
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "texttrack"}
+
+# analytics, tag managers e widgets de chat comuns nos sites institucionais
+TRACKER_DOMAINS = {
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "newrelic.com",
+    "nr-data.net",
+    "hubspot.com",
+    "hs-scripts.com",
+    "hs-analytics.net",
+    "rdstation.com.br",
+    "tawk.to",
+    "jivosite.com",
+    "zopim.com",
+    "zdassets.com",
+    "intercom.io",
+    "crisp.chat",
+    "onesignal.com",
+    "smartsupp.com",
+    "leadster.com.br",
+}
+
+# hosts que nunca são bloqueados (iframes/recursos do Power BI)
+POWERBI_DOMAINS = {
+    "powerbi.com",
+    "analysis.windows.net",
+    "pbidedicated.windows.net",
+}
+
+# o que foi bloqueado não foi baixado, então o tamanho é estimado
+ESTIMATED_BYTES = {
+    "image": 60_000,
+    "font": 40_000,
+    "media": 500_000,
+    "texttrack": 5_000,
+    "script": 80_000,
+    "stylesheet": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "document": 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+# imagens viram um GIF 1x1: o elemento continua com caixa (is_visible ok)
+_BLANK_GIF = base64.b64decode(
+    "R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
+)
+
+
+def _host_matches(host: str, domains) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+# =========================================================
+# PERFIL
+# =========================================================
+@dataclass
+class BlockingProfile:
+    enabled: bool = True
+    resource_types: set = field(default_factory=lambda: set(BLOCKED_RESOURCE_TYPES))
+    blocked_domains: set = field(
+        default_factory=lambda: set(BLOCKED_DOMAINS) | set(TRACKER_DOMAINS)
+    )
+    allowed_domains: set = field(default_factory=lambda: set(POWERBI_DOMAINS))
+
+    def block_reason(self, request) -> str | None:
+        """
+        Motivo do bloqueio ou None quando o request deve seguir.
+        """
+        if not self.enabled:
+            return None
+
+        # navegação do frame principal nunca é bloqueada
+        try:
+            if request.is_navigation_request() and request.frame.parent_frame is None:
+                return None
+        except Exception:
+            pass
+
+        host = urlparse(request.url).hostname or ""
+
+        if _host_matches(host, self.allowed_domains):
+            return None
+
+        # recursos pedidos de dentro de um iframe liberado (ex: Power BI)
+        try:
+            frame_host = urlparse(request.frame.url).hostname or ""
+            if _host_matches(frame_host, self.allowed_domains):
+                return None
+        except Exception:
+            pass
+
+        if _host_matches(host, self.blocked_domains):
+            return "domain"
+
+        if request.resource_type in self.resource_types:
+            return "resource_type"
+
+        return None
+
+
+def profile_for_seed(seed_cfg: dict) -> BlockingProfile:
+    """
+    Monta o perfil da seed. Override opcional em seed_cfg["blocking"]:
+      False                           -> desliga o bloqueio
+      {"enabled": bool,
+       "resource_types": [...],       -> substitui os tipos bloqueados
+       "blocked_domains": [...],      -> soma aos domínios bloqueados
+       "allowed_domains": [...]}      -> soma aos domínios liberados
+    """
+    cfg = seed_cfg.get("blocking", {})
+
+    if cfg is False:
+        return BlockingProfile(enabled=False)
+
+    profile = BlockingProfile()
+
+    # Power BI renderiza visuais com fontes/imagens (e screenshots dependem disso)
+    if seed_cfg.get("mode") == "powerbi":
+        profile.resource_types = set()
+
+    if not isinstance(cfg, dict):
+        return profile
+
+    profile.enabled = cfg.get("enabled", True)
+
+    if "resource_types" in cfg:
+        profile.resource_types = set(cfg["resource_types"])
+
+    profile.blocked_domains |= set(cfg.get("blocked_domains", []))
+    profile.allowed_domains |= set(cfg.get("allowed_domains", []))
+
+    return profile
+
+
+# =========================================================
+# INSTALAÇÃO NA PÁGINA
+# =========================================================
+@dataclass
+class RouteStats:
+    requests_blocked: int = 0
+    bytes_avoided_estimate: int = 0
+    by_reason: dict = field(default_factory=dict)
+    by_type: dict = field(default_factory=dict)
+
+    def record(self, reason: str, resource_type: str):
+        self.requests_blocked += 1
+        self.bytes_avoided_estimate += ESTIMATED_BYTES.get(
+            resource_type, DEFAULT_ESTIMATED_BYTES
+        )
+        self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+        self.by_type[resource_type] = self.by_type.get(resource_type, 0) + 1
+
+
+def install_blocking(page, profile: BlockingProfile) -> RouteStats:
+    """
+    Registra o page.route do perfil e devolve os contadores da página.
+    Requests liberados seguem com route.fallback(), então outros
+    handlers (página ou contexto) continuam recebendo o request.
+    """
+    stats = RouteStats()
+
+    if not profile.enabled:
+        return stats
+
+    def handle_route(route):
+        reason = _record_block(profile, stats, route.request)
+
+        if reason is None:
+            route.fallback()
+        elif route.request.resource_type == "image":
+            route.fulfill(status=200, content_type="image/gif", body=_BLANK_GIF)
+        else:
+            route.abort("blockedbyclient")
+
+    page.route("**/*", handle_route)
+    return stats
+
+
+async def install_blocking_async(page, profile: BlockingProfile) -> RouteStats:
+    """
+    `install_blocking` para o playwright.async_api (handler é coroutine).
+    """
+    stats = RouteStats()
+
+    if not profile.enabled:
+        return stats
+
+    async def handle_route(route):
+        reason = _record_block(profile, stats, route.request)
+
+        if reason is None:
+            await route.fallback()
+        elif route.request.resource_type == "image":
+            await route.fulfill(status=200, content_type="image/gif", body=_BLANK_GIF)
+        else:
+            await route.abort("blockedbyclient")
+
+    await page.route("**/*", handle_route)
+    return stats
+
+
+def _record_block(profile: BlockingProfile, stats: RouteStats, request):
+    reason = profile.block_reason(request)
+    if reason is not None:
+        stats.record(reason, request.resource_type)
+    return reason
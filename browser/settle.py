@@ -0,0 +1,229 @@
+"""
+espera "até assentar": MutationObserver (DOM quieto) + requests em voo + teto
+duro, no lugar dos wait_for_timeout / time.sleep fixos
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+from browser.budget import page_budget
+
+# =========================================================
+# CONFIG
+# =========================================================
+# DOM sem mutações por este tempo = assentado
+QUIET_MS = 300
+
+# intervalo entre checagens (wait_for_timeout também despacha os eventos)
+POLL_MS = 50
+
+# requests abertos há mais tempo que isso não seguram a espera
+# (long polling, analytics, telemetria do Power BI...)
+INFLIGHT_STALE_MS = 2500
+
+# tipos que nunca "terminam"
+IGNORED_RESOURCE_TYPES = {"websocket", "eventsource"}
+
+
+# instala (uma vez por documento) o observer e devolve há quantos ms o DOM
+# não muda; `token` muda a cada documento novo, `version` a cada mutação
+DOM_OBSERVER_JS = """
+() => {
+    if (!window.__efpcDom) {
+        const st = {
+            token: Math.random().toString(36).slice(2),
+            version: 0,
+            last: performance.now(),
+        };
+        new MutationObserver(() => {
+            st.version++;
+            st.last = performance.now();
+        }).observe(document, {
+            subtree: true,
+            childList: true,
+            attributes: true,
+            characterData: true,
+        });
+        window.__efpcDom = st;
+    }
+    return performance.now() - window.__efpcDom.last;
+}
+"""
+
+
+_logger = logging.getLogger("SCRAPER_PLANOS")
+
+_trackers = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+_totals = {"calls": 0, "waited_ms": 0, "cap_ms": 0}
+_totals_lock = threading.Lock()
+
+
+# =========================================================
+# REQUESTS EM VOO
+# =========================================================
+class _NetworkTracker:
+    def __init__(self, page):
+        self._started = {}
+
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _on_request(self, request):
+        if request.resource_type in IGNORED_RESOURCE_TYPES:
+            return
+        self._started[request] = time.monotonic()
+
+    def _on_done(self, request):
+        self._started.pop(request, None)
+
+    def inflight(self) -> int:
+        now = time.monotonic()
+        return sum(
+            1
+            for started in list(self._started.values())
+            if (now - started) * 1000 < INFLIGHT_STALE_MS
+        )
+
+
+def install_settle_tracking(page):
+    """
+    Começa a contar requests da página. Chame logo após new_page()
+    para não perder os requests da navegação inicial.
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(page)
+        if tracker is None:
+            tracker = _NetworkTracker(page)
+            _trackers[page] = tracker
+        return tracker
+
+
+def _page_of(target):
+    # Frame tem .page; Page não
+    return getattr(target, "page", None) or target
+
+
+# =========================================================
+# ESPERA
+# =========================================================
+def wait_until_settled(
+    target,
+    cap_ms: int,
+    label: str = "",
+    quiet_ms: int = QUIET_MS,
+    logger=None,
+) -> int:
+    """
+    Espera até o DOM ficar `quiet_ms` sem mutações e sem requests em voo,
+    ou até `cap_ms`. `target` pode ser Page ou Frame (ex: iframe Power BI).
+    Retorna os ms efetivamente esperados.
+    """
+    page = _page_of(target)
+    tracker = install_settle_tracking(page)
+
+    # nunca espera além do prazo da página / estratégia atual
+    cap_ms = page_budget(page).remaining_ms(cap_ms)
+
+    start = time.monotonic()
+    settled = False
+
+    while True:
+        try:
+            dom_quiet_ms = target.evaluate(DOM_OBSERVER_JS)
+        except Exception:
+            # documento trocando / frame destacado: conta como mutação
+            dom_quiet_ms = 0
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+
+        if dom_quiet_ms >= quiet_ms and tracker.inflight() == 0:
+            settled = True
+            break
+
+        if elapsed_ms >= cap_ms:
+            break
+
+        try:
+            page.wait_for_timeout(min(POLL_MS, max(1, cap_ms - elapsed_ms)))
+        except Exception:
+            break
+
+    return _record_wait(start, cap_ms, settled, label, logger)
+
+
+async def wait_until_settled_async(
+    target,
+    cap_ms: int,
+    label: str = "",
+    quiet_ms: int = QUIET_MS,
+    logger=None,
+) -> int:
+    """
+    Mesma espera de `wait_until_settled` para o playwright.async_api:
+    o poll cede o event loop, então outras páginas seguem rodando.
+    """
+    page = _page_of(target)
+    tracker = install_settle_tracking(page)
+
+    # nunca espera além do prazo da página / estratégia atual
+    cap_ms = page_budget(page).remaining_ms(cap_ms)
+
+    start = time.monotonic()
+    settled = False
+
+    while True:
+        try:
+            dom_quiet_ms = await target.evaluate(DOM_OBSERVER_JS)
+        except Exception:
+            dom_quiet_ms = 0
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+
+        if dom_quiet_ms >= quiet_ms and tracker.inflight() == 0:
+            settled = True
+            break
+
+        if elapsed_ms >= cap_ms:
+            break
+
+        await asyncio.sleep(min(POLL_MS, max(1, cap_ms - elapsed_ms)) / 1000)
+
+    return _record_wait(start, cap_ms, settled, label, logger)
+
+
+def _record_wait(start, cap_ms, settled, label, logger) -> int:
+    waited_ms = int((time.monotonic() - start) * 1000)
+
+    with _totals_lock:
+        _totals["calls"] += 1
+        _totals["waited_ms"] += waited_ms
+        _totals["cap_ms"] += cap_ms
+
+    (logger or _logger).info(
+        f"[SETTLE] {label or 'wait'}: {waited_ms}ms "
+        f"({'assentou' if settled else 'teto'}, cap={cap_ms}ms, "
+        f"economia={max(0, cap_ms - waited_ms)}ms)"
+    )
+
+    return waited_ms
+
+
+def log_settle_summary(logger):
+    with _totals_lock:
+        calls = _totals["calls"]
+        waited = _totals["waited_ms"]
+        cap = _totals["cap_ms"]
+
+    if not calls:
+        return
+
+    logger.info(
+        f"[SETTLE] {calls} esperas | esperado={waited / 1000:.1f}s "
+        f"| teto somado={cap / 1000:.1f}s | economia={(cap - waited) / 1000:.1f}s"
+    )
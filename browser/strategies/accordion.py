@@ -1,13 +1,20 @@
 # browser/strategies/accordion.py
 
+ACCORDION_JS = """
+() => {
+    document.querySelectorAll('button, a, div, span').forEach(el => {
+        const t = (el.innerText || '').trim();
+        if (/^20\\d{2}$/.test(t) || t.includes('ver') || t.includes('mais')) {
+            try { el.click(); } catch(e) {}
+        }
+    });
+}
+"""
+
+
 def run_accordion_strategy(page):
-    page.evaluate("""
-    () => {
-        document.querySelectorAll('button, a, div, span').forEach(el => {
-            const t = (el.innerText || '').trim();
-            if (/^20\\d{2}$/.test(t) || t.includes('ver') || t.includes('mais')) {
-                try { el.click(); } catch(e) {}
-            }
-        });
-    }
-    """)
+    page.evaluate(ACCORDION_JS)
+
+
+async def run_accordion_strategy_async(page):
+    await page.evaluate(ACCORDION_JS)
@@ -1,3 +1,8 @@
+from browser.budget import page_budget
+from browser.harvest import element_handle, harvest_dom
+from browser.settle import wait_until_settled
+
+
 def aggressive_click_downloads(page, logger):
     """
     Último recurso.
@@ -6,23 +11,38 @@ def aggressive_click_downloads(page, logger):
 
     logger.warning("[AGGRESSIVE] Ativando modo agressivo")
 
+    budget = page_budget(page)
+
     try:
-        buttons = page.locator("a, button, span, div").all()
-
-        for el in buttons:
-            try:
-                text = (el.inner_text() or "").lower()
-                href = el.get_attribute("href") or ""
-
-                if (
-                    "pdf" in text
-                    or "download" in text
-                    or "baixar" in text
-                    or href.lower().endswith(".pdf")
-                ):
-                    el.click(timeout=1000)
-                    page.wait_for_timeout(600)
-            except Exception:
-                pass
+        with budget.phase("aggressive"):
+            _click_all(page, harvest_dom(page), budget, logger)
     except Exception:
         pass
+
+
+def _click_all(page, snapshot, budget, logger):
+    for el in snapshot.clickables:
+        if budget.expired("cliques agressivos"):
+            return
+
+        try:
+            text = (el.text or "").lower()
+            href = el.href or ""
+
+            if not el.visible:
+                continue
+
+            if (
+                "pdf" in text
+                or "download" in text
+                or "baixar" in text
+                or href.lower().endswith(".pdf")
+            ):
+                handle = element_handle(page, el)
+                if handle is None:
+                    continue
+
+                handle.click(timeout=1000)
+                wait_until_settled(page, 600, "aggressive click", logger=logger)
+        except Exception:
+            pass
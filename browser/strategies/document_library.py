@@ -1,5 +1,7 @@
 from urllib.parse import urljoin
 
+from browser.harvest import harvest_dom
+
 
 FILE_EXTS = (".pdf", ".xls", ".xlsx", ".doc", ".docx", ".zip")
 
@@ -29,22 +31,17 @@ def is_investment_related(url: str, text: str) -> bool:
 
     return any(term in u or term in t for term in REQUIRED_TERMS)
 
-def extract_document_library(page):
+def document_library_from_snapshot(snapshot):
     outputs = []
 
-    links = page.locator("a[href]").all()
-
-    for a in links:
-        try:
-            href = a.get_attribute("href")
-            text = (a.inner_text() or "").lower()
-        except Exception:
-            continue
+    for a in snapshot.anchors:
+        href = a.href
+        text = (a.text or "").lower()
 
         if not href:
             continue
 
-        url = urljoin(page.url, href)
+        url = urljoin(snapshot.url, href)
 
         if not url.lower().endswith(FILE_EXTS):
             continue
@@ -67,3 +64,8 @@ def extract_document_library(page):
         })
 
     return outputs
+
+
+def extract_document_library(page, snapshot=None):
+    snapshot = snapshot or harvest_dom(page)
+    return document_library_from_snapshot(snapshot)
@@ -1,9 +1,24 @@
 # browser/strategies/form_state_machine.py
-
+#
+# Explorador combinatório de formulários (plano × período × ...):
+# cada combinação dos selects é aplicada, o botão "gerar" acionado e os
+# PDFs do resultado coletados. As combinações são divididas entre páginas
+# paralelas (browser.pool.run_partitioned) e resultados repetidos
+# (mesmo conjunto de links) são reconhecidos pelo hash e ignorados.
+
+import hashlib
+import itertools
+import math
 import re
-import time
+import threading
+
 from playwright.sync_api import Page
 
+from browser.budget import page_budget
+from browser.pool import PARTITION_WORKERS, run_partitioned
+from browser.settle import wait_until_settled
+from config import FORM_PERIOD_LIMIT
+
 
 GENERATE_KEYWORDS = (
     "gerar",
@@ -16,6 +31,61 @@ GENERATE_KEYWORDS = (
 PDF_EXT = ".pdf"
 
 
+# =========================================================
+# CONFIG
+# =========================================================
+# páginas com o mesmo formulário em paralelo (1 = serial): a atual + os
+# workers reservados para partições no pool compartilhado
+FORM_PARALLELISM = PARTITION_WORKERS + 1
+
+# combinações por página abaixo disso não compensam abrir outra
+MIN_COMBINATIONS_PER_PARTITION = 4
+
+# teto de combinações por formulário (o resto é descartado com aviso),
+# aplicado depois da priorização (ver _prioritized)
+MAX_COMBINATIONS = 300
+
+# teto da espera pelo resultado: sai antes se a rede/DOM assentarem
+RESULT_SETTLE_CAP_MS = 8000
+SELECT_SETTLE_CAP_MS = 1500
+
+# período = opção com ano (2023, 12/2023, "Dezembro de 2023"...)
+PERIOD_RE = re.compile(r"\b(19|20)\d{2}\b")
+PLACEHOLDER_RE = re.compile(r"selecione|todos|--")
+
+
+# marca os selects visíveis (data-efpc-form) e devolve as opções válidas;
+# a marca mantém o índice estável mesmo se um select sumir depois
+READ_SELECTS_JS = """
+(placeholder) => {
+    const ph = new RegExp(placeholder, 'i');
+    const visible = (el) => {
+        const r = el.getBoundingClientRect();
+        return r.width > 0 && r.height > 0;
+    };
+    return Array.from(document.querySelectorAll('select'))
+        .filter(visible)
+        .map((sel, index) => {
+            sel.setAttribute('data-efpc-form', String(index));
+            return {
+                index,
+                name: sel.name || sel.id || `select_${index}`,
+                options: Array.from(sel.options)
+                    .map((o) => ({value: o.value, text: (o.text || '').trim()}))
+                    .filter((o) => o.value && o.text && !ph.test(o.text)),
+            };
+        });
+}
+"""
+
+# PDFs do estado atual (href absoluto)
+RESULT_LINKS_JS = """
+() => Array.from(document.querySelectorAll('a[href]'))
+    .map((a) => a.href)
+    .filter((h) => /\\.pdf$/i.test(h))
+"""
+
+
 def detect_form_state_machine(page: Page) -> bool:
     """
     Detecta páginas que exigem múltiplos formulários
@@ -34,96 +104,228 @@ def detect_form_state_machine(page: Page) -> bool:
     return False
 
 
-def _select_most_recent_option(select):
+# =========================================================
+# SELECTS E COMBINAÇÕES
+# =========================================================
+def _read_selects(page: Page) -> list[dict]:
+    return page.evaluate(READ_SELECTS_JS, PLACEHOLDER_RE.pattern)
+
+
+def _is_period_select(select: dict) -> bool:
+    options = select["options"]
+    if not options:
+        return False
+    dated = sum(1 for o in options if PERIOD_RE.search(o["text"]))
+    return dated >= len(options) * 0.8
+
+
+def _most_recent_first(options: list[dict]) -> list[dict]:
     """
-    Seleciona a opção mais recente do select:
-    - último item válido
-    - ignora placeholders
+    Ordena por ano (desc); sem ano, segue a convenção do site: mais
+    recente = último item.
     """
+    def year(o):
+        m = PERIOD_RE.search(o["text"])
+        return int(m.group(0)) if m else 0
 
-    options = select.locator("option").all()
-    valid = []
+    ordered = list(reversed(options))
+    return sorted(ordered, key=year, reverse=True)
 
-    for opt in options:
-        value = opt.get_attribute("value")
-        text = (opt.inner_text() or "").strip()
 
-        if not value or not text:
-            continue
+def _with_index_sum(lengths: list[int], total: int):
+    """
+    Tuplas de índices (um por eixo) cuja soma é `total`.
+    """
+    if not lengths:
+        if total == 0:
+            yield ()
+        return
 
-        if re.search(r"selecione|todos|--", text.lower()):
-            continue
+    if total > sum(n - 1 for n in lengths):
+        return
 
-        valid.append(value)
+    for i in range(min(lengths[0] - 1, total) + 1):
+        for rest in _with_index_sum(lengths[1:], total - i):
+            yield (i,) + rest
 
-    if not valid:
-        return False
 
-    # mais recente = último
-    select.select_option(valid[-1])
-    return True
+def _prioritized(lengths: list[int], periods: set[int]):
+    """
+    Índices do produto cartesiano em ordem de prioridade, sem repetir:
+    1. varredura: todos os eixos andam juntos, então cada opção de cada
+       select aparece cedo (o teto não deixa eixo sem explorar);
+    2. diagonais (soma dos índices crescente): perto do topo de todos os
+       eixos antes do fundo de qualquer um; no empate, períodos mais
+       recentes (índice 0) primeiro.
+    """
+    emitted = set()
+
+    for t in range(max(lengths)):
+        combo = tuple(t % n for n in lengths)
+        if combo not in emitted:
+            emitted.add(combo)
+            yield combo
+
+    for total in range(sum(n - 1 for n in lengths) + 1):
+        diagonal = sorted(
+            _with_index_sum(lengths, total),
+            key=lambda c: (sum(c[k] for k in periods), c),
+        )
+        for combo in diagonal:
+            if combo not in emitted:
+                yield combo
 
 
-def run_form_state_machine(page: Page, logger):
+def _combinations(selects: list[dict], logger) -> list[tuple]:
     """
-    Executa o fluxo:
-    plano → período mais recente → gerar → coletar PDFs
+    Produto cartesiano das opções, priorizado (_prioritized) antes do
+    teto MAX_COMBINATIONS; nos selects de período só entram os
+    FORM_PERIOD_LIMIT mais recentes (0 = todos), do mais novo ao mais velho.
     """
+    axes = []
+    periods = set()
 
-    logger.warning("[FORM-STATE] Strategy ativada (form combinatório)")
+    for select in selects:
+        options = select["options"]
 
-    collected = []
-    seen = set()
+        if _is_period_select(select):
+            options = _most_recent_first(options)
+            if FORM_PERIOD_LIMIT > 0:
+                options = options[:FORM_PERIOD_LIMIT]
+            periods.add(len(axes))
 
-    # 🔹 1. detectar selects
-    selects = page.locator("select:visible")
-    if selects.count() < 2:
-        logger.warning("[FORM-STATE] selects insuficientes")
+        axes.append([(select["index"], o["value"], o["text"]) for o in options])
+
+    lengths = [len(axis) for axis in axes]
+    if not axes or 0 in lengths:
         return []
 
-    # 🔹 2. selecionar opções mais recentes
-    for i in range(selects.count()):
-        ok = _select_most_recent_option(selects.nth(i))
-        if not ok:
-            logger.warning(f"[FORM-STATE] select {i} sem opções válidas")
+    order = itertools.islice(_prioritized(lengths, periods), MAX_COMBINATIONS)
+    combos = [tuple(axes[k][i] for k, i in enumerate(idx)) for idx in order]
 
-    time.sleep(1)
+    total = math.prod(lengths)
+    if total > len(combos):
+        logger.warning(
+            f"[FORM-STATE] {total} combinações, teto {MAX_COMBINATIONS}: "
+            f"{total - len(combos)} descartadas (mantidas as prioritárias)"
+        )
+
+    return combos
+
+
+def _apply_combination(page: Page, combo, logger) -> bool:
+    """
+    Seleciona na ordem do formulário: selects dependentes (período
+    recarregado pelo plano) assentam antes do próximo.
+    """
+    for index, value, text in combo:
+        select = page.locator(f"select[data-efpc-form='{index}']")
+        try:
+            select.select_option(value, timeout=3000)
+        except Exception:
+            logger.debug(f"[FORM-STATE] opção {text!r} indisponível no select {index}")
+            return False
+
+        wait_until_settled(page, SELECT_SETTLE_CAP_MS, "form select", logger=logger)
+
+    return True
 
-    # 🔹 3. clicar botão gerar/buscar
-    clicked = False
+
+def _click_generate(page: Page) -> bool:
     for btn in page.locator("button:visible, input[type=submit]:visible").all():
-        text = (btn.inner_text() or "").lower()
+        text = (btn.inner_text() or btn.get_attribute("value") or "").lower()
         if any(k in text for k in GENERATE_KEYWORDS):
             btn.click()
-            clicked = True
-            logger.info("[FORM-STATE] botão de geração acionado")
+            return True
+    return False
+
+
+# =========================================================
+# EXPLORAÇÃO
+# =========================================================
+def _explore(page: Page, combos, seen_results, seen_lock, logger) -> list[dict]:
+    """
+    Roda uma partição de combinações, em série, nesta página.
+    """
+    collected = []
+    budget = page_budget(page)
+
+    for combo in combos:
+        if budget.expired("combinações do form"):
             break
 
-    if not clicked:
-        logger.warning("[FORM-STATE] botão gerar não encontrado")
-        return []
+        label = " × ".join(text for _, _, text in combo)
 
-    page.wait_for_timeout(2500)
+        # "gerar" pode recarregar a página: remarca os selects a cada volta
+        _read_selects(page)
 
-    # 🔹 4. coletar PDFs do estado atual
-    for a in page.locator("a[href$='.pdf']").all():
-        href = a.get_attribute("href")
-        if not href:
+        if not _apply_combination(page, combo, logger):
             continue
 
-        if href in seen:
+        if not _click_generate(page):
+            logger.warning("[FORM-STATE] botão gerar não encontrado")
+            break
+
+        wait_until_settled(page, RESULT_SETTLE_CAP_MS, "form gerar", logger=logger)
+
+        hrefs = sorted(set(page.evaluate(RESULT_LINKS_JS)))
+        if not hrefs:
             continue
 
-        seen.add(href)
-        collected.append(
-            {
-                "__kind__": "url",
-                "__url__": href,
-            }
-        )
+        # combinação inválida costuma devolver o resultado anterior/padrão
+        digest = hashlib.sha1("\n".join(hrefs).encode()).hexdigest()
+        with seen_lock:
+            if digest in seen_results:
+                logger.debug(f"[FORM-STATE] resultado repetido: {label}")
+                continue
+            seen_results.add(digest)
+
+        logger.info(f"[FORM-STATE] {len(hrefs)} PDFs em {label}")
+        collected.extend({"__kind__": "url", "__url__": href} for href in hrefs)
+
+    return collected
+
+
+def run_form_state_machine(page: Page, logger):
+    """
+    Executa o fluxo para cada combinação:
+    plano → período → gerar → coletar PDFs
+    """
+
+    logger.warning("[FORM-STATE] Strategy ativada (form combinatório)")
+
+    # 🔹 1. selects e opções
+    selects = [s for s in _read_selects(page) if s["options"]]
+    if len(selects) < 2:
+        logger.warning("[FORM-STATE] selects insuficientes")
+        return []
+
+    # 🔹 2. combinações (produto cartesiano / últimos N períodos)
+    combos = _combinations(selects, logger)
+    logger.info(
+        f"[FORM-STATE] {len(combos)} combinações em "
+        f"{', '.join(s['name'] for s in selects)}"
+    )
+
+    # 🔹 3. explorar em páginas paralelas
+    seen_results = set()
+    seen_lock = threading.Lock()
+
+    collected = run_partitioned(
+        page,
+        combos,
+        lambda p, part: _explore(p, part, seen_results, seen_lock, logger),
+        FORM_PARALLELISM,
+        "FORM",
+        min_per_partition=MIN_COMBINATIONS_PER_PARTITION,
+    )
+
+    # 🔹 4. dedup entre partições
+    unique = list({item["__url__"]: item for item in collected}.values())
 
     logger.warning(
-        f"[FORM-STATE] {len(collected)} PDFs coletados (período mais recente)"
+        f"[FORM-STATE] {len(unique)} PDFs coletados "
+        f"({len(seen_results)} resultados distintos)"
     )
 
-    return collected
+    return unique
@@ -1,16 +1,12 @@
 # browser/strategies/interactive_table.py
 
-def extract_tables(page):
-    tables = []
+from browser.harvest import harvest_dom
 
-    for table in page.locator("table").all():
-        rows = []
-        for tr in table.locator("tr").all():
-            row = [td.inner_text().strip() for td in tr.locator("th, td").all()]
-            if row:
-                rows.append(row)
 
-        if rows:
-            tables.append(rows)
+def tables_from_snapshot(snapshot):
+    return [rows for rows in snapshot.tables if rows]
 
-    return tables
+
+def extract_tables(page, snapshot=None):
+    snapshot = snapshot or harvest_dom(page)
+    return tables_from_snapshot(snapshot)
@@ -1,39 +1,34 @@
 import re
 from urllib.parse import urljoin
 
+from browser.harvest import harvest_dom
+
 PDF_REGEX = re.compile(
     r"(https?:\/\/[^\s'\"()]+\.pdf|\/[^\s'\"()]+\.pdf)",
     re.IGNORECASE
 )
 
-def extract_js_pdf_links(page):
-    """
-    Extrai PDFs escondidos em onclick, data-href, data-url etc.
-    NÃO clica em nada.
-    """
-
+def js_pdf_links_from_snapshot(snapshot):
     found = set()
 
-    elements = page.locator("[onclick], [data-href], [data-url]").all()
+    for el in snapshot.js_elements:
+        for attr in (el.onclick, el.data_href, el.data_url):
+            if not attr:
+                continue
 
-    for el in elements:
-        try:
-            attrs = [
-                el.get_attribute("onclick"),
-                el.get_attribute("data-href"),
-                el.get_attribute("data-url"),
-            ]
+            for match in PDF_REGEX.findall(attr):
+                url = match
+                if url.startswith("/"):
+                    url = urljoin(snapshot.url, url)
+                found.add(url)
 
-            for attr in attrs:
-                if not attr:
-                    continue
+    return [{"__kind__": "url", "__url__": u} for u in found]
 
-                for match in PDF_REGEX.findall(attr):
-                    url = match
-                    if url.startswith("/"):
-                        url = urljoin(page.url, url)
-                    found.add(url)
-        except Exception:
-            pass
 
-    return [{"__kind__": "url", "__url__": u} for u in found]
+def extract_js_pdf_links(page, snapshot=None):
+    """
+    Extrai PDFs escondidos em onclick, data-href, data-url etc.
+    NÃO clica em nada.
+    """
+    snapshot = snapshot or harvest_dom(page)
+    return js_pdf_links_from_snapshot(snapshot)
@@ -2,45 +2,45 @@
 
 from urllib.parse import urljoin
 
+from browser.harvest import harvest_dom
 
-def extract_list_links(page):
-    """
-    Extrai links diretos para PDFs presentes em listas ou conteúdo editorial.
-    Não clica, não executa JS, apenas lê o DOM.
-    """
 
+def list_links_from_snapshot(snapshot):
     items = []
     seen = set()
 
-    anchors = page.locator("a[href$='.pdf'], a[href*='.pdf?']")
-
-    for i in range(anchors.count()):
-        a = anchors.nth(i)
+    for a in snapshot.anchors:
+        href = a.href
+        if not href:
+            continue
 
-        try:
-            if not a.is_visible():
-                continue
+        # mesmo critério do seletor a[href$='.pdf'], a[href*='.pdf?']
+        if not (href.endswith(".pdf") or ".pdf?" in href):
+            continue
 
-            href = a.get_attribute("href")
-            if not href:
-                continue
+        if not a.visible:
+            continue
 
-            pdf_url = urljoin(page.url, href)
-            if pdf_url in seen:
-                continue
+        pdf_url = urljoin(snapshot.url, href)
+        if pdf_url in seen:
+            continue
 
-            text = (a.inner_text() or "").strip()
+        seen.add(pdf_url)
 
-            seen.add(pdf_url)
+        items.append({
+            "__kind__": "url",
+            "__url__": pdf_url,
+            "anchor_text": (a.text or "").strip(),
+            "strategy": "list_links",
+        })
 
-            items.append({
-                "__kind__": "url",
-                "__url__": pdf_url,
-                "anchor_text": text,
-                "strategy": "list_links",
-            })
+    return items
 
-        except Exception:
-            continue
 
-    return items
+def extract_list_links(page, snapshot=None):
+    """
+    Extrai links diretos para PDFs presentes em listas ou conteúdo editorial.
+    Não clica, não executa JS, apenas lê o DOM.
+    """
+    snapshot = snapshot or harvest_dom(page)
+    return list_links_from_snapshot(snapshot)
@@ -0,0 +1,189 @@
+# browser/strategies/png_stitch.py
+# =========================================================
+# Costura de screenshots em streaming (PNG escrito por faixas)
+# =========================================================
+#
+# Cada captura é decodificada, comparada com a anterior (linhas
+# sobrepostas e cabeçalho fixo são descartados) e as linhas novas vão
+# direto para o IDAT via zlib incremental. A altura do IHDR é corrigida
+# no fim. Memória: uma captura por vez + hashes das linhas da anterior.
+
+import hashlib
+import io
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+from PIL import Image
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# tamanho de cada chunk IDAT gravado
+IDAT_CHUNK_BYTES = 64 * 1024
+
+# sobreposições menores que isso são coincidência (bordas / fundo liso)
+MIN_OVERLAP_ROWS = 8
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def _row_hashes(img: Image.Image) -> list[bytes]:
+    raw = img.tobytes()
+    stride = img.width * 3
+    return [
+        hashlib.blake2b(raw[i:i + stride], digest_size=8).digest()
+        for i in range(0, len(raw), stride)
+    ]
+
+
+def _common_prefix(a: list, b: list) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _overlap(prev: list, new: list) -> int:
+    """
+    Maior k tal que as k últimas linhas de `prev` == as k primeiras de `new`.
+    """
+    if not prev or not new:
+        return 0
+
+    first = new[0]
+    for start, h in enumerate(prev):
+        if h != first:
+            continue
+        k = len(prev) - start
+        if k < MIN_OVERLAP_ROWS:
+            break
+        if k <= len(new) and prev[start:] == new[:k]:
+            return k
+
+    return 0
+
+
+class StreamingPngStitcher:
+    """
+    Uso:
+        with StreamingPngStitcher() as st:
+            st.add(png_bytes)  # uma vez por viewport
+        st.path  # PNG final (arquivo temporário)
+    """
+
+    def __init__(self, dest: Path | None = None):
+        if dest is None:
+            fd, name = tempfile.mkstemp(suffix=".png", prefix="stitch_")
+            os.close(fd)
+            dest = Path(name)
+
+        self.path = dest
+        self.width = None
+        self.height = 0
+        self.rows_skipped = 0
+
+        self._f = None
+        self._z = zlib.compressobj(6)
+        self._pending = bytearray()
+
+        # só hashes: a captura anterior em si não fica em memória
+        self._header_hashes = None
+        self._prev_body = None
+
+    # -----------------------------------------------------
+    def __enter__(self):
+        self._f = open(self.path, "wb")
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.finish()
+        else:
+            self._f.close()
+            self.path.unlink(missing_ok=True)
+        return False
+
+    # -----------------------------------------------------
+    def _write_header(self):
+        self._f.write(PNG_SIGNATURE)
+        # altura provisória: corrigida em finish()
+        ihdr = struct.pack(">IIBBBBB", self.width, 0, 8, 2, 0, 0, 0)
+        self._f.write(_chunk(b"IHDR", ihdr))
+
+    def _flush_idat(self, force=False):
+        while len(self._pending) >= IDAT_CHUNK_BYTES or (force and self._pending):
+            data = bytes(self._pending[:IDAT_CHUNK_BYTES])
+            del self._pending[:IDAT_CHUNK_BYTES]
+            self._f.write(_chunk(b"IDAT", data))
+
+    def add(self, png_bytes: bytes) -> int:
+        """
+        Acrescenta uma captura; retorna quantas linhas novas entraram.
+        """
+        img = Image.open(io.BytesIO(png_bytes)).convert("RGB")
+
+        if self.width is None:
+            self.width = img.width
+            self._write_header()
+        elif img.width != self.width:
+            # capturas do mesmo elemento: ajusta diferenças de 1-2px
+            canvas = Image.new("RGB", (self.width, img.height), "white")
+            canvas.paste(img.crop((0, 0, min(img.width, self.width), img.height)), (0, 0))
+            img = canvas
+
+        hashes = _row_hashes(img)
+
+        if self._header_hashes is None:
+            self._header_hashes = hashes
+            self._prev_body = hashes
+            start = 0
+        else:
+            # cabeçalho fixo (sticky) repetido no topo de cada captura
+            sticky = _common_prefix(self._header_hashes, hashes)
+            body = hashes[sticky:]
+
+            # fim do scroll: a última captura repete linhas da anterior
+            start = sticky + _overlap(self._prev_body, body)
+            self._prev_body = body
+
+        self.rows_skipped += start
+
+        raw = img.tobytes()
+        stride = self.width * 3
+
+        for y in range(start, img.height):
+            self._pending += self._z.compress(b"\x00" + raw[y * stride:(y + 1) * stride])
+            self._flush_idat()
+
+        added = img.height - start
+        self.height += added
+        return added
+
+    def finish(self):
+        if self._f is None or self._f.closed:
+            return
+
+        if self.width is None:
+            # nenhuma captura: arquivo vazio não é PNG
+            self._f.close()
+            self.path.unlink(missing_ok=True)
+            return
+
+        self._pending += self._z.flush()
+        self._flush_idat(force=True)
+        self._f.write(_chunk(b"IEND", b""))
+        self._f.close()
+
+        # corrige altura + CRC do IHDR
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        with open(self.path, "r+b") as f:
+            f.seek(8)
+            f.write(_chunk(b"IHDR", ihdr))
@@ -3,12 +3,22 @@
 # Power BI Strategy Router
 # =========================================================
 
-import time
 from urllib.parse import urlparse
 
+from browser.strategies.powerbi_generic import extract_generic
 from browser.strategies.powerbi_sites import petros
 
 
+# ---------------------------------------------------------
+# OVERRIDES POR SITE
+# ---------------------------------------------------------
+# sufixo do domínio -> extrator próprio; o resto vai para o genérico
+
+SITE_OVERRIDES = {
+    "petros.com.br": petros.extract,
+}
+
+
 # ---------------------------------------------------------
 # HELPERS
 # ---------------------------------------------------------
@@ -33,20 +43,11 @@ def _get_domain(url: str) -> str:
         return ""
 
 
-# ---------------------------------------------------------
-# FALLBACK GENÉRICO
-# ---------------------------------------------------------
-
-def _generic_powerbi_extract(page):
-    time.sleep(5)
-    return []
-
-
 # ---------------------------------------------------------
 # ENTRYPOINT
 # ---------------------------------------------------------
 
-def extract_powerbi_tables(page):
+def extract_powerbi_tables(page, logger):
     """
     Retorna:
     [
@@ -55,6 +56,7 @@ def extract_powerbi_tables(page):
         "csv_bytes": bytes
       }
     ]
+    (itens PNG só quando nenhum querydata foi visto)
     """
 
     if not _is_powerbi_page(page):
@@ -63,18 +65,23 @@ def extract_powerbi_tables(page):
     domain = _get_domain(page.url)
 
     # =====================================================
-    # PETROS
+    # OVERRIDES
     # =====================================================
 
-    if domain.endswith("petros.com.br"):
-        try:
-            return petros.extract(page)
-        except Exception as e:
-            print(f"[POWERBI][PETROS] Erro: {e}")
-            return []
+    for suffix, extract in SITE_OVERRIDES.items():
+        if domain.endswith(suffix):
+            try:
+                return extract(page)
+            except Exception as e:
+                logger.error(f"[POWERBI][{suffix}] Erro: {e}")
+                return []
 
     # =====================================================
-    # FALLBACK
+    # GENÉRICO
     # =====================================================
 
-    return _generic_powerbi_extract(page)
+    try:
+        return extract_generic(page, logger)
+    except Exception as e:
+        logger.error(f"[POWERBI] Erro no extrator genérico: {e}")
+        return []
@@ -0,0 +1,76 @@
+# browser/strategies/powerbi_capture.py
+# =========================================================
+# Captura das respostas querydata do Power BI (page.on("response"))
+# =========================================================
+
+import threading
+import weakref
+
+from browser.strategies.powerbi_dsr import decode_query_result, merge_tables
+
+
+QUERYDATA_MARKERS = ("/querydata", "/query/data")
+
+_captures = weakref.WeakKeyDictionary()
+_captures_lock = threading.Lock()
+
+
+def is_querydata_url(url: str) -> bool:
+    url = url.lower()
+    return any(m in url for m in QUERYDATA_MARKERS)
+
+
+class QueryDataCapture:
+    """
+    Guarda as responses de querydata da página (inclusive de iframes).
+    Os corpos só são lidos em `tables()`, fora do handler do evento.
+    """
+
+    def __init__(self, page):
+        self._responses = []
+        self._decoded = {}
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if is_querydata_url(response.url):
+            self._responses.append(response)
+
+    def mark(self) -> int:
+        """
+        Posição atual: `tables(since=mark)` devolve só o que veio depois.
+        """
+        return len(self._responses)
+
+    def seen(self, since: int = 0) -> bool:
+        return len(self._responses) > since
+
+    def _decode(self, i) -> list[dict]:
+        if i not in self._decoded:
+            response = self._responses[i]
+            try:
+                self._decoded[i] = (
+                    decode_query_result(response.json())
+                    if response.status == 200 else []
+                )
+            except Exception:
+                # corpo indisponível (página navegou) ou não-JSON
+                self._decoded[i] = []
+        return self._decoded[i]
+
+    def tables(self, since: int = 0) -> list[dict]:
+        tables = []
+        for i in range(since, len(self._responses)):
+            tables.extend(self._decode(i))
+        return merge_tables(tables)
+
+
+def install_querydata_capture(page) -> QueryDataCapture:
+    """
+    Chame logo após new_page(): os visuais consultam durante o load.
+    """
+    with _captures_lock:
+        capture = _captures.get(page)
+        if capture is None:
+            capture = QueryDataCapture(page)
+            _captures[page] = capture
+        return capture
@@ -0,0 +1,197 @@
+# browser/strategies/powerbi_dsr.py
+# =========================================================
+# Decoder do formato DSR (resposta do endpoint querydata do Power BI)
+# =========================================================
+#
+# results[i].result.data:
+#   descriptor.Select -> [{"Value": "G0", "Name": "Tabela.Coluna"}, ...]
+#   dsr.DS[0]:
+#     PH[0].DM0 -> linhas; a primeira traz o schema em "S"
+#                  [{"N": "G0", "T": 1, "DN": "D0"}, ...]
+#     ValueDicts -> {"D0": ["valor", ...]} (colunas com "DN" guardam índices)
+#     RT         -> restart token: o visual ainda tem linhas para buscar
+#
+# cada linha "C" só traz as colunas que mudaram:
+#   "R" (bitmask) -> coluna repete o valor da linha anterior
+#   "Ø" (bitmask) -> coluna é nula
+
+import csv
+import io
+from datetime import datetime, timezone
+
+
+# tipo 7 = datetime (epoch em ms)
+DSR_TYPE_DATETIME = 7
+
+# maior sobreposição procurada entre duas janelas seguidas do mesmo visual
+MAX_OVERLAP_ROWS = 100
+
+
+def _column_names(descriptor: dict) -> dict:
+    names = {}
+    for sel in (descriptor or {}).get("Select", []):
+        value = sel.get("Value")
+        if value:
+            names[value] = sel.get("Name") or value
+    return names
+
+
+def _convert(value, col):
+    if col.get("T") == DSR_TYPE_DATETIME and isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value / 1000, tz=timezone.utc).date().isoformat()
+        except (OverflowError, OSError, ValueError):
+            return value
+    return value
+
+
+def _decode_rows(dm0: list, value_dicts: dict) -> tuple[list, list]:
+    schema = []
+    rows = []
+    previous = []
+
+    for entry in dm0:
+        if "S" in entry:
+            schema = entry["S"]
+            previous = [None] * len(schema)
+
+        if not schema:
+            continue
+
+        repeat = entry.get("R", 0)
+        nulls = entry.get("Ø", 0)
+        values = iter(entry.get("C", []))
+
+        row = []
+        for i, col in enumerate(schema):
+            bit = 1 << i
+
+            if repeat & bit:
+                value = previous[i]
+            elif nulls & bit:
+                value = None
+            else:
+                value = next(values, None)
+
+                # índice no dicionário da coluna
+                dn = col.get("DN")
+                if dn and isinstance(value, int):
+                    d = value_dicts.get(dn, [])
+                    value = d[value] if 0 <= value < len(d) else value
+
+                value = _convert(value, col)
+
+            row.append(value)
+
+        previous = row
+        rows.append(row)
+
+    return [col.get("N") for col in schema], rows
+
+
+def decode_query_result(payload: dict) -> list[dict]:
+    """
+    Tabelas de uma resposta querydata:
+    [{"columns": [...], "rows": [[...]], "complete": bool}, ...]
+    (um item por visual consultado)
+    """
+    tables = []
+
+    for result in (payload or {}).get("results", []):
+        data = (result.get("result") or {}).get("data") or {}
+        names = _column_names(data.get("descriptor"))
+
+        for ds in (data.get("dsr") or {}).get("DS", []):
+            value_dicts = ds.get("ValueDicts", {})
+
+            for ph in ds.get("PH", []):
+                dm0 = ph.get("DM0")
+                if not dm0:
+                    continue
+
+                columns, rows = _decode_rows(dm0, value_dicts)
+                if not rows:
+                    continue
+
+                tables.append({
+                    "columns": [names.get(c, c) for c in columns],
+                    "rows": rows,
+                    "complete": "RT" not in ds,
+                })
+
+    return tables
+
+
+def _window_rows(rows: list, columns: list) -> list:
+    """
+    Linhas da janela sem o cabeçalho repetido no início dela.
+    """
+    header = [str(c) for c in columns]
+    start = 0
+    while start < len(rows) and [str(v) for v in rows[start]] == header:
+        start += 1
+    return rows[start:]
+
+
+def _overlap(previous: list, rows: list) -> int:
+    """
+    Quantas linhas do início da janela repetem o fim da anterior
+    (a janela seguinte recomeça de um ponto já entregue).
+    """
+    for k in range(min(len(previous), len(rows), MAX_OVERLAP_ROWS), 0, -1):
+        if previous[-k:] == rows[:k]:
+            return k
+    return 0
+
+
+def merge_tables(tables: list[dict]) -> list[dict]:
+    """
+    Junta janelas do mesmo visual (mesmas colunas, em sequência),
+    como as que chegam durante o scroll de um grid. Só a fronteira
+    entre janelas é deduplicada (cabeçalho + sobreposição): linhas
+    iguais dentro dos dados são legítimas e ficam.
+    """
+    merged = []
+
+    for table in tables:
+        last = merged[-1] if merged else None
+
+        if last and last["columns"] == table["columns"] and not last["complete"]:
+            rows = _window_rows(table["rows"], table["columns"])
+            last["rows"].extend(rows[_overlap(last["rows"], rows):])
+            last["complete"] = table["complete"]
+            continue
+
+        merged.append({**table, "rows": list(table["rows"])})
+
+    return merged
+
+
+def table_to_csv(table: dict) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    # "Sum(Tabela.Coluna)" -> "Coluna" fica legível no CSV
+    writer.writerow([_short_name(c) for c in table["columns"]])
+    writer.writerows(table["rows"])
+
+    return buf.getvalue().encode("utf-8-sig")
+
+
+def _short_name(name: str) -> str:
+    name = str(name)
+    inner = name[name.find("(") + 1:name.rfind(")")] if "(" in name else name
+    return inner.split(".")[-1] or name
+
+
+def tables_to_csv_items(tables: list[dict], prefix: str) -> list[dict]:
+    """
+    Itens no formato do pipeline: {"filename", "csv_bytes"}.
+    """
+    return [
+        {
+            "filename": f"{prefix}__{i:02d}.csv",
+            "csv_bytes": table_to_csv(table),
+        }
+        for i, table in enumerate(tables)
+    ]
@@ -0,0 +1,325 @@
+# browser/strategies/powerbi_generic.py
+# =========================================================
+# Power BI genérico (qualquer relatório embutido)
+# =========================================================
+#
+# 1. estado inicial: tabelas de todos os querydata do load
+# 2. slicers achados no DOM do embed (dropdown ou lista)
+# 3. cada opção de cada slicer -> novos querydata -> CSV
+#    (opções divididas entre páginas paralelas, ver powerbi_slicers)
+# 4. nenhum querydata visto -> screenshot do relatório
+
+import re
+from typing import Dict, List
+from urllib.parse import urlparse
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+from browser.budget import page_budget
+from browser.settle import wait_until_settled
+from browser.strategies.powerbi_capture import (
+    install_querydata_capture,
+    is_querydata_url,
+)
+from browser.strategies.powerbi_dsr import tables_to_csv_items
+from browser.strategies.powerbi_slicers import run_partitioned
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+MAX_SLICERS = 3
+MAX_OPTIONS_PER_SLICER = 40
+
+# tempo máximo esperando o querydata de uma seleção
+SELECTION_TIMEOUT_MS = 15000
+
+REPORT_LOAD_CAP_MS = 5000
+
+SLICER_CONTAINERS = ".slicer-container, [class*='slicer-container']"
+VISUAL_CONTAINERS = "visual-container, .visual-container, .visualContainer"
+
+
+# slicers e visuais do embed, na ordem do documento
+DISCOVER_JS = """
+([slicerSel, visualSel]) => {
+    const visible = (el) => {
+        const r = el.getBoundingClientRect();
+        return r.width > 0 && r.height > 0;
+    };
+    const text = (el) => el ? (el.getAttribute('title') || el.innerText || '').trim() : '';
+
+    const slicers = Array.from(document.querySelectorAll(slicerSel))
+        .filter(visible)
+        .map((c, index) => {
+            const header = c.querySelector('.slicer-header-text, [class*="slicer-header"]');
+            const dropdown = c.querySelector('.slicer-dropdown-menu, [role="combobox"]');
+            return {
+                index,
+                title: text(header) || c.getAttribute('aria-label') || `slicer_${index}`,
+                kind: dropdown ? 'dropdown' : 'list',
+            };
+        });
+
+    return {
+        slicers,
+        visuals: Array.from(document.querySelectorAll(visualSel)).filter(visible).length,
+    };
+}
+"""
+
+# abre o dropdown do slicer `index` (lista: nada a fazer)
+OPEN_SLICER_JS = """
+([slicerSel, index]) => {
+    const c = Array.from(document.querySelectorAll(slicerSel))[index];
+    if (!c) return false;
+    const dropdown = c.querySelector('.slicer-dropdown-menu, [role="combobox"]');
+    if (dropdown) dropdown.click();
+    return true;
+}
+"""
+
+# opções visíveis: popup do dropdown ou itens da lista do slicer
+OPTIONS_JS = """
+([slicerSel, index]) => {
+    const c = Array.from(document.querySelectorAll(slicerSel))[index];
+    const scope = c && c.querySelector('.slicerItemContainer') ? c : document;
+    const items = scope.querySelectorAll('.slicerItemContainer, [role="option"]');
+    const seen = new Set();
+    const out = [];
+    for (const el of items) {
+        const t = (el.getAttribute('title') || el.innerText || '').trim();
+        if (t && !seen.has(t)) { seen.add(t); out.push(t); }
+    }
+    return out;
+}
+"""
+
+# "clicked" | "selected" (já era o estado atual: clicar não dispara
+# querydata) | "missing"
+SELECT_OPTION_JS = """
+([slicerSel, index, label]) => {
+    const c = Array.from(document.querySelectorAll(slicerSel))[index];
+    const scope = c && c.querySelector('.slicerItemContainer') ? c : document;
+    for (const el of scope.querySelectorAll('.slicerItemContainer, [role="option"]')) {
+        const t = (el.getAttribute('title') || el.innerText || '').trim();
+        if (t !== label) continue;
+        const selected =
+            el.getAttribute('aria-selected') === 'true'
+            || el.getAttribute('aria-checked') === 'true'
+            || el.classList.contains('selected')
+            || !!el.querySelector('.slicerCheckbox.selected, .partiallySelected');
+        if (selected) return 'selected';
+        el.click();
+        return 'clicked';
+    }
+    return 'missing';
+}
+"""
+
+
+# =========================================================
+# HELPERS
+# =========================================================
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^\w]+", "_", text).strip("_").upper()[:60]
+
+
+def _prefix(page) -> str:
+    return _safe_name(urlparse(page.url).netloc) or "POWERBI"
+
+
+def report_frame(page):
+    """
+    Frame do relatório (iframe embutido) ou o main frame em app.powerbi.com.
+    """
+    for frame in page.frames:
+        u = (frame.url or "").lower()
+        if "reportembed" in u or "analysis.windows.net" in u:
+            return frame
+
+    for frame in page.frames:
+        if "powerbi" in (frame.url or "").lower():
+            return frame
+
+    return None
+
+
+def discover_report(frame) -> dict:
+    try:
+        return frame.evaluate(DISCOVER_JS, [SLICER_CONTAINERS, VISUAL_CONTAINERS])
+    except Exception:
+        return {"slicers": [], "visuals": 0}
+
+
+def _close_popups(frame):
+    try:
+        frame.page.keyboard.press("Escape")
+    except Exception:
+        pass
+
+
+def slicer_options(frame, slicer: dict) -> List[str]:
+    frame.evaluate(OPEN_SLICER_JS, [SLICER_CONTAINERS, slicer["index"]])
+    wait_until_settled(frame, 1000, "powerbi slicer")
+
+    options = frame.evaluate(OPTIONS_JS, [SLICER_CONTAINERS, slicer["index"]])
+    _close_popups(frame)
+
+    # "Selecionar tudo" / "Select all" não é um estado novo
+    return [
+        o for o in options
+        if not re.search(r"selecionar tudo|select all|^\(tudo\)$", o.lower())
+    ][:MAX_OPTIONS_PER_SLICER]
+
+
+def reset_report(page):
+    """
+    Recarrega o relatório: nenhum slicer filtrado, igual às páginas das
+    partições (que abrem o relatório do zero). Retorna o frame novo.
+    """
+    try:
+        page.reload(wait_until="domcontentloaded")
+    except PlaywrightTimeout:
+        return None
+
+    wait_until_settled(page, REPORT_LOAD_CAP_MS, "powerbi reset")
+
+    frame = report_frame(page)
+    if frame is not None:
+        wait_until_settled(frame, REPORT_LOAD_CAP_MS, "powerbi reset (iframe)")
+    return frame
+
+
+def select_and_wait(page, frame, slicer: dict, label: str) -> bool:
+    """
+    Seleciona `label` e espera o querydata que a seleção dispara.
+    Opção já selecionada não é clicada (não haveria querydata a esperar;
+    numa página recém-carregada esse é o estado padrão, já no __BASE).
+    """
+    def select():
+        frame.evaluate(OPEN_SLICER_JS, [SLICER_CONTAINERS, slicer["index"]])
+        wait_until_settled(frame, 1000, "powerbi slicer")
+        result = frame.evaluate(SELECT_OPTION_JS, [SLICER_CONTAINERS, slicer["index"], label])
+        if result != "clicked":
+            # sai do expect_response sem esperar o timeout
+            raise LookupError(f"{label}: {result}")
+
+    try:
+        with page.expect_response(
+            lambda r: is_querydata_url(r.url),
+            timeout=SELECTION_TIMEOUT_MS,
+        ):
+            select()
+    except (PlaywrightTimeout, LookupError):
+        _close_popups(frame)
+        return False
+
+    _close_popups(frame)
+    wait_until_settled(frame, 2000, "powerbi seleção")
+    return True
+
+
+# =========================================================
+# EXTRAÇÃO
+# =========================================================
+def _extract_slicer_options(page, slicer, labels) -> List[Dict]:
+    """
+    Uma partição de opções de um slicer, em série nesta página.
+    """
+    outputs = []
+
+    capture = install_querydata_capture(page)
+    frame = report_frame(page)
+    if frame is None:
+        return []
+
+    prefix = f"{_prefix(page)}__{_safe_name(slicer['title'])}"
+    budget = page_budget(page)
+
+    for label in labels:
+        if budget.expired("opções do slicer"):
+            break
+
+        mark = capture.mark()
+
+        if not select_and_wait(page, frame, slicer, label):
+            continue
+
+        tables = capture.tables(mark)
+        if tables:
+            outputs.extend(tables_to_csv_items(tables, f"{prefix}__{_safe_name(label)}"))
+
+    return outputs
+
+
+def _screenshot_fallback(page, frame) -> List[Dict]:
+    try:
+        element = frame.frame_element() if frame.parent_frame else None
+        png = element.screenshot() if element else page.screenshot(full_page=True)
+    except Exception:
+        return []
+
+    return [{
+        "__kind__": "png",
+        "__filename__": f"{_prefix(page)}__REPORT.png",
+        "__bytes__": png,
+    }]
+
+
+def extract_generic(page, logger) -> List[Dict]:
+    capture = install_querydata_capture(page)
+    wait_until_settled(page, REPORT_LOAD_CAP_MS, "powerbi generic")
+
+    frame = report_frame(page)
+    if frame is None:
+        return []
+
+    wait_until_settled(frame, REPORT_LOAD_CAP_MS, "powerbi generic (iframe)")
+
+    report = discover_report(frame)
+    logger.info(
+        f"[POWERBI] {report['visuals']} visuais, "
+        f"{len(report['slicers'])} slicers em {page.url}"
+    )
+
+    # =====================================================
+    # 📊 ESTADO INICIAL
+    # =====================================================
+    outputs = tables_to_csv_items(capture.tables(), f"{_prefix(page)}__BASE")
+
+    if not capture.seen():
+        return _screenshot_fallback(page, frame)
+
+    # =====================================================
+    # 🎚️ ESTADOS DOS SLICERS (um slicer por vez)
+    # =====================================================
+    for n, slicer in enumerate(report["slicers"][:MAX_SLICERS]):
+        if page_budget(page).expired("slicers"):
+            break
+
+        # o slicer anterior deixou a última opção aplicada nesta página:
+        # sem reset, o próximo seria capturado sob aquele filtro
+        if n:
+            frame = reset_report(page)
+            if frame is None:
+                break
+
+        try:
+            labels = slicer_options(frame, slicer)
+        except Exception as e:
+            logger.warning(f"[POWERBI] Slicer {slicer['title']} sem opções: {e}")
+            continue
+
+        if not labels:
+            continue
+
+        outputs.extend(
+            run_partitioned(
+                page,
+                labels,
+                lambda p, part, s=slicer: _extract_slicer_options(p, s, part),
+            )
+        )
+
+    return outputs
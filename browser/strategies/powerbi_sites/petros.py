@@ -1,14 +1,22 @@
 # browser/strategies/powerbi_sites/petros.py
 # ============================================================
-# PETROS – Power BI FULL TABLE Screenshot (Scroll + Stitch)
+# PETROS – Power BI FULL TABLE (querydata -> CSV)
+# fallback: Screenshot (Scroll + Stitch)
 # ============================================================
 
-import time
 import re
-import io
-import hashlib
 from typing import List, Dict
-from PIL import Image
+
+from browser.budget import page_budget
+from browser.settle import wait_until_settled
+from browser.strategies.powerbi_capture import install_querydata_capture
+from browser.strategies.powerbi_dsr import tables_to_csv_items
+from browser.strategies.png_stitch import StreamingPngStitcher
+from browser.strategies.powerbi_slicers import (
+    grid_version,
+    run_partitioned,
+    wait_grid_change,
+)
 
 
 # ============================================================
@@ -31,7 +39,7 @@ def _get_powerbi_frame(page):
 
 def _open_slicer(frame):
     frame.locator('[role="combobox"]').first.click()
-    time.sleep(1)
+    wait_until_settled(frame, 1000, "powerbi slicer")
 
 
 def _get_slicer_options(frame) -> List[str]:
@@ -56,105 +64,145 @@ def _select_option(frame, label: str):
     """)
 
 
-def _grid_signature(frame) -> str:
-    """Hash visual simples pra garantir que o grid mudou"""
-    return frame.evaluate("""
-        () => {
-            const grid = document.querySelector('div[role="grid"]');
-            return grid ? grid.innerText.slice(0, 2000) : '';
-        }
-    """)
+SCROLL_GRID_JS = """
+    () => {
+        const g = document.querySelector('div[role="grid"]');
+        if (!g) return -1;
+        g.scrollTop += g.clientHeight;
+        return g.scrollTop;
+    }
+"""
 
 
-def _wait_grid_change(frame, old_sig, timeout=15):
-    start = time.time()
-    while time.time() - start < timeout:
-        sig = _grid_signature(frame)
-        if sig != old_sig:
-            return
-        time.sleep(0.5)
+# ============================================================
+# DADOS (QUERYDATA)
+# ============================================================
+
+def _load_remaining_rows(frame, capture, since):
+    """
+    Grid paginado (restart token): rola até o fim para o Power BI
+    buscar as janelas restantes, que chegam como novos querydata.
+    """
+    last_scroll = -1
+    budget = page_budget(frame)
+
+    while any(not t["complete"] for t in capture.tables(since)):
+        if budget.expired("scroll do grid"):
+            break
+
+        scroll_pos = frame.evaluate(SCROLL_GRID_JS)
+        wait_until_settled(frame, 1000, "powerbi scroll (dados)")
+
+        if scroll_pos in (-1, last_scroll):
+            break
+
+        last_scroll = scroll_pos
 
 
 # ============================================================
-# SCROLL + STITCH
+# SCROLL + STITCH (FALLBACK SEM QUERYDATA)
 # ============================================================
 
-def _scroll_and_capture(frame) -> bytes:
+def _scroll_and_capture(frame):
+    """
+    Rola o grid capturando cada viewport direto para um PNG em disco
+    (linhas repetidas descartadas). Retorna o Path ou None.
+    """
     grid = frame.locator("div[role='grid']").first
-    screenshots = []
 
     last_scroll = -1
+    budget = page_budget(frame)
 
-    while True:
-        # screenshot visível
-        png = grid.screenshot()
-        screenshots.append(Image.open(io.BytesIO(png)))
-
-        # scroll
-        scroll_pos = frame.evaluate("""
-            () => {
-                const g = document.querySelector('div[role="grid"]');
-                g.scrollTop += g.clientHeight;
-                return g.scrollTop;
-            }
-        """)
-
-        time.sleep(1)
+    with StreamingPngStitcher() as stitcher:
+        while not budget.expired("screenshots do grid"):
+            # screenshot visível
+            stitcher.add(grid.screenshot())
 
-        if scroll_pos == last_scroll:
-            break
+            # scroll
+            scroll_pos = frame.evaluate(SCROLL_GRID_JS)
 
-        last_scroll = scroll_pos
+            wait_until_settled(frame, 1000, "powerbi scroll")
 
-    # stitch vertical
-    width = max(img.width for img in screenshots)
-    height = sum(img.height for img in screenshots)
+            if scroll_pos == last_scroll:
+                break
 
-    final_img = Image.new("RGB", (width, height))
-    y = 0
-    for img in screenshots:
-        final_img.paste(img, (0, y))
-        y += img.height
+            last_scroll = scroll_pos
 
-    buf = io.BytesIO()
-    final_img.save(buf, format="PNG")
-    return buf.getvalue()
+    return stitcher.path if stitcher.height else None
 
 
 # ============================================================
 # ENTRYPOINT
 # ============================================================
 
-def extract(page) -> List[Dict]:
+def _extract_planos(page, planos) -> List[Dict]:
+    """
+    Seleciona cada plano em série nesta página (uma partição).
+    """
     outputs = []
 
-    time.sleep(6)  # Power BI load real
+    capture = install_querydata_capture(page)
 
     frame = _get_powerbi_frame(page)
     if not frame:
         return []
 
-    _open_slicer(frame)
-    planos = _get_slicer_options(frame)
+    budget = page_budget(page)
 
-    if not planos:
-        return []
+    for plano in planos:
+        if budget.expired("planos"):
+            break
 
-    last_sig = _grid_signature(frame)
+        mark = capture.mark()
+        version = grid_version(frame)
 
-    for plano in planos:
         _open_slicer(frame)
         _select_option(frame, plano)
 
-        _wait_grid_change(frame, last_sig)
-        last_sig = _grid_signature(frame)
+        wait_grid_change(frame, version)
+
+        # =====================================================
+        # 📊 DADOS DO VISUAL (querydata) → CSV
+        # =====================================================
+        if capture.seen(mark):
+            _load_remaining_rows(frame, capture, mark)
+            tables = capture.tables(mark)
 
-        png_bytes = _scroll_and_capture(frame)
+            if tables:
+                outputs.extend(
+                    tables_to_csv_items(tables, f"PETROS__{_safe_name(plano)}")
+                )
+                continue
+
+        # =====================================================
+        # 🖼️ SEM PAYLOAD → SCREENSHOT
+        # =====================================================
+        png_path = _scroll_and_capture(frame)
+        if png_path is None:
+            continue
 
         outputs.append({
             "__kind__": "png",
             "__filename__": f"PETROS__{_safe_name(plano)}.png",
-            "__bytes__": png_bytes
+            "__path__": png_path,
         })
 
     return outputs
+
+
+def extract(page) -> List[Dict]:
+    install_querydata_capture(page)
+    wait_until_settled(page, 6000, "powerbi load")
+
+    frame = _get_powerbi_frame(page)
+    if not frame:
+        return []
+
+    _open_slicer(frame)
+    planos = _get_slicer_options(frame)
+
+    if not planos:
+        return []
+
+    # planos divididos entre páginas carregando o mesmo relatório
+    return run_partitioned(page, planos, _extract_planos, entidade="PETROS")
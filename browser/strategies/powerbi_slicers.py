@@ -0,0 +1,99 @@
+# browser/strategies/powerbi_slicers.py
+# =========================================================
+# Enumeração de slicers do Power BI: detecção de mudança do grid
+# (MutationObserver) e partição das opções entre páginas paralelas
+# =========================================================
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+from browser.pool import run_partitioned as run_browser_partitioned
+from browser.settle import wait_until_settled
+from browser.strategies.powerbi_capture import install_querydata_capture
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+# páginas carregando o mesmo relatório em paralelo (1 = serial)
+SLICER_PARALLELISM = 3
+
+# opções por partição abaixo disso não compensam abrir outra página
+MIN_OPTIONS_PER_PARTITION = 2
+
+GRID_CHANGE_TIMEOUT_MS = 15000
+
+
+# conta mutações dentro de qualquer [role=grid] (inclusive grid trocado)
+GRID_OBSERVER_JS = """
+() => {
+    if (!window.__efpcGrid) {
+        const st = {version: 0};
+        const touchesGrid = (node) => {
+            const el = node.nodeType === 1 ? node : node.parentElement;
+            if (!el) return false;
+            return !!(el.closest('[role="grid"]') || el.querySelector('[role="grid"]'));
+        };
+        new MutationObserver((muts) => {
+            for (const m of muts) {
+                if (touchesGrid(m.target)) {
+                    st.version++;
+                    return;
+                }
+            }
+        }).observe(document, {subtree: true, childList: true, characterData: true});
+        window.__efpcGrid = st;
+    }
+    return window.__efpcGrid.version;
+}
+"""
+
+
+# =========================================================
+# MUDANÇA DO GRID
+# =========================================================
+def grid_version(frame) -> int:
+    """
+    Instala o observer (uma vez por documento) e devolve a versão atual.
+    """
+    try:
+        return frame.evaluate(GRID_OBSERVER_JS)
+    except Exception:
+        return 0
+
+
+def wait_grid_change(frame, old_version: int, timeout_ms=GRID_CHANGE_TIMEOUT_MS) -> bool:
+    """
+    Espera o grid mudar depois de `old_version` (sem polling em Python)
+    e então assentar. False se nada mudou até o timeout.
+    """
+    try:
+        frame.wait_for_function(
+            "(v) => window.__efpcGrid && window.__efpcGrid.version > v",
+            arg=old_version,
+            timeout=timeout_ms,
+        )
+    except PlaywrightTimeout:
+        return False
+
+    wait_until_settled(frame, 1000, "powerbi grid")
+    return True
+
+
+# =========================================================
+# PARTIÇÃO ENTRE PÁGINAS
+# =========================================================
+def run_partitioned(page, options, extract_options, parallelism=SLICER_PARALLELISM, entidade="POWERBI"):
+    """
+    `extract_options(page, opções) -> itens`, com as opções divididas
+    entre páginas paralelas do mesmo relatório (ver browser.pool).
+    """
+    return run_browser_partitioned(
+        page,
+        options,
+        extract_options,
+        parallelism,
+        entidade,
+        # os visuais consultam durante o load
+        prepare_page=install_querydata_capture,
+        min_per_partition=MIN_OPTIONS_PER_PARTITION,
+    )
@@ -2,7 +2,12 @@
 cérebro do crawler: decide e orquestra estratégias de extração
 """
 
+import time
+
 from discovery.patterns import detect_patterns
+from browser.budget import page_budget
+from browser.harvest import harvest_dom
+from browser.settle import wait_until_settled
 from browser.strategies.accordion import run_accordion_strategy
 from browser.strategies.interactive_table import extract_tables
 from browser.strategies.powerbi import extract_powerbi_tables
@@ -13,6 +18,56 @@ from browser.strategies.form_state_machine import (
     detect_form_state_machine,
     run_form_state_machine,
 )
+from state.strategy_memory import get_strategy_memory
+
+
+# ordem padrão da cadeia (accordion não entra: só prepara o DOM)
+STRATEGY_CHAIN = [
+    "powerbi",
+    "form_state",
+    "list_links",
+    "tables",
+    "document_library",
+    "js_pdf_links",
+]
+
+# estratégias que, rendendo, encerram a página
+DOMINANT_STRATEGIES = ("powerbi", "form_state")
+
+
+def plan_strategies(url, logger):
+    """
+    Plano da memória de estratégias para a página (ordem / pulos),
+    compartilhado pelos routers sync e async.
+    """
+    plan = get_strategy_memory().plan(url, STRATEGY_CHAIN)
+
+    if plan.full_probe:
+        logger.info("[STRATEGY] cadeia completa (sem memória ou re-sondagem)")
+    else:
+        logger.info(
+            f"[STRATEGY] ordem aprendida {plan.order}, "
+            f"pulando {sorted(plan.skip) or '-'}"
+        )
+
+    return plan
+
+
+def timed_strategy(page, memory, url, name, fn):
+    """
+    Roda a estratégia dentro do prazo dela e registra itens + tempo
+    na memória. Teto da página já atingido: a estratégia nem começa.
+    `fn` é síncrona (no engine async: sobre o snapshot já colhido).
+    """
+    budget = page_budget(page)
+    if budget.ceiling_reached(name):
+        return []
+
+    start = time.monotonic()
+    with budget.phase(name):
+        items = fn() or []
+    memory.record(url, name, len(items), int((time.monotonic() - start) * 1000))
+    return items
 
 
 def run_strategies(page, logger):
@@ -20,7 +75,62 @@ def run_strategies(page, logger):
     Executa estratégias baseadas em padrões detectados na página.
     Retorna sempre uma lista de itens extraídos (pode ser vazia).
     """
+    memory = get_strategy_memory()
+    url = page.url
+    plan = plan_strategies(url, logger)
+
+    items = _run_chain(page, logger, memory, url, plan)
+    memory.end_page(url, plan, len(items))
+    return items
+
+
+def _run_powerbi(page, logger, memory, url, patterns):
+    """
+    None = Power BI não se aplica nesta página.
+    """
+    if not patterns.is_powerbi:
+        return None
+
+    try:
+        # PDFs explícitos OU endpoints de download
+        download_links = page.locator(
+            "a[href$='.pdf'], "
+            "a[href*='.pdf?'], "
+            "a[href*='/Arquivo/'], "
+            "a[onclick*='Arquivo'], "
+            "a[href*='Download']"
+        )
+
+        if download_links.count() > 0:
+            logger.info(
+                "📄 Links de download detectados — ignorando Power BI nesta página"
+            )
+            return None
+
+    except Exception as e:
+        logger.debug(f"[PowerBI] Falha ao avaliar prioridade: {e}")
+        return None
+
+    logger.info("🚀 Estratégia dominante: Power BI")
+    return timed_strategy(
+        page, memory, url, "powerbi", lambda: extract_powerbi_tables(page, logger)
+    )
+
+
+def _run_form_state(page, logger, memory, url, patterns):
+    try:
+        if not detect_form_state_machine(page):
+            return None
+        logger.warning("🧠 Estratégia: Form State Machine")
+        return timed_strategy(
+            page, memory, url, "form_state", lambda: run_form_state_machine(page, logger)
+        )
+    except Exception as e:
+        logger.debug(f"[FormState] Falha: {e}")
+        return None
 
+
+def _run_chain(page, logger, memory, url, plan):
     extracted_items = []
 
     # ======================================================
@@ -30,56 +140,37 @@ def run_strategies(page, logger):
     logger.info(f"[PATTERNS][INIT] {patterns}")
 
     # ======================================================
-    # 🔥 POWER BI — PRIORIDADE CONDICIONAL (ROBUSTA)
+    # 🔥 POWER BI / 🧠 FORM STATE MACHINE — DOMINANTES
+    # (na ordem aprendida; Power BI aplicável encerra a página,
+    # form state só se render)
     # ======================================================
-    if patterns.is_powerbi:
-
-        try:
-            # PDFs explícitos OU endpoints de download
-            download_links = page.locator(
-                "a[href$='.pdf'], "
-                "a[href*='.pdf?'], "
-                "a[href*='/Arquivo/'], "
-                "a[onclick*='Arquivo'], "
-                "a[href*='Download']"
-            )
+    dominant = {"powerbi": _run_powerbi, "form_state": _run_form_state}
 
-            if download_links.count() > 0:
-                logger.info(
-                    "📄 Links de download detectados — ignorando Power BI nesta página"
-                )
-            else:
-                logger.info("🚀 Estratégia dominante: Power BI")
-                extracted_items.extend(extract_powerbi_tables(page))
-                return extracted_items
+    for name in plan.order:
+        if name not in DOMINANT_STRATEGIES or not plan.allows(name):
+            continue
 
-        except Exception as e:
-            logger.debug(f"[PowerBI] Falha ao avaliar prioridade: {e}")
-
-    # ======================================================
-    # 🧠 FORM STATE MACHINE
-    # ======================================================
-    try:
-        if detect_form_state_machine(page):
-            logger.warning("🧠 Estratégia: Form State Machine")
-            items = run_form_state_machine(page, logger)
-            if items:
-                return items
-    except Exception as e:
-        logger.debug(f"[FormState] Falha: {e}")
+        items = dominant[name](page, logger, memory, url, patterns)
+        if items is None:
+            continue
+        if name == "powerbi" or items:
+            return items
 
     # ======================================================
     # 🔗 LIST LINKS (PDF DIRETO NO HREF)  ← 🔥 NOVA STRATEGY
     # ======================================================
-    try:
-        list_links = extract_list_links(page)
-        if list_links:
-            logger.info(f"[LIST_LINKS] {len(list_links)} links encontrados")
-            extracted_items.extend(list_links)
-            # ❗ NÃO RETORNA — deixa o browser pipeline decidir
+    if plan.allows("list_links"):
+        try:
+            list_links = timed_strategy(
+                page, memory, url, "list_links", lambda: extract_list_links(page)
+            )
+            if list_links:
+                logger.info(f"[LIST_LINKS] {len(list_links)} links encontrados")
+                extracted_items.extend(list_links)
+                # ❗ NÃO RETORNA — deixa o browser pipeline decidir
 
-    except Exception as e:
-        logger.debug(f"[ListLinks] Falha: {e}")
+        except Exception as e:
+            logger.debug(f"[ListLinks] Falha: {e}")
 
     # ======================================================
     # 🔄 REDETECTA PADRÕES
@@ -90,43 +181,65 @@ def run_strategies(page, logger):
     # ======================================================
     # 1️⃣ ACCORDION
     # ======================================================
-    if patterns.has_accordion_years:
+    if patterns.has_accordion_years and not page_budget(page).ceiling_reached("accordion"):
         logger.info("▶️ Estratégia: Accordion")
         try:
-            run_accordion_strategy(page)
-            page.wait_for_timeout(1000)
+            with page_budget(page).phase("accordion"):
+                run_accordion_strategy(page)
+                wait_until_settled(page, 1000, "router accordion", logger=logger)
         except Exception as e:
             logger.debug(f"[Accordion] Falha: {e}")
 
     # ======================================================
-    # 2️⃣ TABELA
+    # 📸 SNAPSHOT ÚNICO DO DOM (pós-accordion)
     # ======================================================
-    if patterns.has_table or patterns.has_dropdown:
-        logger.info("▶️ Estratégia: Tabela interativa")
-        try:
-            extracted_items.extend(extract_tables(page))
-        except Exception as e:
-            logger.debug(f"[Table] Falha: {e}")
+    try:
+        snapshot = harvest_dom(page)
+    except Exception as e:
+        logger.debug(f"[Harvest] Falha: {e}")
+        snapshot = None
+
+    # ======================================================
+    # 2️⃣-4️⃣ ESTRATÉGIAS SOBRE O SNAPSHOT (na ordem aprendida)
+    # ======================================================
+    collectors = {
+        "tables": (
+            patterns.has_table or patterns.has_dropdown,
+            "▶️ Estratégia: Tabela interativa",
+            lambda: extract_tables(page, snapshot),
+        ),
+        "document_library": (
+            patterns.has_document_library,
+            "▶️ Estratégia: Document library",
+            lambda: extract_document_library(page, snapshot),
+        ),
+        "js_pdf_links": (
+            True,
+            None,
+            lambda: extract_js_pdf_links(page, snapshot),
+        ),
+    }
+
+    for name in plan.order:
+        if name not in collectors or not plan.allows(name):
+            continue
+
+        applies, message, fn = collectors[name]
+        if not applies:
+            continue
+
+        if message:
+            logger.info(message)
 
-    # ======================================================
-    # 3️⃣ DOCUMENT LIBRARY
-    # ======================================================
-    if patterns.has_document_library:
-        logger.info("▶️ Estratégia: Document library")
         try:
-            extracted_items.extend(extract_document_library(page))
+            items = timed_strategy(page, memory, url, name, fn)
         except Exception as e:
-            logger.debug(f"[DocumentLibrary] Falha: {e}")
+            logger.debug(f"[{name}] Falha: {e}")
+            continue
 
-    # ======================================================
-    # 4️⃣ JS PDF LINKS
-    # ======================================================
-    try:
-        js_links = extract_js_pdf_links(page)
-        if js_links:
-            logger.info(f"[JS-PDF] {len(js_links)} links encontrados")
-            extracted_items.extend(js_links)
-    except Exception as e:
-        logger.debug(f"[JS-PDF] Falha: {e}")
+        if name == "js_pdf_links" and items:
+            logger.info(f"[JS-PDF] {len(items)} links encontrados")
+
+        extracted_items.extend(items)
 
     return extracted_items
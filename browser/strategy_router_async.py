@@ -0,0 +1,221 @@
+"""
+roteador de estratégias para o engine async: mesma memória de
+estratégias (ordem aprendida, pulos, registro) e mesmas saídas do
+strategy_router, sobre o playwright.async_api.
+Estratégias interativas pesadas (Power BI, form state machine) ficam
+no engine sync: a página é devolvida via NeedsSyncEngine.
+"""
+
+from discovery.patterns import detect_patterns_async
+from browser.budget import page_budget
+from browser.strategy_router import plan_strategies, timed_strategy
+from browser.harvest import harvest_dom_async
+from browser.settle import wait_until_settled_async
+from browser.strategies.accordion import run_accordion_strategy_async
+from browser.strategies.interactive_table import tables_from_snapshot
+from browser.strategies.document_library import document_library_from_snapshot
+from browser.strategies.js_pdf_links import js_pdf_links_from_snapshot
+from browser.strategies.list_links import list_links_from_snapshot
+from browser.strategies.form_state_machine import GENERATE_KEYWORDS
+from state.strategy_memory import StrategyPlan, get_strategy_memory
+
+
+DOWNLOAD_LINKS_SELECTOR = (
+    "a[href$='.pdf'], "
+    "a[href*='.pdf?'], "
+    "a[href*='/Arquivo/'], "
+    "a[onclick*='Arquivo'], "
+    "a[href*='Download']"
+)
+
+# mesmo critério de detect_form_state_machine, num único evaluate
+FORM_STATE_JS = """
+(keywords) => {
+    const visible = (el) => {
+        const r = el.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const selects = Array.from(document.querySelectorAll('select')).filter(visible);
+    if (selects.length < 2) return false;
+
+    const buttons = document.querySelectorAll('button, input[type=submit]');
+    for (const b of buttons) {
+        if (!visible(b)) continue;
+        const t = (b.innerText || '').toLowerCase();
+        if (keywords.some(k => t.includes(k))) return true;
+    }
+    return false;
+}
+"""
+
+
+class NeedsSyncEngine(Exception):
+    """
+    A página precisa de uma estratégia que só existe no engine sync.
+    """
+
+
+async def sync_only_strategy(page, logger, patterns=None, plan=None) -> str | None:
+    """
+    "powerbi" / "form_state" se a página precisa do engine sync, senão
+    None. Chamada logo após o load: a página é repassada antes de
+    qualquer clique ou estratégia rodar aqui. Estratégia que o `plan`
+    da memória pula não força o engine sync.
+    """
+    plan = plan or StrategyPlan()
+    patterns = patterns or await detect_patterns_async(page)
+
+    # ======================================================
+    # 🔥 POWER BI → ENGINE SYNC
+    # ======================================================
+    if patterns.is_powerbi and plan.allows("powerbi"):
+        try:
+            download_links = await page.locator(DOWNLOAD_LINKS_SELECTOR).count()
+        except Exception as e:
+            logger.debug(f"[PowerBI] Falha ao avaliar prioridade: {e}")
+            download_links = 1
+
+        if download_links > 0:
+            logger.info(
+                "📄 Links de download detectados — ignorando Power BI nesta página"
+            )
+        else:
+            return "powerbi"
+
+    # ======================================================
+    # 🧠 FORM STATE MACHINE → ENGINE SYNC
+    # ======================================================
+    if not plan.allows("form_state"):
+        return None
+
+    try:
+        is_form_state = await page.evaluate(FORM_STATE_JS, list(GENERATE_KEYWORDS))
+    except Exception as e:
+        logger.debug(f"[FormState] Falha: {e}")
+        is_form_state = False
+
+    return "form_state" if is_form_state else None
+
+
+async def run_strategies_async(page, logger):
+    """
+    Executa estratégias baseadas em padrões detectados na página.
+    Retorna sempre uma lista de itens extraídos (pode ser vazia).
+    Mesma memória de estratégias do engine sync (plano, registro e
+    fechamento da página).
+    """
+    memory = get_strategy_memory()
+    url = page.url
+    plan = plan_strategies(url, logger)
+
+    items = await _run_chain_async(page, logger, memory, url, plan)
+    memory.end_page(url, plan, len(items))
+    return items
+
+
+async def _run_chain_async(page, logger, memory, url, plan):
+    extracted_items = []
+
+    # ======================================================
+    # 🔍 DETECÇÃO INICIAL
+    # ======================================================
+    patterns = await detect_patterns_async(page)
+    logger.info(f"[PATTERNS][INIT] {patterns}")
+
+    # o load já foi checado; os cliques do engine podem ter revelado
+    # um relatório / formulário (a página fica para o engine sync, que
+    # fecha a página na memória)
+    sync_only = await sync_only_strategy(page, logger, patterns, plan)
+    if sync_only:
+        raise NeedsSyncEngine(sync_only)
+
+    # ======================================================
+    # 🔗 LIST LINKS (PDF DIRETO NO HREF)
+    # ======================================================
+    if plan.allows("list_links"):
+        try:
+            snapshot = await harvest_dom_async(page)
+            list_links = timed_strategy(
+                page, memory, url, "list_links",
+                lambda: list_links_from_snapshot(snapshot),
+            )
+            if list_links:
+                logger.info(f"[LIST_LINKS] {len(list_links)} links encontrados")
+                extracted_items.extend(list_links)
+
+        except Exception as e:
+            logger.debug(f"[ListLinks] Falha: {e}")
+
+    # ======================================================
+    # 🔄 REDETECTA PADRÕES
+    # ======================================================
+    patterns = await detect_patterns_async(page)
+    logger.info(f"[PATTERNS][POST-MENU] {patterns}")
+
+    # ======================================================
+    # 1️⃣ ACCORDION
+    # ======================================================
+    if patterns.has_accordion_years and not page_budget(page).ceiling_reached("accordion"):
+        logger.info("▶️ Estratégia: Accordion")
+        try:
+            with page_budget(page).phase("accordion"):
+                await run_accordion_strategy_async(page)
+                await wait_until_settled_async(
+                    page, 1000, "router accordion", logger=logger
+                )
+        except Exception as e:
+            logger.debug(f"[Accordion] Falha: {e}")
+
+    # ======================================================
+    # 📸 SNAPSHOT ÚNICO DO DOM (pós-accordion)
+    # ======================================================
+    try:
+        snapshot = await harvest_dom_async(page)
+    except Exception as e:
+        logger.debug(f"[Harvest] Falha: {e}")
+        return extracted_items
+
+    # ======================================================
+    # 2️⃣-4️⃣ ESTRATÉGIAS SOBRE O SNAPSHOT (na ordem aprendida)
+    # ======================================================
+    collectors = {
+        "tables": (
+            patterns.has_table or patterns.has_dropdown,
+            "▶️ Estratégia: Tabela interativa",
+            lambda: tables_from_snapshot(snapshot),
+        ),
+        "document_library": (
+            patterns.has_document_library,
+            "▶️ Estratégia: Document library",
+            lambda: document_library_from_snapshot(snapshot),
+        ),
+        "js_pdf_links": (
+            True,
+            None,
+            lambda: js_pdf_links_from_snapshot(snapshot),
+        ),
+    }
+
+    for name in plan.order:
+        if name not in collectors or not plan.allows(name):
+            continue
+
+        applies, message, fn = collectors[name]
+        if not applies:
+            continue
+
+        if message:
+            logger.info(message)
+
+        try:
+            items = timed_strategy(page, memory, url, name, fn)
+        except Exception as e:
+            logger.debug(f"[{name}] Falha: {e}")
+            continue
+
+        if name == "js_pdf_links" and items:
+            logger.info(f"[JS-PDF] {len(items)} links encontrados")
+
+        extracted_items.extend(items)
+
+    return extracted_items
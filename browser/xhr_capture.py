@@ -0,0 +1,120 @@
+"""
+captura das respostas XHR/fetch em JSON que trazem URLs de documentos:
+viram entradas do registro de endpoints (replay HTTP sem browser)
+"""
+
+import threading
+import weakref
+
+from discovery.script_payloads import extract_json_documents
+from state.endpoint_registry import get_endpoint_registry
+
+
+XHR_RESOURCE_TYPES = ("xhr", "fetch")
+
+# respostas maiores que isso não são lista de documentos
+MAX_JSON_BYTES = 5 * 1024 * 1024
+
+_captures = weakref.WeakKeyDictionary()
+_captures_lock = threading.Lock()
+
+
+class XhrCapture:
+    """
+    Guarda as responses JSON da página; os corpos só são lidos em
+    `record_endpoints()`, fora do handler do evento.
+    """
+
+    def __init__(self, page):
+        self._responses = []
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if response.request.resource_type not in XHR_RESOURCE_TYPES:
+            return
+        if response.status != 200:
+            return
+        if "json" not in (response.headers.get("content-type") or "").lower():
+            return
+        self._responses.append(response)
+
+    def record_endpoints(self, source_page: str, logger=None) -> int:
+        """
+        Registra os endpoints cujo JSON trouxe documentos; retorna quantos.
+        """
+        recorded = 0
+
+        responses, self._responses = self._responses, []
+
+        for response in responses:
+            try:
+                if _too_large(response):
+                    continue
+                docs = extract_json_documents(response.json(), response.url)
+            except Exception:
+                # corpo indisponível (página navegou) ou não-JSON
+                continue
+
+            recorded += _record(response, docs, source_page, logger)
+
+        return recorded
+
+    async def record_endpoints_async(self, source_page: str, logger=None) -> int:
+        """
+        `record_endpoints` para páginas do playwright.async_api.
+        """
+        recorded = 0
+
+        responses, self._responses = self._responses, []
+
+        for response in responses:
+            try:
+                if _too_large(response):
+                    continue
+                docs = extract_json_documents(await response.json(), response.url)
+            except Exception:
+                continue
+
+            recorded += _record(response, docs, source_page, logger)
+
+        return recorded
+
+
+def _too_large(response) -> bool:
+    return int(response.headers.get("content-length") or 0) > MAX_JSON_BYTES
+
+
+def _record(response, docs, source_page, logger) -> int:
+    if not docs:
+        return 0
+
+    request = response.request
+    get_endpoint_registry().record(
+        request.method,
+        response.url,
+        request.headers,
+        request.post_data,
+        len(docs),
+        source_page,
+    )
+
+    if logger:
+        logger.info(
+            f"[XHR] Endpoint com {len(docs)} documentos registrado: "
+            f"{request.method} {response.url}"
+        )
+
+    return 1
+
+
+def install_xhr_capture(page) -> XhrCapture:
+    """
+    Chame logo após new_page(): listas costumam chegar durante o load.
+    Serve para páginas sync e async (só registra o listener).
+    """
+    with _captures_lock:
+        capture = _captures.get(page)
+        if capture is None:
+            capture = XhrCapture(page)
+            _captures[page] = capture
+        return capture
@@ -1,6 +1,7 @@
 '''
 modulo para configuracoes do sistema
 '''
+import os
 from pathlib import Path
 
 # diretorios padrao do sistema para salvamento dos docs
@@ -46,4 +47,25 @@ PATH_INTEREST_HINTS = [
     "prestacao",
     "financeiro",
     "governanca",
-]
\ No newline at end of file
+]
+
+# engine do browser fallback: "sync" (threads) ou "async" (event loop)
+# override por execução: EFPC_BROWSER_ENGINE=async python main.py
+# override por seed: "browser_engine"
+BROWSER_ENGINE = os.environ.get("EFPC_BROWSER_ENGINE", "sync")
+
+# arquivo de rede: "off" | "record" (grava) | "replay" (serve do disco)
+# EFPC_ARCHIVE_RUN escolhe a execução gravada (replay: padrão = a mais recente)
+ARCHIVE_DIR = DATA_DIR / "archive"
+ARCHIVE_MODE = os.environ.get("EFPC_ARCHIVE_MODE", "off")
+ARCHIVE_RUN = os.environ.get("EFPC_ARCHIVE_RUN")
+
+# form state machine: quantos períodos (os mais recentes) combinar com
+# todas as opções dos demais selects; 0 = todos (backfill histórico)
+# EFPC_FORM_PERIODS=1 python main.py  -> só o período mais recente
+FORM_PERIOD_LIMIT = int(os.environ.get("EFPC_FORM_PERIODS", "0"))
+
+# re-crawl incremental: páginas sem mudança (lastmod do sitemap, 304,
+# mesmo hash) não são re-parseadas; os links vêm do cache de páginas
+# EFPC_INCREMENTAL=1 python main.py  | override por seed: "incremental"
+INCREMENTAL_CRAWL = os.environ.get("EFPC_INCREMENTAL", "0") == "1"
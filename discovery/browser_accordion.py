@@ -1,7 +1,11 @@
 # discovery/browser_accordion.py
 import re
-import requests
-from playwright.sync_api import sync_playwright
+
+from browser.pool import get_browser_pool
+from browser.routing import install_blocking, profile_for_seed
+from browser.settle import install_settle_tracking, wait_until_settled
+from browser.interception import DocumentInterceptor
+
 
 KEYWORDS = [
     "balancete",
@@ -21,44 +25,20 @@ def crawl_browser_accordion(seed_cfg, state, downloader, storage, logger):
     entidade = seed_cfg.get("entidade", "DESCONHECIDA")
     seed = seed_cfg["seed"]
 
-    session = requests.Session()
-
-    with sync_playwright() as p:
+    with get_browser_pool().lease(entidade, logger=logger) as lease:
         logger.warning(f"[{entidade}] Browser ACCORDION iniciado")
 
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-
-        # 🔹 captura PDFs via XHR / fetch / inline
-        def handle_response(response):
-            ct = response.headers.get("content-type", "").lower()
-            if "pdf" not in ct:
-                return
-
-            try:
-                content = response.body()
-            except Exception:
-                return
-
-            pdf_url = response.url
-
-            logger.info(f"[{entidade}] PDF capturado via browser: {pdf_url}")
-
-            downloader(
-                session=session,
-                url=pdf_url,
-                state=state,
-                source_page=seed,
-                anchor_text="browser_accordion",
-                detected_year=None,
-                entidade=entidade,
-                content_override=content,
-            )
+        page = lease.new_page()
+        install_blocking(page, profile_for_seed(seed_cfg))
+        install_settle_tracking(page)
 
-        page.on("response", handle_response)
+        # 🔹 captura PDFs via XHR / fetch / inline (uma transferência só)
+        lease.on_context(
+            DocumentInterceptor(entidade, state, downloader, logger).install
+        )
 
         page.goto(seed, wait_until="domcontentloaded")
-        page.wait_for_timeout(3000)
+        wait_until_settled(page, 3000, f"{entidade} abertura", logger=logger)
 
         # 🔹 encontra elementos que parecem anos
         year_elements = []
@@ -87,7 +67,7 @@ def crawl_browser_accordion(seed_cfg, state, downloader, storage, logger):
             except Exception:
                 continue
 
-            page.wait_for_timeout(2000)
+            wait_until_settled(page, 2000, f"{entidade} ano {year}", logger=logger)
 
             # 🔹 dentro do ano, clicar em itens relevantes
             for el in page.query_selector_all("a, button"):
@@ -102,11 +82,10 @@ def crawl_browser_accordion(seed_cfg, state, downloader, storage, logger):
                 try:
                     el.scroll_into_view_if_needed()
                     el.click()
-                    page.wait_for_timeout(1500)
+                    wait_until_settled(page, 1500, f"{entidade} item", logger=logger)
                 except Exception:
                     continue
 
-        page.wait_for_timeout(3000)
-        browser.close()
+        wait_until_settled(page, 3000, f"{entidade} final", logger=logger)
 
         logger.warning(f"[{entidade}] Browser ACCORDION finalizado")
@@ -3,17 +3,33 @@ modulo que controla o fallback relacionado a utilizacao de browser no scrapping
 """
 
 import os
+import queue
+import json
 import re
+import threading
+import time
 
-import requests
 from urllib.parse import urljoin, urlparse
-from requests.exceptions import SSLError
 import hashlib
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-
+from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+from browser.budget import PAGE_CEILING_SEC, start_page_budget
+from browser.pool import (
+    PARTITION_WORKERS,
+    PageSetup,
+    get_browser_pool,
+    get_browser_workers,
+    set_page_setup,
+)
+from browser.routing import install_blocking, profile_for_seed
+from browser.interception import DocumentInterceptor
+from browser.settle import install_settle_tracking, wait_until_settled
 from browser.strategy_router import run_strategies
+from browser.strategies.powerbi_capture import install_querydata_capture
+from browser.xhr_capture import install_xhr_capture
 from storage.writer import store
+from downloader.http_client import download_many, get_http_session, sync_browser_context
 from discovery.patterns import detect_patterns
 from config import MIN_YEAR
 
@@ -23,10 +39,37 @@ from config import MIN_YEAR
 # =========================================================
 os.environ["PLAYWRIGHT_BROWSERS_PATH"] = r"D:\playwright-browsers"
 
+# páginas por entidade (override por seed: "browser_max_pages")
 MAX_PAGES = 10
 PAGE_TIMEOUT_MS = 20000
+
+# tempo total do browser por entidade: nenhuma página nova começa depois
+# (override por seed: "browser_time_budget_sec")
+BROWSER_TIME_BUDGET_SEC = 600
+
+# prazo dos laços de clique da página (override por seed: "page_budget_sec");
+# estratégias do router têm prazos próprios (browser.budget), todos
+# limitados ao teto da página (override por seed: "page_ceiling_sec"),
+# que por sua vez não passa de BROWSER_TIME_BUDGET_SEC
 HARD_PAGE_BUDGET_SEC = 25
 
+# páginas processadas em paralelo (override por seed: "browser_concurrency")
+BROWSER_CONCURRENCY = 3
+
+# labels curtos (anos, "+", "ver...") clicados no fim da página
+EXPAND_YEARS_JS = """
+() => {
+    document.querySelectorAll('button, a, div, span').forEach(el => {
+        const t = (el.innerText || '').trim().toLowerCase();
+        if (/^20\\d{2}$/.test(t) || t === '+' || t.includes('ver')) {
+            try { el.click(); } catch(e) {}
+        }
+    });
+}
+"""
+
+HREFS_JS = "els => els.map(e => e.getAttribute('href')).filter(Boolean)"
+
 
 # =========================================================
 # HELPERS
@@ -52,611 +95,813 @@ def normalize_filename(name: str) -> str:
 def short_hash(data: bytes, size=8) -> str:
     return hashlib.sha256(data).hexdigest()[:size]
 
+
+def _new_page_stats() -> dict:
+    return {
+        "pages_visited": 0,
+        "pages_enqueued": 0,
+        "pdfs_download_event": 0,
+        "items_extracted": 0,
+        # PNG / CSV / tabelas / downloads já gravados em execuções anteriores
+        "items_known": 0,
+        "docs_http": 0,
+        "requests_blocked": 0,
+        "bytes_avoided_estimate": 0,
+        "budget_overruns": 0,
+        "xhr_endpoints": 0,
+        "errors": 0,
+    }
+
+
+def _record_route_stats(page_stats: dict, route_stats, logger, entidade, url):
+    page_stats["requests_blocked"] += route_stats.requests_blocked
+    page_stats["bytes_avoided_estimate"] += route_stats.bytes_avoided_estimate
+
+    if route_stats.requests_blocked:
+        logger.info(
+            f"[{entidade}] Bloqueio: {route_stats.requests_blocked} requests evitados "
+            f"(~{route_stats.bytes_avoided_estimate // 1024} KB) "
+            f"{route_stats.by_type} em {url}"
+        )
+
+
 # =========================================================
-# MAIN
+# ESTADO DE UMA EXECUÇÃO (COMPARTILHADO ENTRE WORKERS)
 # =========================================================
-def crawl_browser(seed_cfg, state, pages, downloader, storage, logger):
+class _BrowserRun:
+    def __init__(self, seed_cfg, state, downloader, logger):
+        self.entidade = seed_cfg.get("entidade", "DESCONHECIDA")
+        self.state = state
+        self.downloader = downloader
+        self.logger = logger
+        self.session = get_http_session()
+
+        # =====================================================
+        # 🔒 SEED ANCHOR CONFIG (OPT-IN)
+        # =====================================================
+        self.lock_seed_scope = seed_cfg.get("lock_seed_scope", False)
+        self.seed_anchor_path = seed_cfg.get("seed_anchor_path")
+
+        if self.seed_anchor_path:
+            self.seed_anchor_path = self.seed_anchor_path.lower().rstrip("/")
+
+        self.seed_base_url = seed_cfg["seed"].rstrip("/")
+
+        # imagens / fontes / trackers não chegam a ser baixados
+        self.blocking = profile_for_seed(seed_cfg)
+
+        self.page_budget_sec = seed_cfg.get("page_budget_sec", HARD_PAGE_BUDGET_SEC)
+        self.page_ceiling_sec = seed_cfg.get("page_ceiling_sec", PAGE_CEILING_SEC)
+
+        # orçamento da entidade: páginas (ranqueadas pelo main) e tempo
+        self.max_pages = seed_cfg.get("browser_max_pages", MAX_PAGES)
+        self.deadline = time.monotonic() + seed_cfg.get(
+            "browser_time_budget_sec", BROWSER_TIME_BUDGET_SEC
+        )
+        self.out_of_time = False
+
+        # documentos capturados uma única vez na camada de rede
+        self.interceptor = DocumentInterceptor(
+            self.entidade,
+            state,
+            downloader,
+            logger,
+            mode=seed_cfg.get("interception", "fulfill"),
+        )
 
-    entidade = seed_cfg.get("entidade", "DESCONHECIDA")
-    session = requests.Session()
+        self.frontier = queue.Queue()
+        self.scheduled = set()
+        self.visits = 0
+        self.stats = _new_page_stats()
+        self.claimed = set()
+        self._lock = threading.Lock()
 
-    # =====================================================
-    # 🔒 SEED ANCHOR CONFIG (OPT-IN)
-    # =====================================================
-    lock_seed_scope = seed_cfg.get("lock_seed_scope", False)
-    seed_anchor_path = seed_cfg.get("seed_anchor_path")
+    def accepts(self, url) -> bool:
+        entidade = self.entidade
+        logger = self.logger
+
+        # =====================================================
+        # 🔒 SEED ANCHOR — NÃO BLOQUEAR A PRIMEIRA PÁGINA
+        # =====================================================
+        if self.lock_seed_scope and self.seed_anchor_path:
 
-    if seed_anchor_path:
-        seed_anchor_path = seed_anchor_path.lower().rstrip("/")
+            # ✅ sempre permitir a própria seed
+            if url.rstrip("/") != self.seed_base_url:
 
+                path = urlparse(url).path.lower().rstrip("/")
 
-    with sync_playwright() as p:
-        logger.warning(f"[{entidade}] Iniciando Playwright (STRONG MODE)")
+                if not path.startswith(self.seed_anchor_path):
+                    logger.info(
+                        f"[{entidade}] Browser fora do anchor, ignorando: {url}"
+                    )
+                    return False
+
+        # =====================================================
+        # 🚫 PATCH — NÃO NAVEGAR EM URL DE DOWNLOAD
+        # =====================================================
+        low = url.lower()
+        if any(
+            x in low
+            for x in [
+                ".pdf",
+                "/arquivo/",
+                "/download",
+                "/uploads/",
+                "file=",
+            ]
+        ):
+            logger.info(
+                f"[{entidade}] URL é download direto, pulando browser: {url}"
+            )
+            return False
+
+        # =====================================================
+        # 🌐 FILTRO HTML (AGORA SÓ HTML DE VERDADE CHEGA AQUI)
+        # =====================================================
+        if not is_html_page(url):
+            logger.info(f"[{entidade}] Ignorando URL não-HTML: {url}")
+            return False
+
+        return True
+
+    def enqueue(self, url) -> bool:
+        """
+        Agenda uma página respeitando max_pages (seed + intermediárias).
+        Páginas recusadas por accepts() não consomem o orçamento.
+        """
+        with self._lock:
+            if url in self.scheduled or len(self.scheduled) >= self.max_pages:
+                return False
+
+        if not self.accepts(url):
+            return False
+
+        with self._lock:
+            if url in self.scheduled or len(self.scheduled) >= self.max_pages:
+                return False
+            self.scheduled.add(url)
+
+        self.frontier.put(url)
+        return True
+
+    def claim(self, doc_url) -> bool:
+        """
+        Garante que cada documento seja baixado por um único worker.
+        """
+        with self._lock:
+            if doc_url in self.claimed:
+                return False
+            self.claimed.add(doc_url)
+            return True
+
+    def document_job(self, doc_url, source_page, anchor_text):
+        """
+        Job de download (kwargs do downloader) ou None se o documento
+        já foi baixado / reservado por outro worker.
+        """
+        if doc_url in self.state.visited_files or not self.claim(doc_url):
+            return None
+
+        return {
+            "url": doc_url,
+            "state": self.state,
+            "source_page": source_page,
+            "anchor_text": anchor_text,
+            "detected_year": infer_year(doc_url),
+            "entidade": self.entidade,
+        }
+
+    def page_ceiling(self) -> float:
+        """
+        Teto da página que começa agora: nunca passa do orçamento de
+        tempo da entidade (Power BI / form state não o estouram).
+        """
+        return min(self.page_ceiling_sec, max(0.0, self.deadline - time.monotonic()))
+
+    def next_url(self):
+        if time.monotonic() >= self.deadline:
+            with self._lock:
+                if not self.out_of_time:
+                    self.out_of_time = True
+                    self.logger.warning(
+                        f"[{self.entidade}] Orçamento de tempo do browser esgotado; "
+                        f"{self.frontier.qsize()} páginas não visitadas"
+                    )
+            return None
 
         try:
-            browser = p.chromium.launch(headless=True, timeout=30000)
-        except PlaywrightTimeout:
-            logger.error(f"[{entidade}] Timeout ao iniciar Chromium")
-            return
+            return self.frontier.get_nowait()
+        except queue.Empty:
+            return None
 
-        logger.warning(f"[{entidade}] Chromium iniciado")
+    def next_visit_number(self) -> int:
+        with self._lock:
+            self.visits += 1
+            return self.visits
 
-        context = browser.new_context(accept_downloads=True)
-        page = context.new_page()
+    def merge(self, page_stats: dict):
+        with self._lock:
+            for k, v in page_stats.items():
+                self.stats[k] = self.stats.get(k, 0) + v
 
-        # =========================================================
-        # 📥 DOWNLOAD EVENT
-        # =========================================================
-        def handle_download(download):
-            try:
-                path = download.path()
-                content = path.read_bytes()
 
-                original_name = download.suggested_filename or "arquivo.pdf"
-                original_name = normalize_filename(original_name)
+# =========================================================
+# PROCESSAMENTO DE RESULTADOS (COMUM AOS ENGINES SYNC E ASYNC)
+# =========================================================
+def _register_content(run, content, page_stats) -> bool:
+    """
+    Registra o sha256 do conteúdo no State (mesmo registro do downloader):
+    é o que conta como rendimento do browser. False = já gravado antes.
+    """
+    if isinstance(content, (bytes, bytearray)):
+        data = bytes(content)
+    elif isinstance(content, (str, os.PathLike)) and os.path.isfile(content):
+        with open(content, "rb") as f:
+            data = f.read()
+    else:
+        # tabela / blob desconhecido: hash da forma serializada
+        data = json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+
+    if run.state.save_hash(hashlib.sha256(data).hexdigest()):
+        return True
+
+    page_stats["items_known"] += 1
+    return False
+
+
+def _store_download(run, source_page, download_url, suggested_filename, content, page_stats):
+    entidade = run.entidade
+
+    original_name = suggested_filename or "arquivo.pdf"
+    original_name = normalize_filename(original_name)
+
+    h = short_hash(content)
+    final_name = f"{h}__{original_name}"
+
+    if download_url:
+        run.state.visited_files.add(download_url)
+
+    if not _register_content(run, content, page_stats):
+        return
+
+    run.logger.info(
+        f"[{entidade}] Download capturado via browser: {final_name}"
+    )
+
+    store(
+        entidade=entidade,
+        source_page=source_page,
+        kind="pdf",
+        content=content,
+        meta={
+            "filename": final_name,
+            "original_filename": original_name,
+            "year": infer_year(original_name),
+            "origin": "download_event",
+        },
+    )
+
+    page_stats["pdfs_download_event"] += 1
+
+
+def _route_items(run, items, page_url, plano_nome, queue_document, page_stats):
+    """
+    Destino de cada item das estratégias: PNG/CSV/tabela vão para o
+    storage, PDFs para a fila HTTP e HTML intermediário para o frontier.
+    """
+    entidade = run.entidade
+    state = run.state
+    logger = run.logger
+    lock_seed_scope = run.lock_seed_scope
+    seed_anchor_path = run.seed_anchor_path
+
+    for idx, item in enumerate(items):
+
+        # =====================================================
+        # 🖼️ PNG (Power BI / screenshots)
+        # =====================================================
+        if isinstance(item, dict) and item.get("__kind__") == "png":
+            content = item.get("__path__") or item["__bytes__"]
+            if not _register_content(run, content, page_stats):
+                continue
+            store(
+                entidade=entidade,
+                source_page=page_url,
+                kind="png",
+                # screenshots costurados chegam como arquivo (__path__)
+                content=content,
+                meta={
+                    "filename": item.get("__filename__"),
+                    "strategy": "powerbi",
+                    "plano": plano_nome,
+                    "index": idx,
+                },
+            )
+            continue
+
+        # =====================================================
+        # 📊 CSV (Power BI)
+        # =====================================================
+        if isinstance(item, dict) and "csv_bytes" in item:
+            if not _register_content(run, item["csv_bytes"], page_stats):
+                continue
+            store(
+                entidade=entidade,
+                source_page=page_url,
+                kind="csv",
+                content=item["csv_bytes"],
+                meta={
+                    "filename": item.get("filename"),
+                    "strategy": "powerbi",
+                    "plano": plano_nome,
+                    "index": idx,
+                },
+            )
+            continue
+
+        # =====================================================
+        # 🔗 QUALQUER ITEM COM URL → FAIL-OPEN CONTROLADO
+        # =====================================================
+        if isinstance(item, dict):
+
+            link = (
+                item.get("__url__")
+                or item.get("url")
+                or item.get("href")
+            )
+
+            # ---------------------------------------------
+            # 📄 PDF final → fila HTTP (baixado uma vez só)
+            # ---------------------------------------------
+            if isinstance(link, str) and link.lower().endswith(".pdf"):
+                queue_document(
+                    urljoin(page_url, link),
+                    anchor_text=f"plano:{plano_nome}"
+                    if plano_nome
+                    else item.get("strategy", "document_library"),
+                )
+                continue
 
-                h = short_hash(content)
-                final_name = f"{h}__{original_name}"
+            # ---------------------------------------------
+            # 🧭 HTML intermediário → fila do browser
+            # ---------------------------------------------
+            if isinstance(link, str) and link.startswith("http"):
 
-                if download.url:
-                    state.visited_files.add(download.url)
+                # =====================================================
+                # 🔒 SEED ANCHOR — NÃO REENFILEIRAR FORA DO ESCOPO
+                # =====================================================
+                if lock_seed_scope and seed_anchor_path:
+                    path = urlparse(link).path.lower().rstrip("/")
+                    if not path.startswith(seed_anchor_path):
+                        logger.info(
+                            f"[{entidade}] Link fora do anchor ignorado: {link}"
+                        )
+                        continue
 
-                logger.info(
-                    f"[{entidade}] Download capturado via browser: {final_name}"
-                )
+                if link not in state.visited_pages and run.enqueue(link):
+                    logger.info(
+                        f"[{entidade}] Enfileirando página intermediária: {link}"
+                    )
+                    page_stats["pages_enqueued"] += 1
+                continue
 
-                store(
-                    entidade=entidade,
-                    source_page=page.url,
-                    kind="pdf",
-                    content=content,
-                    meta={
-                        "filename": final_name,
-                        "original_filename": original_name,
-                        "year": infer_year(original_name),
-                        "origin": "download_event",
-                    },
-                )
+        # =====================================================
+        # 📋 Fallback — tabelas / blobs desconhecidos
+        # =====================================================
+        if not _register_content(run, item, page_stats):
+            continue
+
+        store(
+            entidade=entidade,
+            source_page=page_url,
+            kind="table",
+            content=item,
+            meta={
+                "strategy": "auto_detect",
+                "plano": plano_nome,
+                "index": idx,
+            },
+        )
 
-            except Exception as e:
-                logger.error(f"[{entidade}] Erro ao processar download: {e}")
 
-        page.on("download", handle_download)
+def _queue_visible_pdfs(run, url, hrefs, queue_document):
+    """
+    Varredura final dos hrefs visíveis: PDFs ainda não baixados
+    e não anteriores a MIN_YEAR vão para a fila HTTP.
+    """
+    entidade = run.entidade
+    state = run.state
+    logger = run.logger
 
-        # =========================================================
-        # 📡 XHR / FETCH PDF
-        # =========================================================
-        def handle_response(response):
-            try:
-                ct = response.headers.get("content-type", "").lower()
-                if "pdf" not in ct:
-                    return
-
-                pdf_url = response.url
-                if pdf_url in state.visited_files:
-                    return
-
-                body = response.body()
-                if not body or len(body) < 5000:
-                    return
-
-                logger.info(f"[{entidade}] PDF capturado via XHR: {pdf_url}")
-
-                store(
-                    entidade=entidade,
-                    source_page=page.url,
-                    kind="pdf",
-                    content=body,
-                    meta={
-                        "url": pdf_url,
-                        "year": infer_year(pdf_url),
-                        "origin": "xhr",
-                    },
-                )
+    for href in hrefs:
+        if ".pdf" not in href.lower():
+            continue
 
-                state.visited_files.add(pdf_url)
+        pdf_url = urljoin(url, href)
+        if pdf_url in state.visited_files:
+            continue
 
-            except Exception:
-                pass
+        year = infer_year(pdf_url)
+        if year is not None and year < MIN_YEAR:
+            logger.info(
+                f"[{entidade}] Ignorado por data ({year} < {MIN_YEAR}): {pdf_url}"
+            )
+            continue
 
-        page.on("response", handle_response)
+        queue_document(pdf_url, anchor_text="dom_visible")
 
-        # =========================================================
-        # 🪟 POPUP / NOVA ABA
-        # =========================================================
-        def handle_popup(popup):
-            try:
-                popup.wait_for_load_state("domcontentloaded", timeout=10000)
-                pdf_url = popup.url
 
-                if not pdf_url.lower().endswith(".pdf"):
-                    return
+# =========================================================
+# MAIN
+# =========================================================
+def crawl_browser(seed_cfg, state, pages, downloader, storage, logger):
 
-                if pdf_url in state.visited_files:
-                    popup.close()
-                    return
+    run = _BrowserRun(seed_cfg, state, downloader, logger)
+    entidade = run.entidade
 
-                logger.info(f"[{entidade}] PDF capturado via popup: {pdf_url}")
+    # páginas já vêm ranqueadas: enqueue para em max_pages aceitas
+    for url in pages:
+        if not run.enqueue(url) and len(run.scheduled) >= run.max_pages:
+            break
 
-                try:
-                    r = session.get(pdf_url, timeout=20)
-                except SSLError:
-                    r = session.get(pdf_url, timeout=20, verify=False)
-
-                if r.ok and r.content:
-                    store(
-                        entidade=entidade,
-                        source_page=page.url,
-                        kind="pdf",
-                        content=r.content,
-                        meta={
-                            "url": pdf_url,
-                            "year": infer_year(pdf_url),
-                            "origin": "popup",
-                        },
-                    )
+    if run.frontier.empty():
+        logger.warning(f"[{entidade}] Nenhuma página válida para o browser")
+        return run.stats
 
-                    state.visited_files.add(pdf_url)
+    # =====================================================
+    # 🚀 K PÁGINAS EM PARALELO
+    # =====================================================
+    concurrency = seed_cfg.get("browser_concurrency", BROWSER_CONCURRENCY)
+    concurrency = max(1, min(concurrency, run.frontier.qsize()))
+
+    logger.warning(
+        f"[{entidade}] Usando browser fallback STRONG "
+        f"({run.frontier.qsize()} páginas, {concurrency} em paralelo)"
+    )
+
+    if concurrency == 1:
+        _browse_worker(run)
+    else:
+        # + workers livres para as páginas de partição das estratégias
+        workers = get_browser_workers(concurrency + PARTITION_WORKERS)
+        futures = [workers.submit(_browse_worker, run) for _ in range(concurrency)]
+
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"[{entidade}] Worker de browser falhou: {e}")
 
-                popup.close()
-            except Exception:
-                pass
+    run.stats["pdfs_intercepted"] = run.interceptor.captured
+
+    logger.warning(
+        f"[{entidade}] Browser fallback STRONG finalizado | "
+        + " ".join(f"{k}={v}" for k, v in run.stats.items())
+    )
+
+    return run.stats
 
-        page.on("popup", handle_popup)
 
-        # =========================================================
-        # 🚀 LOOP PRINCIPAL
-        # =========================================================
-        logger.warning(
-            f"[{entidade}] Usando browser fallback STRONG ({len(pages)} páginas)"
+def _browse_worker(run):
+    """
+    Consome a fila da execução usando um contexto isolado deste worker.
+    Cada URL ganha uma página nova, com handlers próprios.
+    """
+    entidade = run.entidade
+
+    # Chromium compartilhado: só o contexto é exclusivo da entidade
+    try:
+        lease = get_browser_pool().lease(
+            entidade, logger=run.logger, accept_downloads=True
         )
+    except PlaywrightTimeout:
+        run.logger.error(f"[{entidade}] Timeout ao iniciar Chromium")
+        return
+
+    # páginas de partição das estratégias (pool.run_partitioned) recebem
+    # o mesmo contexto: downloads, interceptador e bloqueio de recursos
+    setup = PageSetup(
+        context_kwargs={"accept_downloads": True},
+        context_hooks=[run.interceptor.install],
+        page_hooks=[lambda p: install_blocking(p, run.blocking)],
+        logger=run.logger,
+    )
+
+    with lease:
+        lease.on_context(run.interceptor.install)
+
+        while True:
+            url = run.next_url()
+            if url is None:
+                break
+
+            page = lease.new_page()
+            set_page_setup(page, setup)
+            install_settle_tracking(page)
+            install_querydata_capture(page)
+            install_xhr_capture(page)
+            try:
+                run.merge(_process_page(run, page, url))
+            except Exception as e:
+                run.logger.error(f"[{entidade}] Erro no browser em {url}: {e}")
+                run.merge({"errors": 1})
+            finally:
+                try:
+                    page.close()
+                except Exception:
+                    pass
 
-        seed_base_url = seed_cfg["seed"].rstrip("/")
 
-        for i, url in enumerate(pages[:MAX_PAGES]):
+# =========================================================
+# UMA PÁGINA
+# =========================================================
+def _process_page(run, page, url) -> dict:
+    entidade = run.entidade
+    state = run.state
+    session = run.session
+    downloader = run.downloader
+    logger = run.logger
+
+    page_stats = _new_page_stats()
+    route_stats = install_blocking(page, run.blocking)
+
+    budget = start_page_budget(
+        page, run.page_budget_sec, label=url, ceiling=run.page_ceiling()
+    )
+
+    # documentos achados nesta página: baixados no fim, via HTTP
+    doc_jobs = []
+
+    def queue_document(doc_url, anchor_text):
+        job = run.document_job(doc_url, page.url, anchor_text)
+        if job:
+            doc_jobs.append(job)
+
+    # =========================================================
+    # 📥 DOWNLOAD EVENT
+    # =========================================================
+    def handle_download(download):
+        try:
+            # corpo já capturado pelo interceptador (mesmo response)
+            if download.url in state.visited_files:
+                download.cancel()
+                return
+
+            _store_download(
+                run,
+                page.url,
+                download.url,
+                download.suggested_filename,
+                download.path().read_bytes(),
+                page_stats,
+            )
+
+        except Exception as e:
+            logger.error(f"[{entidade}] Erro ao processar download: {e}")
+
+    page.on("download", handle_download)
+
+    # =========================================================
+    # 🪟 POPUP / NOVA ABA
+    # =========================================================
+    # o documento do popup já passou pelo DocumentInterceptor do contexto;
+    # aqui só fechamos a aba para não acumular páginas
+    def handle_popup(popup):
+        try:
+            popup.wait_for_load_state("domcontentloaded", timeout=10000)
+            pdf_url = popup.url
 
-            # =====================================================
-            # 🔒 SEED ANCHOR — NÃO BLOQUEAR A PRIMEIRA PÁGINA
-            # =====================================================
-            if lock_seed_scope and seed_anchor_path:
+            if not pdf_url.lower().endswith(".pdf"):
+                return
 
-                # ✅ sempre permitir a própria seed
-                if url.rstrip("/") != seed_base_url:
+            if pdf_url not in state.visited_files:
+                logger.info(f"[{entidade}] Popup de PDF não interceptado: {pdf_url}")
 
-                    path = urlparse(url).path.lower().rstrip("/")
+            popup.close()
+        except Exception:
+            pass
 
-                    if not path.startswith(seed_anchor_path):
-                        logger.info(
-                            f"[{entidade}] Browser fora do anchor, ignorando: {url}"
-                        )
-                        continue
+    page.on("popup", handle_popup)
 
-            # =====================================================
-            # 🚫 PATCH — NÃO NAVEGAR EM URL DE DOWNLOAD
-            # =====================================================
-            low = url.lower()
-            if any(
-                x in low
-                for x in [
-                    ".pdf",
-                    "/arquivo/",
-                    "/download",
-                    "/uploads/",
-                    "file=",
-                ]
-            ):
-                logger.info(
-                    f"[{entidade}] URL é download direto, pulando browser: {url}"
-                )
-                continue
+    # =========================================================
+    # 🌐 NAVEGAÇÃO
+    # =========================================================
+    logger.info(
+        f"[{entidade}] Browser visitando ({run.next_visit_number()}/{run.max_pages}): {url}"
+    )
 
-            # =====================================================
-            # 🌐 FILTRO HTML (AGORA SÓ HTML DE VERDADE CHEGA AQUI)
-            # =====================================================
-            if not is_html_page(url):
-                logger.info(f"[{entidade}] Ignorando URL não-HTML: {url}")
-                continue
+    try:
+        page.goto(url, wait_until="domcontentloaded", timeout=PAGE_TIMEOUT_MS)
+    except PlaywrightTimeout:
+        _record_route_stats(page_stats, route_stats, logger, entidade, url)
+        return page_stats
 
-            logger.info(f"[{entidade}] Browser visitando ({i+1}/{MAX_PAGES}): {url}")
+    page_stats["pages_visited"] += 1
 
-            try:
-                page.goto(url, wait_until="domcontentloaded", timeout=PAGE_TIMEOUT_MS)
-            except PlaywrightTimeout:
-                continue
-            
-            try:
-                page.wait_for_selector("body", timeout=5000)
-            except PlaywrightTimeout:
-                pass
-            
-            # =====================================================
-            # 🔓 PATCH A — EXPANDIR TODOS OS ACCORDIONS (ANO / MÊS)
-            # =====================================================
-            try:
-                accordion_buttons = page.locator(
-                    "button[aria-expanded='false'], "
-                    ".accordion-button.collapsed, "
-                    "[role='button'][aria-expanded='false']"
-                )
+    try:
+        page.wait_for_selector("body", timeout=5000)
+    except PlaywrightTimeout:
+        pass
 
-                for idx in range(accordion_buttons.count()):
-                    btn = accordion_buttons.nth(idx)
-                    try:
-                        if btn.is_visible():
-                            btn.click()
-                            page.wait_for_timeout(600)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+    patterns = None
 
-            # =====================================================
-            # 🧭 PATCH — LOAD MORE / VER MAIS (SMART)
-            # =====================================================
+    # =====================================================
+    # 🔓 PATCH A — EXPANDIR TODOS OS ACCORDIONS (ANO / MÊS)
+    # =====================================================
+    try:
+        accordion_buttons = page.locator(
+            "button[aria-expanded='false'], "
+            ".accordion-button.collapsed, "
+            "[role='button'][aria-expanded='false']"
+        )
+
+        for idx in range(accordion_buttons.count()):
+            if budget.expired("accordions"):
+                break
+            btn = accordion_buttons.nth(idx)
             try:
-                # 1️⃣ Se já existem PDFs visíveis, NÃO clicar
-                existing_pdfs = page.locator("a[href*='.pdf' i]")
-                if existing_pdfs.count() > 0:
-                    logger.info(
-                        f"[{entidade}] PDFs já visíveis ({existing_pdfs.count()}), ignorando 'Ver mais'"
-                    )
-                else:
-                    for _ in range(5):  # limite de segurança menor
-                        btn = page.locator(
-                            "main button:has-text('Ver mais'), "
-                            "article button:has-text('Ver mais'), "
-                            "section button:has-text('Ver mais')"
-                        )
+                if btn.is_visible():
+                    btn.click()
+                    wait_until_settled(page, 600, f"{entidade} accordion", logger=logger)
+            except Exception:
+                pass
+    except Exception:
+        pass
 
-                        if btn.count() == 0:
-                            break
+    # =====================================================
+    # 🧭 PATCH — LOAD MORE / VER MAIS (SMART)
+    # =====================================================
+    try:
+        # 1️⃣ Se já existem PDFs visíveis, NÃO clicar
+        existing_pdfs = page.locator("a[href*='.pdf' i]")
+        if existing_pdfs.count() > 0:
+            logger.info(
+                f"[{entidade}] PDFs já visíveis ({existing_pdfs.count()}), ignorando 'Ver mais'"
+            )
+        else:
+            for _ in range(5):  # limite de segurança menor
+                if budget.expired("ver mais"):
+                    break
+                btn = page.locator(
+                    "main button:has-text('Ver mais'), "
+                    "article button:has-text('Ver mais'), "
+                    "section button:has-text('Ver mais')"
+                )
 
-                        b = btn.first
-                        if not b.is_visible():
-                            break
+                if btn.count() == 0:
+                    break
 
-                        # 2️⃣ Snapshot antes do clique
-                        before = page.locator("a[href*='.pdf' i]").count()
+                b = btn.first
+                if not b.is_visible():
+                    break
 
-                        logger.info(f"[{entidade}] Clicando em 'Ver mais' contextual")
-                        b.click()
-                        page.wait_for_timeout(1200)
+                # 2️⃣ Snapshot antes do clique
+                before = page.locator("a[href*='.pdf' i]").count()
 
-                        # 3️⃣ Snapshot depois
-                        after = page.locator("a[href*='.pdf' i]").count()
+                logger.info(f"[{entidade}] Clicando em 'Ver mais' contextual")
+                b.click()
+                wait_until_settled(page, 1200, f"{entidade} ver mais", logger=logger)
 
-                        # 4️⃣ Se não liberou nada novo → para
-                        if after <= before:
-                            logger.info(
-                                f"[{entidade}] 'Ver mais' não liberou novos PDFs, parando"
-                            )
-                            break
+                # 3️⃣ Snapshot depois
+                after = page.locator("a[href*='.pdf' i]").count()
 
-            except Exception:
-                pass
+                # 4️⃣ Se não liberou nada novo → para
+                if after <= before:
+                    logger.info(
+                        f"[{entidade}] 'Ver mais' não liberou novos PDFs, parando"
+                    )
+                    break
 
-            # =====================================================
-            # 🧭 PATCH — ATIVAR TODAS AS TABS VISÍVEIS
-            # =====================================================
-            try:
-                tabs = page.locator("ul.nav-tabs a, .nav-tabs a, [role='tab']")
-                for t in range(tabs.count()):
-                    tab = tabs.nth(t)
-                    try:
-                        if tab.is_visible():
-                            logger.info(
-                                f"[{entidade}] Ativando tab: {(tab.inner_text() or '').strip()}"
-                            )
-                            tab.click()
-                            page.wait_for_timeout(800)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+    except Exception:
+        pass
 
-            # =====================================================
-            # 🧭 PATCH — MENU LATERAL (SPA / SIDEBAR)
-            # =====================================================
+    # =====================================================
+    # 🧭 PATCH — ATIVAR TODAS AS TABS VISÍVEIS
+    # =====================================================
+    try:
+        tabs = page.locator("ul.nav-tabs a, .nav-tabs a, [role='tab']")
+        for t in range(tabs.count()):
+            if budget.expired("tabs"):
+                break
+            tab = tabs.nth(t)
             try:
-                # só tenta se ainda NÃO existem PDFs visíveis
-                if page.locator("a[href*='.pdf' i]").count() == 0:
-
-                    sidebar_links = page.locator("aside a:visible, nav a:visible")
-
-                    for i in range(sidebar_links.count()):
-                        el = sidebar_links.nth(i)
-                        try:
-                            text = (el.inner_text() or "").strip().lower()
-
-                            if "demonstrativo de investimentos" in text:
-                                logger.warning(
-                                    f"[{entidade}] Ativando menu lateral SPA: {text}"
-                                )
-                                el.click()
-                                page.wait_for_timeout(2000)
-                                break
-
-                        except Exception:
-                            pass
+                if tab.is_visible():
+                    logger.info(
+                        f"[{entidade}] Ativando tab: {(tab.inner_text() or '').strip()}"
+                    )
+                    tab.click()
+                    wait_until_settled(page, 800, f"{entidade} tab", logger=logger)
             except Exception:
                 pass
+    except Exception:
+        pass
 
-            # =====================================================
-            # 🧠 PIPELINE DE EXTRAÇÃO (COM ROTEAMENTO MULTIPREV)
-            # =====================================================
-            try:
-                patterns = detect_patterns(page)
-                logger.warning(f"[{entidade}] PATTERNS DETECTADOS: {patterns}")
-
-                def run_pipeline_for_plan(plano_nome):
-                    items = run_strategies(page, logger)
-
-                    # =====================================================
-                    # 📚 DOCUMENT LIBRARY — DISPARO VIA BROWSER + FALLBACK
-                    # =====================================================
-                    for item in items:
-                        if not isinstance(item, dict):
-                            continue
-
-                        url = item.get("__url__") or item.get("url")
-                        if not isinstance(url, str):
-                            continue
-
-                        if not url.lower().endswith(".pdf"):
-                            continue
-
-                        logger.info(f"[{entidade}] Disparando download (document_library): {url}")
-
-                        # -------------------------------------------------
-                        # 1️⃣ TENTATIVA PRINCIPAL — browser CONTROLADO
-                        # -------------------------------------------------
-                        try:
-                            with page.expect_download(timeout=20000) as download_info:
-                                page.evaluate("(url) => window.open(url, '_blank')", url)
-
-                            download = download_info.value
-
-                            path = download.path()
-                            content = path.read_bytes()
-
-                            original_name = (
-                                download.suggested_filename
-                                or url.split("/")[-1]
-                                or "arquivo.pdf"
-                            )
-                            original_name = normalize_filename(original_name)
-
-                            h = short_hash(content)
-                            final_name = f"{h}__{original_name}"
-
-                            store(
-                                entidade=entidade,
-                                source_page=page.url,
-                                kind="pdf",
-                                content=content,
-                                meta={
-                                    "filename": final_name,
-                                    "original_filename": original_name,
-                                    "url": url,
-                                    "year": infer_year(original_name) or infer_year(url),
-                                    "origin": "document_library_browser",
-                                },
-                            )
-
-                            state.visited_files.add(url)
-
-                            logger.info(
-                                f"[{entidade}] Download concluído via browser controlado: {final_name}"
-                            )
-
-                            continue
-
-                        except Exception as e:
-                            logger.warning(
-                                f"[{entidade}] Browser download falhou, usando fallback: {e}"
-                            )
-
-                        # -------------------------------------------------
-                        # 2️⃣ FALLBACK — requests/downloader
-                        # -------------------------------------------------
-                        logger.info(f"[{entidade}] Fallback downloader (document_library): {url}")
-
-                        downloader(
-                            session=session,
-                            url=url,
-                            state=state,
-                            source_page=page.url,
-                            anchor_text="document_library",
-                            detected_year=infer_year(url),
-                            entidade=entidade,
-                        )
+    # =====================================================
+    # 🧭 PATCH — MENU LATERAL (SPA / SIDEBAR)
+    # =====================================================
+    try:
+        # só tenta se ainda NÃO existem PDFs visíveis
+        if page.locator("a[href*='.pdf' i]").count() == 0:
 
-                        # 🧘‍♂️ throttle leve entre downloads
-                        page.wait_for_timeout(700)
-
-                    for idx, item in enumerate(items):
-
-                        # =====================================================
-                        # 🖼️ PNG (Power BI / screenshots)
-                        # =====================================================
-                        if isinstance(item, dict) and item.get("__kind__") == "png":
-                            store(
-                                entidade=entidade,
-                                source_page=page.url,
-                                kind="png",
-                                content=item["__bytes__"],
-                                meta={
-                                    "filename": item.get("__filename__"),
-                                    "strategy": "powerbi",
-                                    "plano": plano_nome,
-                                    "index": idx,
-                                },
-                            )
-                            continue
-
-                        # =====================================================
-                        # 📊 CSV (Power BI)
-                        # =====================================================
-                        if isinstance(item, dict) and "csv_bytes" in item:
-                            store(
-                                entidade=entidade,
-                                source_page=page.url,
-                                kind="csv",
-                                content=item["csv_bytes"],
-                                meta={
-                                    "filename": item.get("filename"),
-                                    "strategy": "powerbi",
-                                    "plano": plano_nome,
-                                    "index": idx,
-                                },
-                            )
-                            continue
-
-                        # =====================================================
-                        # 🔗 QUALQUER ITEM COM URL → FAIL-OPEN CONTROLADO
-                        # =====================================================
-                        if isinstance(item, dict):
-
-                            link = (
-                                item.get("__url__")
-                                or item.get("url")
-                                or item.get("href")
-                            )
-
-                            if isinstance(link, str) and link.startswith("http"):
-
-                                if not link.lower().endswith(".pdf"):
-
-                                    # =====================================================
-                                    # 🔒 SEED ANCHOR — NÃO REENFILEIRAR FORA DO ESCOPO
-                                    # =====================================================
-                                    if lock_seed_scope and seed_anchor_path:
-                                        path = urlparse(link).path.lower().rstrip("/")
-                                        if not path.startswith(seed_anchor_path):
-                                            logger.info(
-                                                f"[{entidade}] Link fora do anchor ignorado: {link}"
-                                            )
-                                            continue
-
-                                    if link not in state.visited_pages:
-                                        logger.info(
-                                            f"[{entidade}] Enfileirando página intermediária: {link}"
-                                        )
-                                        state.pages.append(link)
-                                    continue
-
-                                # ---------------------------------------------
-                                # 📄 PDF final → downloader
-                                # ---------------------------------------------
-                                downloader(
-                                    session=session,
-                                    url=link,
-                                    state=state,
-                                    source_page=page.url,
-                                    anchor_text=f"plano:{plano_nome}"
-                                    if plano_nome
-                                    else "document_library",
-                                    detected_year=infer_year(link),
-                                    entidade=entidade,
-                                )
-                                continue
-
-                        # =====================================================
-                        # 📋 Fallback — tabelas / blobs desconhecidos
-                        # =====================================================
-                        store(
-                            entidade=entidade,
-                            source_page=page.url,
-                            kind="table",
-                            content=item,
-                            meta={
-                                "strategy": "auto_detect",
-                                "plano": plano_nome,
-                                "index": idx,
-                            },
-                        )
+            sidebar_links = page.locator("aside a:visible, nav a:visible")
 
-                run_pipeline_for_plan(plano_nome=None)
+            for i in range(sidebar_links.count()):
+                if budget.expired("menu lateral"):
+                    break
+                el = sidebar_links.nth(i)
+                try:
+                    text = (el.inner_text() or "").strip().lower()
 
-            except Exception as e:
-                logger.debug(f"[{entidade}] Erro ao rodar pipeline: {e}")
-
-            # =====================================================
-            # EXPANSÕES E CLIQUES FINAIS
-            # =====================================================
-            if not patterns.has_document_library and patterns.has_popup_links:
-                page.evaluate(
-                    """
-                    () => {
-                        document.querySelectorAll('button, a, div, span').forEach(el => {
-                            const t = (el.innerText || '').trim().toLowerCase();
-                            if (/^20\\d{2}$/.test(t) || t === '+' || t.includes('ver')) {
-                                try { el.click(); } catch(e) {}
-                            }
-                        });
-                    }
-                    """
-                )
+                    if "demonstrativo de investimentos" in text:
+                        logger.warning(
+                            f"[{entidade}] Ativando menu lateral SPA: {text}"
+                        )
+                        el.click()
+                        wait_until_settled(page, 2000, f"{entidade} menu lateral", logger=logger)
+                        break
 
-                try:
-                    buttons = page.locator("button:visible, a:visible")
-                    for j in range(buttons.count()):
-                        el = buttons.nth(j)
-                        text = (el.inner_text() or "").lower()
-                        if "download" in text or "baixar" in text or "visualizar" in text:
-                            try:
-                                el.click()
-                                page.wait_for_timeout(800)
-                            except Exception:
-                                pass
                 except Exception:
                     pass
+    except Exception:
+        pass
 
-            # =====================================================
-            # 🔒 COLETAR HREFS VISÍVEIS (SNAPSHOT SEGURO)
-            # =====================================================
-            try:
-                hrefs = page.eval_on_selector_all(
-                    "a:visible",
-                    "els => els.map(e => e.getAttribute('href')).filter(Boolean)"
-                )
-            except Exception:
-                hrefs = []
+    # =====================================================
+    # 🧠 PIPELINE DE EXTRAÇÃO (COM ROTEAMENTO MULTIPREV)
+    # =====================================================
+    try:
+        patterns = detect_patterns(page)
+        logger.warning(f"[{entidade}] PATTERNS DETECTADOS: {patterns}")
 
-            for href in hrefs:
-                if ".pdf" not in href.lower():
-                    continue
+        def run_pipeline_for_plan(plano_nome):
+            items = run_strategies(page, logger)
+            page_stats["items_extracted"] += len(items)
 
-                pdf_url = urljoin(url, href)
-                if pdf_url in state.visited_files:
-                    continue
+            _route_items(run, items, page.url, plano_nome, queue_document, page_stats)
 
-                try:
-                    r = session.get(pdf_url, timeout=20)
-                except SSLError:
-                    r = session.get(pdf_url, timeout=20, verify=False)
+        run_pipeline_for_plan(plano_nome=None)
 
-                if not r.ok or not r.content:
-                    continue
+    except Exception as e:
+        logger.debug(f"[{entidade}] Erro ao rodar pipeline: {e}")
 
-                year = infer_year(pdf_url)
-                if year is not None and year < MIN_YEAR:
-                    logger.info(
-                        f"[{entidade}] Ignorado por data ({year} < {MIN_YEAR}): {pdf_url}"
-                    )
-                    continue
-
-                downloader(
-                    session=session,
-                    url=pdf_url,
-                    state=state,
-                    source_page=page.url,
-                    anchor_text="dom_visible",
-                    detected_year=year,
-                    entidade=entidade,
-                )
+    # =====================================================
+    # EXPANSÕES E CLIQUES FINAIS
+    # =====================================================
+    if (
+        patterns
+        and not patterns.has_document_library
+        and patterns.has_popup_links
+        and not budget.expired("cliques finais")
+    ):
+        page.evaluate(EXPAND_YEARS_JS)
+
+        try:
+            buttons = page.locator("button:visible, a:visible")
+            for j in range(buttons.count()):
+                if budget.expired("cliques finais"):
+                    break
+                el = buttons.nth(j)
+                text = (el.inner_text() or "").lower()
+                if "download" in text or "baixar" in text or "visualizar" in text:
+                    try:
+                        el.click()
+                        wait_until_settled(page, 800, f"{entidade} clique download", logger=logger)
+                    except Exception:
+                        pass
+        except Exception:
+            pass
+
+    # =====================================================
+    # 🔒 COLETAR HREFS VISÍVEIS (SNAPSHOT SEGURO)
+    # =====================================================
+    try:
+        hrefs = page.eval_on_selector_all("a:visible", HREFS_JS)
+    except Exception:
+        hrefs = []
+
+    _queue_visible_pdfs(run, url, hrefs, queue_document)
+
+    # =====================================================
+    # 📥 DOCUMENTOS → HTTP (UMA VEZ, EM PARALELO, COM COOKIES DO BROWSER)
+    # =====================================================
+    if doc_jobs:
+        sync_browser_context(page.context, session)
+
+        logger.info(
+            f"[{entidade}] Baixando {len(doc_jobs)} documentos via HTTP "
+            f"(cookies do browser): {page.url}"
+        )
+
+        download_many(doc_jobs, downloader, session, logger=logger)
+        page_stats["docs_http"] += len(doc_jobs)
+
+    # =====================================================
+    # 🔁 ENDPOINTS XHR COM DOCUMENTOS → REPLAY HTTP (crawl)
+    # =====================================================
+    page_stats["xhr_endpoints"] += install_xhr_capture(page).record_endpoints(
+        url, logger
+    )
 
-                state.visited_files.add(pdf_url)
+    _record_route_stats(page_stats, route_stats, logger, entidade, url)
+    page_stats["budget_overruns"] += len(budget.overruns)
 
-        logger.warning(f"[{entidade}] Browser fallback STRONG finalizado")
-        browser.close()
+    return page_stats
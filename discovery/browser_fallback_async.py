@@ -0,0 +1,491 @@
+"""
+engine async do browser fallback (playwright.async_api): mesmas entradas
+e saídas de crawl_browser, com as páginas da seed processadas por
+corrotinas concorrentes num único Chromium. Handlers de download/popup
+rodam como tasks e o trabalho de disco/HTTP sai do event loop.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+from browser.budget import start_page_budget
+from browser.pool_async import get_async_engine
+from browser.routing import install_blocking_async
+from browser.settle import install_settle_tracking, wait_until_settled_async
+from browser.xhr_capture import install_xhr_capture
+from browser.strategy_router import STRATEGY_CHAIN
+from browser.strategy_router_async import (
+    NeedsSyncEngine,
+    run_strategies_async,
+    sync_only_strategy,
+)
+from state.strategy_memory import get_strategy_memory
+from downloader.http_client import apply_browser_cookies, download_many
+from discovery.patterns import detect_patterns_async
+from discovery.browser_fallback import (
+    BROWSER_CONCURRENCY,
+    EXPAND_YEARS_JS,
+    HREFS_JS,
+    PAGE_TIMEOUT_MS,
+    _BrowserRun,
+    _new_page_stats,
+    _queue_visible_pdfs,
+    _record_route_stats,
+    _route_items,
+    _store_download,
+    crawl_browser,
+)
+
+
+# =========================================================
+# MAIN
+# =========================================================
+def crawl_browser_async(seed_cfg, state, pages, downloader, storage, logger):
+    """
+    Mesma assinatura e mesmo retorno (stats) de crawl_browser.
+    Páginas que pedem Power BI / form state machine são repassadas
+    ao engine sync no fim.
+    """
+    run = _BrowserRun(seed_cfg, state, downloader, logger)
+    entidade = run.entidade
+
+    for url in pages:
+        if not run.enqueue(url) and len(run.scheduled) >= run.max_pages:
+            break
+
+    if run.frontier.empty():
+        logger.warning(f"[{entidade}] Nenhuma página válida para o browser")
+        return run.stats
+
+    concurrency = seed_cfg.get("browser_concurrency", BROWSER_CONCURRENCY)
+    concurrency = max(1, concurrency)
+
+    logger.warning(
+        f"[{entidade}] Usando browser fallback ASYNC "
+        f"({run.frontier.qsize()} páginas, até {concurrency} em paralelo)"
+    )
+
+    deferred = get_async_engine().run(_crawl(run, concurrency))
+
+    run.stats["pdfs_intercepted"] = run.interceptor.captured
+
+    # =====================================================
+    # 🔁 PÁGINAS QUE SÓ O ENGINE SYNC SABE TRATAR
+    # =====================================================
+    if deferred:
+        logger.warning(
+            f"[{entidade}] {len(deferred)} páginas repassadas ao engine sync: {deferred}"
+        )
+
+        # o sync gasta só o que sobrou do orçamento de tempo da entidade
+        sync_stats = crawl_browser(
+            {
+                **seed_cfg,
+                "browser_concurrency": 1,
+                "browser_time_budget_sec": max(0.0, run.deadline - time.monotonic()),
+            },
+            state,
+            deferred,
+            downloader,
+            storage,
+            logger,
+        )
+
+        for k, v in sync_stats.items():
+            run.stats[k] = run.stats.get(k, 0) + v
+
+    logger.warning(
+        f"[{entidade}] Browser fallback ASYNC finalizado | "
+        + " ".join(f"{k}={v}" for k, v in run.stats.items())
+    )
+
+    return run.stats
+
+
+async def _crawl(run, concurrency) -> list:
+    pool = get_async_engine().get_pool()
+    deferred = []
+
+    try:
+        async with pool.lease(
+            run.entidade, logger=run.logger, accept_downloads=True
+        ) as lease:
+            await lease.on_context(run.interceptor.install_async)
+
+            # páginas intermediárias entram no frontier durante o crawl:
+            # cada worker sai quando a fila esvazia e ninguém mais está ativo
+            active = {"n": 0}
+
+            async def worker():
+                while True:
+                    url = run.next_url()
+
+                    if url is None:
+                        if active["n"] == 0:
+                            return
+                        await asyncio.sleep(0.05)
+                        continue
+
+                    active["n"] += 1
+                    try:
+                        await _browse_url(run, lease, url, deferred)
+                    finally:
+                        active["n"] -= 1
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    except PlaywrightTimeout:
+        run.logger.error(f"[{run.entidade}] Timeout ao iniciar Chromium")
+
+    return deferred
+
+
+async def _browse_url(run, lease, url, deferred):
+    page = await lease.new_page()
+    install_settle_tracking(page)
+    install_xhr_capture(page)
+
+    try:
+        run.merge(await _process_page(run, page, url))
+    except NeedsSyncEngine as e:
+        run.logger.info(f"[{run.entidade}] Estratégia {e} → engine sync: {url}")
+        deferred.append(url)
+    except Exception as e:
+        run.logger.error(f"[{run.entidade}] Erro no browser em {url}: {e}")
+        run.merge({"errors": 1})
+    finally:
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+
+# =========================================================
+# UMA PÁGINA
+# =========================================================
+async def _process_page(run, page, url) -> dict:
+    entidade = run.entidade
+    state = run.state
+    logger = run.logger
+
+    page_stats = _new_page_stats()
+    route_stats = await install_blocking_async(page, run.blocking)
+
+    # mesmos prazos do engine sync: laços de clique, esperas e teto
+    budget = start_page_budget(
+        page, run.page_budget_sec, label=url, ceiling=run.page_ceiling()
+    )
+
+    doc_jobs = []
+    handler_tasks = set()
+
+    def queue_document(doc_url, anchor_text):
+        job = run.document_job(doc_url, page.url, anchor_text)
+        if job:
+            doc_jobs.append(job)
+
+    def spawn(coro):
+        task = asyncio.ensure_future(coro)
+        handler_tasks.add(task)
+        task.add_done_callback(handler_tasks.discard)
+
+    # =========================================================
+    # 📥 DOWNLOAD EVENT
+    # =========================================================
+    async def handle_download(download):
+        try:
+            if download.url in state.visited_files:
+                await download.cancel()
+                return
+
+            path = await download.path()
+            content = await asyncio.to_thread(Path(path).read_bytes)
+
+            # contador local: page_stats só é alterado no event loop
+            counts = {"pdfs_download_event": 0, "items_known": 0}
+            await asyncio.to_thread(
+                _store_download,
+                run,
+                page.url,
+                download.url,
+                download.suggested_filename,
+                content,
+                counts,
+            )
+            page_stats["pdfs_download_event"] += counts["pdfs_download_event"]
+            page_stats["items_known"] += counts["items_known"]
+
+        except Exception as e:
+            logger.error(f"[{entidade}] Erro ao processar download: {e}")
+
+    page.on("download", lambda d: spawn(handle_download(d)))
+
+    # =========================================================
+    # 🪟 POPUP / NOVA ABA
+    # =========================================================
+    async def handle_popup(popup):
+        try:
+            await popup.wait_for_load_state("domcontentloaded", timeout=10000)
+            pdf_url = popup.url
+
+            if not pdf_url.lower().endswith(".pdf"):
+                return
+
+            if pdf_url not in state.visited_files:
+                logger.info(f"[{entidade}] Popup de PDF não interceptado: {pdf_url}")
+
+            await popup.close()
+        except Exception:
+            pass
+
+    page.on("popup", lambda p: spawn(handle_popup(p)))
+
+    # =========================================================
+    # 🌐 NAVEGAÇÃO
+    # =========================================================
+    logger.info(
+        f"[{entidade}] Browser visitando ({run.next_visit_number()}/{run.max_pages}): {url}"
+    )
+
+    try:
+        await page.goto(url, wait_until="domcontentloaded", timeout=PAGE_TIMEOUT_MS)
+    except PlaywrightTimeout:
+        _record_route_stats(page_stats, route_stats, logger, entidade, url)
+        return page_stats
+
+    page_stats["pages_visited"] += 1
+
+    try:
+        await page.wait_for_selector("body", timeout=5000)
+    except PlaywrightTimeout:
+        pass
+
+    # =====================================================
+    # 🔁 POWER BI / FORM STATE → ENGINE SYNC JÁ NO LOAD
+    # (antes de settle, cliques e estratégias: o sync refaz tudo)
+    # =====================================================
+    sync_only = await sync_only_strategy(
+        page, logger, plan=get_strategy_memory().plan(url, STRATEGY_CHAIN)
+    )
+    if sync_only:
+        _record_route_stats(page_stats, route_stats, logger, entidade, url)
+        raise NeedsSyncEngine(sync_only)
+
+    patterns = None
+
+    # =====================================================
+    # 🔓 PATCH A — EXPANDIR TODOS OS ACCORDIONS (ANO / MÊS)
+    # =====================================================
+    try:
+        accordion_buttons = page.locator(
+            "button[aria-expanded='false'], "
+            ".accordion-button.collapsed, "
+            "[role='button'][aria-expanded='false']"
+        )
+
+        for idx in range(await accordion_buttons.count()):
+            if budget.expired("accordions"):
+                break
+            btn = accordion_buttons.nth(idx)
+            try:
+                if await btn.is_visible():
+                    await btn.click()
+                    await wait_until_settled_async(
+                        page, 600, f"{entidade} accordion", logger=logger
+                    )
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    # =====================================================
+    # 🧭 PATCH — LOAD MORE / VER MAIS (SMART)
+    # =====================================================
+    pdf_links = page.locator("a[href*='.pdf' i]")
+
+    try:
+        existing = await pdf_links.count()
+        if existing > 0:
+            logger.info(
+                f"[{entidade}] PDFs já visíveis ({existing}), ignorando 'Ver mais'"
+            )
+        else:
+            for _ in range(5):
+                if budget.expired("ver mais"):
+                    break
+                btn = page.locator(
+                    "main button:has-text('Ver mais'), "
+                    "article button:has-text('Ver mais'), "
+                    "section button:has-text('Ver mais')"
+                )
+
+                if await btn.count() == 0:
+                    break
+
+                b = btn.first
+                if not await b.is_visible():
+                    break
+
+                before = await pdf_links.count()
+
+                logger.info(f"[{entidade}] Clicando em 'Ver mais' contextual")
+                await b.click()
+                await wait_until_settled_async(page, 1200, f"{entidade} ver mais", logger=logger)
+
+                if await pdf_links.count() <= before:
+                    logger.info(
+                        f"[{entidade}] 'Ver mais' não liberou novos PDFs, parando"
+                    )
+                    break
+
+    except Exception:
+        pass
+
+    # =====================================================
+    # 🧭 PATCH — ATIVAR TODAS AS TABS VISÍVEIS
+    # =====================================================
+    try:
+        tabs = page.locator("ul.nav-tabs a, .nav-tabs a, [role='tab']")
+        for t in range(await tabs.count()):
+            if budget.expired("tabs"):
+                break
+            tab = tabs.nth(t)
+            try:
+                if await tab.is_visible():
+                    logger.info(
+                        f"[{entidade}] Ativando tab: {((await tab.inner_text()) or '').strip()}"
+                    )
+                    await tab.click()
+                    await wait_until_settled_async(page, 800, f"{entidade} tab", logger=logger)
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    # =====================================================
+    # 🧭 PATCH — MENU LATERAL (SPA / SIDEBAR)
+    # =====================================================
+    try:
+        if await pdf_links.count() == 0:
+
+            sidebar_links = page.locator("aside a:visible, nav a:visible")
+
+            for i in range(await sidebar_links.count()):
+                if budget.expired("menu lateral"):
+                    break
+                el = sidebar_links.nth(i)
+                try:
+                    text = ((await el.inner_text()) or "").strip().lower()
+
+                    if "demonstrativo de investimentos" in text:
+                        logger.warning(
+                            f"[{entidade}] Ativando menu lateral SPA: {text}"
+                        )
+                        await el.click()
+                        await wait_until_settled_async(
+                            page, 2000, f"{entidade} menu lateral", logger=logger
+                        )
+                        break
+
+                except Exception:
+                    pass
+    except Exception:
+        pass
+
+    # =====================================================
+    # 🧠 PIPELINE DE EXTRAÇÃO
+    # =====================================================
+    try:
+        patterns = await detect_patterns_async(page)
+        logger.warning(f"[{entidade}] PATTERNS DETECTADOS: {patterns}")
+
+        items = await run_strategies_async(page, logger)
+        page_stats["items_extracted"] += len(items)
+
+        # storage grava em disco: fora do event loop
+        await asyncio.to_thread(
+            _route_items, run, items, page.url, None, queue_document, page_stats
+        )
+
+    except NeedsSyncEngine:
+        _record_route_stats(page_stats, route_stats, logger, entidade, url)
+        raise
+
+    except Exception as e:
+        logger.debug(f"[{entidade}] Erro ao rodar pipeline: {e}")
+
+    # =====================================================
+    # EXPANSÕES E CLIQUES FINAIS
+    # =====================================================
+    if (
+        patterns
+        and not patterns.has_document_library
+        and patterns.has_popup_links
+        and not budget.expired("cliques finais")
+    ):
+        await page.evaluate(EXPAND_YEARS_JS)
+
+        try:
+            buttons = page.locator("button:visible, a:visible")
+            for j in range(await buttons.count()):
+                if budget.expired("cliques finais"):
+                    break
+                el = buttons.nth(j)
+                text = ((await el.inner_text()) or "").lower()
+                if "download" in text or "baixar" in text or "visualizar" in text:
+                    try:
+                        await el.click()
+                        await wait_until_settled_async(
+                            page, 800, f"{entidade} clique download", logger=logger
+                        )
+                    except Exception:
+                        pass
+        except Exception:
+            pass
+
+    # =====================================================
+    # 🔒 COLETAR HREFS VISÍVEIS (SNAPSHOT SEGURO)
+    # =====================================================
+    try:
+        hrefs = await page.eval_on_selector_all("a:visible", HREFS_JS)
+    except Exception:
+        hrefs = []
+
+    _queue_visible_pdfs(run, url, hrefs, queue_document)
+
+    # downloads / popups disparados pelos cliques
+    if handler_tasks:
+        await asyncio.gather(*list(handler_tasks), return_exceptions=True)
+
+    # =====================================================
+    # 📥 DOCUMENTOS → HTTP (EM PARALELO, FORA DO EVENT LOOP)
+    # =====================================================
+    if doc_jobs:
+        # UA fica o padrão do config: o engine async roda sempre headless
+        apply_browser_cookies(await page.context.cookies(), run.session)
+
+        logger.info(
+            f"[{entidade}] Baixando {len(doc_jobs)} documentos via HTTP "
+            f"(cookies do browser): {page.url}"
+        )
+
+        await asyncio.to_thread(
+            download_many, doc_jobs, run.downloader, run.session, logger
+        )
+        page_stats["docs_http"] += len(doc_jobs)
+
+    # =====================================================
+    # 🔁 ENDPOINTS XHR COM DOCUMENTOS → REPLAY HTTP (crawl)
+    # =====================================================
+    page_stats["xhr_endpoints"] += await install_xhr_capture(
+        page
+    ).record_endpoints_async(url, logger)
+
+    page_stats["budget_overruns"] += len(budget.overruns)
+    _record_route_stats(page_stats, route_stats, logger, entidade, url)
+
+    return page_stats
+
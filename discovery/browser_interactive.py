@@ -4,11 +4,15 @@ Browser interactive scraper
 - Accordion por ano
 - Captura real de PDFs
 """
-from playwright.sync_api import sync_playwright
 import re
 from config import MIN_YEAR
 from urllib.parse import urlparse
 
+from browser.pool import get_browser_pool
+from browser.routing import install_blocking, profile_for_seed
+from browser.settle import install_settle_tracking, wait_until_settled
+from browser.interception import DocumentInterceptor
+
 
 YEAR_RE = re.compile(r"20\d{2}")
 
@@ -24,47 +28,23 @@ def crawl_browser_interactive(
 
     logger.warning(f"[{entidade}] Iniciando browser INTERACTIVE")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    with get_browser_pool().lease(entidade, logger=logger) as lease:
+        page = lease.new_page()
+        install_blocking(page, profile_for_seed(seed_cfg))
+        install_settle_tracking(page)
 
         # ===============================
         # CAPTURA DE PDF (qualquer forma)
         # ===============================
-        def on_response(resp):
-            try:
-                ct = resp.headers.get("content-type", "")
-                if "pdf" not in ct.lower():
-                    return
-
-                content = resp.body()
-                url = resp.url
-
-                if url in state.visited_files:
-                    return
-
-                logger.info(f"[{entidade}] PDF capturado via browser: {url}")
-
-                downloader(
-                    session=None,
-                    url=url,
-                    content_override=content,
-                    state=state,
-                    source_page=page.url,
-                    anchor_text="browser_interactive",
-                    detected_year=None,
-                    entidade=entidade,
-                )
-            except Exception as e:
-                logger.error(f"[{entidade}] Erro ao capturar PDF: {e}")
-
-        page.on("response", on_response)
+        lease.on_context(
+            DocumentInterceptor(entidade, state, downloader, logger).install
+        )
 
         # ===============================
         # ABERTURA DA PÁGINA
         # ===============================
         page.goto(seed_url, wait_until="domcontentloaded")
-        page.wait_for_timeout(3000)
+        wait_until_settled(page, 3000, f"{entidade} abertura", logger=logger)
 
         # ===============================
         # NAVBAR — clique semântico
@@ -81,7 +61,7 @@ def crawl_browser_interactive(
             try:
                 el = page.get_by_text(txt, exact=False).first
                 el.click(timeout=3000)
-                page.wait_for_timeout(1200)
+                wait_until_settled(page, 1200, f"{entidade} navbar", logger=logger)
             except Exception:
                 continue
 
@@ -101,7 +81,7 @@ def crawl_browser_interactive(
                     continue
 
                 btn.click()
-                page.wait_for_timeout(1200)
+                wait_until_settled(page, 1200, f"{entidade} ano", logger=logger)
 
             except Exception:
                 continue
@@ -114,11 +94,10 @@ def crawl_browser_interactive(
                 txt = (el.inner_text() or "").lower()
                 if "pdf" in txt or "download" in txt:
                     el.click()
-                    page.wait_for_timeout(800)
+                    wait_until_settled(page, 800, f"{entidade} clique pdf", logger=logger)
             except Exception:
                 continue
 
-        page.wait_for_timeout(3000)
-        browser.close()
+        wait_until_settled(page, 3000, f"{entidade} final", logger=logger)
 
         logger.warning(f"[{entidade}] Browser INTERACTIVE finalizado")
\ No newline at end of file
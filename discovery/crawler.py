@@ -3,6 +3,7 @@ módulo que faz a navegação nos sites (HTML-first)
 """
 import time
 import re
+from collections import deque
 from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
@@ -14,16 +15,124 @@ from config import (
     MIN_YEAR,
     MAX_CRAWL_DEPTH,
     PATH_INTEREST_HINTS,
+    INCREMENTAL_CRAWL,
 )
 from discovery.heuristics import is_relevant, extract_year
+from discovery.wordpress import detect_wordpress, list_media_documents
+from discovery.script_payloads import (
+    extract_json_documents,
+    extract_script_documents,
+)
 from discovery.domain_guard import (
     get_base_domain,
     is_external_page,
     is_blocked_domain,
 )
+from downloader.http_client import download_many
+from state.endpoint_registry import get_endpoint_registry
+from state.page_cache import content_hash, get_page_cache
+
+
+# =========================================================
+# SINAIS DE CONTEÚDO DINÂMICO (usados pelo evaluator)
+# =========================================================
+# containers de conteúdo que chegam vazios no HTML = preenchidos por JS
+CONTAINER_HINTS = re.compile(
+    r"lista|list|document|arquivo|resultado|result|conteudo|content|grid|tabela|table",
+    re.I,
+)
+
+# chamadas de rede em scripts inline: fetch("..."), $.ajax({url: "..."}),
+# axios.get("..."), "/wp-json/...", "/api/...", "....json"
+XHR_CALL_RE = re.compile(
+    r"""(?:fetch|axios\.(?:get|post)|\$\.(?:ajax|get|getJSON|post)|url\s*:)\s*\(?\s*["'`]([^"'`\s]+)["'`]"""
+)
+XHR_PATH_RE = re.compile(
+    r"""["'`]((?:https?://[^"'`\s]+)?/(?:api|wp-json)/[^"'`\s]*|[^"'`\s]+\.json(?:\?[^"'`\s]*)?)["'`]"""
+)
+
+
+def count_empty_containers(soup) -> int:
+    count = 0
+
+    for el in soup.find_all(["tbody", "ul", "ol", "div", "section"]):
+        if el.name in ("div", "section"):
+            marker = " ".join([el.get("id") or ""] + (el.get("class") or []))
+            if not CONTAINER_HINTS.search(marker):
+                continue
+
+        if el.find(True) is None and not el.get_text(strip=True):
+            count += 1
+
+    return count
+
+
+def find_xhr_endpoints(soup, page_url) -> set[str]:
+    endpoints = set()
+
+    for script in soup.find_all("script", src=False):
+        code = script.string or ""
+        if not code:
+            continue
+
+        for regex in (XHR_CALL_RE, XHR_PATH_RE):
+            for m in regex.finditer(code):
+                endpoint = m.group(1)
+                if endpoint.startswith(("data:", "javascript:", "#")):
+                    continue
+                endpoints.add(urljoin(page_url, endpoint))
+
+    return endpoints
+
+
+def new_crawl_stats() -> dict:
+    return {
+        "visited_pages": 0,
+        "found_pdfs": 0,
+        "js_signals": False,
+        "accordion_years": False,
+        # documentos novos x já baixados em execuções anteriores
+        "new_docs": 0,
+        "known_docs": 0,
+        # documentos achados em <script> / data-* (sem browser)
+        "script_docs": 0,
+        # documentos vindos do replay HTTP de endpoints XHR
+        "xhr_replay_docs": 0,
+        # documentos da biblioteca de mídia do WordPress (REST API)
+        "wp_media_docs": 0,
+        # incremental: páginas sem mudança (links reaproveitados do cache)
+        "unchanged_pages": 0,
+        # sinais de conteúdo montado por JS
+        "scripts": 0,
+        "empty_containers": 0,
+        "xhr_endpoints": set(),
+        # sinais por página (ranking do browser fallback)
+        "page_signals": {},
+        # memória da execução (compartilhada entre as fases do crawl)
+        "crawled_pages": set(),
+        "seen_docs": set(),
+        "years_found": set(),
+    }
 
 
-def crawl(session, seed_cfg, state, downloader, storage, logger):
+def crawl(
+    session,
+    seed_cfg,
+    state,
+    downloader,
+    storage,
+    logger,
+    lastmods=None,
+    frontier=None,
+    stats=None,
+):
+    """
+    `lastmods`: {url: lastmod} do sitemap (re-crawl incremental).
+    `frontier`: [(url, depth)] injetados na fila inicial, depois do seed
+    (ex: páginas do sitemap).
+    `stats`: stats de uma fase anterior = continuação; a contagem soma
+    nas mesmas chaves e o replay XHR / atalho WordPress não se repetem.
+    """
     entidade = seed_cfg.get("entidade", "DESCONHECIDA")
     seed_url = seed_cfg["seed"]
     allowed_paths = seed_cfg.get("allowed_paths", [])
@@ -32,25 +141,172 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
     seed_base_domain = get_base_domain(seed_url)
     seed_path = urlparse(seed_url).path.lower().rstrip("/")
 
-    # fila com controle de profundidade
-    queue = [(seed_url, 0)]
+    continuing = stats is not None
+    if stats is None:
+        stats = new_crawl_stats()
+
+    # documentos já tratados nesta execução (o mesmo link em várias páginas)
+    seen_docs = stats["seen_docs"]
+
+    years_found = stats["years_found"]
+
+    # =====================================================
+    # 🔒 SEED SCOPE LOCK TAMBÉM PARA O FRONTIER INJETADO
+    # (páginas do sitemap não passam pelo filtro dos links)
+    # =====================================================
+    anchor_path = (seed_cfg.get("seed_anchor_path") or "").lower().rstrip("/")
+
+    def in_seed_scope(url) -> bool:
+        if not lock_seed_scope:
+            return True
+        path = urlparse(url).path.lower().rstrip("/")
+        if seed_path and not path.startswith(seed_path):
+            return False
+        return not anchor_path or path.startswith(anchor_path)
+
+    injected = list(frontier or ())
+    frontier = [(u, d) for u, d in injected if in_seed_scope(u)]
+
+    if len(frontier) < len(injected):
+        logger.info(
+            f"[{entidade}] Seed lock ativo, {len(injected) - len(frontier)} "
+            f"páginas injetadas fora do escopo ignoradas"
+        )
+
+    # fila com controle de profundidade (+ set para checar pertença)
+    queue = deque([(seed_url, 0), *frontier])
+    queued = {u for u, _ in queue}
+
+    # atalho WordPress: testado uma vez, na primeira página HTML
+    wp_checked = continuing or not seed_cfg.get("wordpress_media", True)
+
+    # incremental: visited_pages deixa de barrar páginas de execuções
+    # anteriores; quem decide o que re-parsear é o cache de páginas
+    incremental = seed_cfg.get("incremental", INCREMENTAL_CRAWL)
+    cache = get_page_cache() if incremental else None
+    seen_pages = stats["crawled_pages"] if incremental else state.visited_pages
+    lastmods = lastmods or {}
+
+    def wordpress_fast_path(api_root) -> bool:
+        """
+        Baixa os documentos da mídia WordPress. True = crawl HTML dispensado.
+        """
+        logger.info(f"[{entidade}] WordPress detectado, API: {api_root}")
+        jobs = []
+
+        for doc_url, title in list_media_documents(session, api_root, logger, entidade):
+            if doc_url in seen_docs or is_blocked_domain(doc_url):
+                continue
+            seen_docs.add(doc_url)
 
-    stats = {
-        "visited_pages": 0,
-        "found_pdfs": 0,
-        "js_signals": False,
-        "accordion_years": False,
-    }
+            year = extract_year(f"{title} {doc_url}")
+            if year is not None and year < MIN_YEAR:
+                continue
 
-    years_found = set()
+            stats["found_pdfs"] += 1
+            stats["wp_media_docs"] += 1
 
-    logger.info(f"[{entidade}] URLs iniciais na fila: 1")
+            if doc_url in state.visited_files:
+                stats["known_docs"] += 1
+                continue
+
+            stats["new_docs"] += 1
+            jobs.append({
+                "url": doc_url,
+                "state": state,
+                "source_page": api_root,
+                "anchor_text": title or "wp_media",
+                "detected_year": year,
+                "entidade": entidade,
+            })
+
+        download_many(jobs, downloader, session, logger=logger)
+
+        # seed opt-in: a mídia basta, o crawl HTML é dispensado
+        if seed_cfg.get("wordpress_media_only") and stats["wp_media_docs"]:
+            logger.info(
+                f"[{entidade}] wordpress_media_only: "
+                f"{stats['wp_media_docs']} documentos da mídia, crawl HTML dispensado"
+            )
+            return True
+        return False
+
+    # =========================================================
+    # 0. REPLAY DE ENDPOINTS XHR (registrados pelo browser)
+    # =========================================================
+    registry = get_endpoint_registry()
+
+    for endpoint in [] if continuing else registry.endpoints_for(seed_url):
+        try:
+            r = session.request(
+                endpoint["method"],
+                endpoint["url"],
+                headers=endpoint["headers"],
+                data=endpoint.get("body"),
+                timeout=20,
+            )
+            r.raise_for_status()
+            docs = extract_json_documents(r.json(), endpoint["url"])
+        except Exception as e:
+            logger.warning(f"[{entidade}] Replay XHR falhou: {endpoint['url']} | {e}")
+            docs = []
+
+        replay_docs = 0
+
+        for doc_url, label in docs:
+            path_lower = urlparse(doc_url).path.lower()
+
+            if doc_url in seen_docs or is_blocked_domain(doc_url):
+                continue
+
+            if "/uploads/" not in path_lower and not is_relevant(label, doc_url, KEYWORDS):
+                continue
+
+            seen_docs.add(doc_url)
+
+            year = extract_year(f"{label} {doc_url}")
+            if year is not None and year < MIN_YEAR:
+                continue
+
+            replay_docs += 1
+            stats["found_pdfs"] += 1
+            stats["xhr_replay_docs"] += 1
+
+            if doc_url in state.visited_files:
+                stats["known_docs"] += 1
+                continue
+
+            stats["new_docs"] += 1
+
+            downloader(
+                session=session,
+                url=doc_url,
+                state=state,
+                source_page=endpoint["source_page"],
+                anchor_text=label or "xhr_replay",
+                detected_year=year,
+                entidade=entidade,
+            )
+
+        # endpoint que parou de render sai do registro (browser volta)
+        if not registry.replayed(endpoint, len(docs)):
+            logger.warning(
+                f"[{entidade}] Endpoint XHR descartado após replays vazios: "
+                f"{endpoint['url']}"
+            )
+        else:
+            logger.info(
+                f"[{entidade}] Replay XHR: {replay_docs}/{len(docs)} documentos "
+                f"de {endpoint['url']}"
+            )
+
+    logger.info(f"[{entidade}] URLs iniciais na fila: {len(queue)}")
 
     while queue:
-        url, depth = queue.pop(0)
+        url, depth = queue.popleft()
         state.save_queue([u for u, _ in queue])
 
-        if url in state.visited_pages:
+        if url in seen_pages:
             continue
 
         if depth > MAX_CRAWL_DEPTH:
@@ -65,32 +321,156 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
         ignored_pdfs_found = 0
 
         state.save_visited_page(url)
+        stats["crawled_pages"].add(url)
         stats["visited_pages"] += 1
 
-        try:
-            r = session.get(url, timeout=20)
-            ct = r.headers.get("Content-Type", "")
-            if "text/html" not in ct:
+        # links HTML de saída e documentos desta página (cache incremental)
+        page_links = []
+        page_docs = []
+
+        sitemap_lastmod = lastmods.get(url)
+        cached = cache.get(url) if cache else None
+
+        # lastmod do sitemap igual ao da última visita: nem faz o GET
+        unchanged = bool(cached) and cache.unchanged_by_lastmod(url, sitemap_lastmod)
+        fetched = not unchanged
+
+        if fetched:
+            try:
+                r = session.get(
+                    url,
+                    timeout=20,
+                    headers=cache.conditional_headers(url) if cached else None,
+                )
+            except Exception as e:
+                logger.error(f"[{entidade}] Erro ao acessar {url} | {e}")
+                state.save_failed(url)
                 continue
-        except Exception as e:
-            logger.error(f"[{entidade}] Erro ao acessar {url} | {e}")
-            state.save_failed(url)
+
+            if cached and (
+                r.status_code == 304
+                or (r.ok and content_hash(r.content) == cached.get("hash"))
+            ):
+                unchanged = True
+            elif "text/html" not in r.headers.get("Content-Type", ""):
+                continue
+
+        # =========================================================
+        # ♻️ INCREMENTAL: PÁGINA SEM MUDANÇA (SEM PARSE)
+        # =========================================================
+        if unchanged:
+            cache.touch(url, sitemap_lastmod)
+            stats["unchanged_pages"] += 1
+
+            signals = dict(cached.get("signals") or {}, depth=depth)
+            stats["page_signals"][url] = signals
+
+            # mesmos sinais de JS que o parse teria somado
+            stats["scripts"] += signals.get("scripts", 0)
+            if signals.get("scripts"):
+                stats["js_signals"] = True
+            stats["empty_containers"] += signals.get("empty_containers", 0)
+            stats["xhr_endpoints"] |= set(cached.get("xhr_endpoints") or ())
+
+            # documentos da página: fora do registro (download falhou ou
+            # não terminou) → downloader de novo
+            documents = cached.get("documents")
+            if documents is None:
+                # entrada de cache antiga, sem a lista de documentos
+                stats["found_pdfs"] += signals.get("docs", 0)
+                stats["known_docs"] += signals.get("docs", 0)
+
+            for doc_url, label, year in documents or ():
+                if doc_url in seen_docs:
+                    continue
+                seen_docs.add(doc_url)
+
+                stats["found_pdfs"] += 1
+
+                if doc_url in state.visited_files:
+                    stats["known_docs"] += 1
+                    continue
+
+                stats["new_docs"] += 1
+
+                downloader(
+                    session=session,
+                    url=doc_url,
+                    state=state,
+                    source_page=url,
+                    anchor_text=label,
+                    detected_year=year,
+                    entidade=entidade,
+                )
+
+            years_found |= set(cached.get("years") or ())
+            if len(years_found) >= 4:
+                stats["accordion_years"] = True
+
+            if not wp_checked:
+                wp_checked = True
+                if cached.get("wp_api") and wordpress_fast_path(cached["wp_api"]):
+                    queue.clear()
+                    break
+
+            for link in cached.get("links") or ():
+                if link not in seen_pages and link not in queued:
+                    queued.add(link)
+                    queue.append((link, depth + 1))
+
+            logger.info(f"[{entidade}] Sem mudança, links reaproveitados: {url}")
+
+            if fetched:
+                time.sleep(REQUEST_DELAY)
             continue
 
         soup = BeautifulSoup(r.text, "lxml")
 
         # sinal simples de JS
-        if soup.find("script"):
+        scripts = len(soup.find_all("script"))
+        if scripts:
             stats["js_signals"] = True
 
+        empty_containers = count_empty_containers(soup)
+        page_xhr_endpoints = find_xhr_endpoints(soup, url)
+
+        stats["scripts"] += scripts
+        stats["empty_containers"] += empty_containers
+        stats["xhr_endpoints"] |= page_xhr_endpoints
+
         # detecção de accordion por ANO
+        page_years = set()
         for txt in soup.stripped_strings:
             if re.fullmatch(r"20\d{2}", txt):
-                years_found.add(int(txt))
+                page_years.add(int(txt))
+
+        years_found |= page_years
 
         if len(years_found) >= 4:
             stats["accordion_years"] = True
 
+        # =========================================================
+        # 0.5 WORDPRESS: BIBLIOTECA DE MÍDIA (ANTES DO CRAWL)
+        # =========================================================
+        page_wp_api = None
+        if not wp_checked:
+            wp_checked = True
+            page_wp_api = detect_wordpress(soup, url, r.headers)
+
+            if page_wp_api and wordpress_fast_path(page_wp_api):
+                queue.clear()
+                break
+
+        signals = {
+            "depth": depth,
+            "scripts": scripts,
+            "empty_containers": empty_containers,
+            "years": len(page_years),
+            "docs": 0,
+            "old_docs": 0,
+        }
+        stats["page_signals"][url] = signals
+
         # =========================================================
         # 1. LINKS <a href="">
         # =========================================================
@@ -162,6 +542,10 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
                     if not is_relevant(text, href, KEYWORDS):
                         continue
 
+                if href in seen_docs:
+                    continue
+                seen_docs.add(href)
+
                 year = extract_year(f"{text} {href}")
 
                 if year is not None and year < MIN_YEAR:
@@ -174,7 +558,14 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
 
                 stats["found_pdfs"] += 1
                 valid_pdfs_found += 1
-                state.visited_files.add(href)
+                page_docs.append((href, text or "link", year))
+
+                if href in state.visited_files:
+                    stats["known_docs"] += 1
+                    continue
+
+                # o downloader marca visited_files (e pula o que já estiver lá)
+                stats["new_docs"] += 1
 
                 downloader(
                     session=session,
@@ -213,7 +604,10 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
                     if not any(path_lower.startswith(p) for p in allowed_paths):
                         continue
 
-                if href not in state.visited_pages and all(href != u for u, _ in queue):
+                page_links.append(href)
+
+                if href not in seen_pages and href not in queued:
+                    queued.add(href)
                     queue.append((href, depth + 1))
 
         # =========================================================
@@ -250,9 +644,10 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
                 if not any(path_lower.startswith(p) for p in allowed_paths):
                     continue
 
-            if frame_url not in state.visited_pages and all(
-                frame_url != u for u, _ in queue
-            ):
+            page_links.append(frame_url)
+
+            if frame_url not in seen_pages and frame_url not in queued:
+                queued.add(frame_url)
                 queue.append((frame_url, depth + 1))
 
         # =========================================================
@@ -281,12 +676,19 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
                 if year is not None and year < MIN_YEAR:
                     continue
 
-                if pdf_url in state.visited_files:
+                if pdf_url in seen_docs:
                     continue
+                seen_docs.add(pdf_url)
 
                 stats["found_pdfs"] += 1
                 valid_pdfs_found += 1
-                state.visited_files.add(pdf_url)
+                page_docs.append((pdf_url, "detected_in_html", year))
+
+                if pdf_url in state.visited_files:
+                    stats["known_docs"] += 1
+                    continue
+
+                stats["new_docs"] += 1
 
                 downloader(
                     session=session,
@@ -298,6 +700,66 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
                     entidade=entidade,
                 )
 
+        # =========================================================
+        # 4. DOCUMENTOS EM PAYLOADS DE SCRIPT / data-*
+        # (__NEXT_DATA__, JSON-LD, wp_localize_script, Elementor...)
+        # =========================================================
+        for doc_url, label in extract_script_documents(soup, url):
+            path_lower = urlparse(doc_url).path.lower()
+
+            if doc_url in seen_docs or is_blocked_domain(doc_url):
+                continue
+
+            # payloads trazem de tudo (logos, manuais...): mesmo filtro dos links
+            is_obvious_doc = "/uploads/" in path_lower
+            if not is_obvious_doc and not is_relevant(label, doc_url, KEYWORDS):
+                continue
+
+            seen_docs.add(doc_url)
+
+            year = extract_year(f"{label} {doc_url}")
+            if year is not None and year < MIN_YEAR:
+                ignored_pdfs_found += 1
+                continue
+
+            stats["found_pdfs"] += 1
+            stats["script_docs"] += 1
+            valid_pdfs_found += 1
+            page_docs.append((doc_url, label or "script_payload", year))
+
+            if doc_url in state.visited_files:
+                stats["known_docs"] += 1
+                continue
+
+            stats["new_docs"] += 1
+
+            downloader(
+                session=session,
+                url=doc_url,
+                state=state,
+                source_page=url,
+                anchor_text=label or "script_payload",
+                detected_year=year,
+                entidade=entidade,
+            )
+
+        signals["docs"] = valid_pdfs_found
+        signals["old_docs"] = ignored_pdfs_found
+
+        if cache:
+            cache.store(
+                url,
+                response_headers=r.headers,
+                body_hash=content_hash(r.content),
+                links=list(dict.fromkeys(page_links)),
+                signals=signals,
+                years=sorted(page_years),
+                documents=page_docs,
+                xhr_endpoints=sorted(page_xhr_endpoints),
+                sitemap_lastmod=sitemap_lastmod,
+                wp_api=page_wp_api,
+            )
+
         if valid_pdfs_found == 0 and ignored_pdfs_found > 0:
             logger.info(f"[{entidade}] Página exaurida (somente PDFs antigos): {url}")
 
@@ -307,8 +769,13 @@ def crawl(session, seed_cfg, state, downloader, storage, logger):
         f"[{entidade}] Fila esgotada | "
         f"pages={stats['visited_pages']} "
         f"pdfs={stats['found_pdfs']} "
+        f"(novos={stats['new_docs']} conhecidos={stats['known_docs']} "
+        f"scripts={stats['script_docs']} xhr_replay={stats['xhr_replay_docs']} wp={stats['wp_media_docs']}) "
+        f"inalteradas={stats['unchanged_pages']} "
         f"js={stats['js_signals']} "
-        f"accordion={stats['accordion_years']}"
+        f"accordion={stats['accordion_years']} "
+        f"vazios={stats['empty_containers']} "
+        f"xhr={len(stats['xhr_endpoints'])}"
     )
 
     return stats
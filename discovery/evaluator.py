@@ -1,24 +1,143 @@
 """
 modulo que decide se o crawler HTML falhou e precisa escalar para browser.
+
+A escalada custa um Chromium por entidade: só acontece quando o ganho
+esperado (sinais de conteúdo dinâmico, documentos novos, rendimento do
+browser na última execução) passa do limiar. O motivo vai para o log.
 """
-def should_escalate(stats):
+import logging
+from datetime import datetime, timezone
 
-    # 🔥 Achou PDFs, MAS página é JS / accordion → precisa browser
-    if stats["found_pdfs"] > 0:
-        if stats["js_signals"] or stats["accordion_years"]:
-            return True
-        return False
 
-    # Navegou pouco demais → provavelmente conteúdo dinâmico
-    if stats["visited_pages"] <= 3:
-        return True
+# =========================================================
+# CONFIG
+# =========================================================
+# ganho esperado mínimo para pagar o browser
+ESCALATION_THRESHOLD = 2.0
 
-    # Muitos scripts = JS-driven
-    if stats["js_signals"]:
-        return True
+# scripts por página acima disso = página montada por JS
+SCRIPT_DENSITY_HIGH = 15
 
-    # Caso conservador
-    return True
+W_FEW_PAGES = 3.0          # HTML quase não navegou
+W_NO_DOCS = 2.0            # nenhum documento achado pelo HTML
+W_ACCORDION = 1.5          # anos soltos = accordion / abas por ano
+W_SCRIPT_DENSITY = 1.0
+W_EMPTY_CONTAINERS = 0.5   # por container vazio (teto em MAX_EMPTY_CONTAINERS)
+W_XHR = 0.75               # por endpoint XHR (teto em MAX_XHR_ENDPOINTS)
+W_ONLY_KNOWN_DOCS = -1.5   # HTML só reencontrou o que já temos
+W_SCRIPT_DOCS = -1.5       # lista montada por JS já lida dos scripts
+W_XHR_REPLAY = -4.0        # endpoint XHR do browser repetido via HTTP
+W_WP_MEDIA = -2.0          # uploads listados pela API de mídia do WordPress
+# abaixo do limiar: rendimento passado sozinho não paga o browser
+W_LAST_YIELD = 1.5         # browser gravou itens novos na última execução
+W_LAST_NO_YIELD = -3.0     # browser não rendeu nada na última execução
+
+MAX_EMPTY_CONTAINERS = 4
+MAX_XHR_ENDPOINTS = 4
+
+# o rendimento guardado perde peso linearmente até sumir: uma execução
+# vazia não desliga o browser para sempre, uma boa não o liga para sempre
+BROWSER_RECHECK_DAYS = 7       # W_LAST_NO_YIELD zera em 7 dias
+BROWSER_YIELD_TTL_DAYS = 30    # W_LAST_YIELD zera em 30 dias
+
+
+_logger = logging.getLogger("SCRAPER_PLANOS")
+
+
+def _days_since(iso: str | None) -> float:
+    if not iso:
+        return float("inf")
+    try:
+        then = datetime.fromisoformat(iso)
+    except ValueError:
+        return float("inf")
+    return (datetime.now(timezone.utc) - then).total_seconds() / 86400
+
+
+def _decay(weight: float, age_days: float, ttl_days: float) -> float:
+    return weight * max(0.0, 1.0 - age_days / ttl_days)
+
+
+def escalation_score(stats: dict, last_browser: dict | None = None) -> tuple[float, list[str]]:
+    """
+    Ganho esperado da escalada + motivos (para o log).
+    """
+    score = 0.0
+    reasons = []
+
+    def add(weight, reason):
+        nonlocal score
+        score += weight
+        reasons.append(f"{reason} ({weight:+.1f})")
+
+    pages = stats.get("visited_pages", 0)
+    found = stats.get("found_pdfs", 0)
+    new_docs = stats.get("new_docs", found)
+    known_docs = stats.get("known_docs", 0)
+
+    if pages <= 3:
+        add(W_FEW_PAGES, f"HTML navegou só {pages} páginas")
+
+    if found == 0:
+        add(W_NO_DOCS, "HTML sem documentos")
+    elif new_docs == 0 and known_docs:
+        add(W_ONLY_KNOWN_DOCS, f"HTML só achou {known_docs} documentos conhecidos")
+
+    # containers vazios / XHR explicados: os dados já vieram do payload
+    if stats.get("script_docs"):
+        add(W_SCRIPT_DOCS, f"{stats['script_docs']} documentos extraídos de scripts")
+
+    # o replay só rende enquanto o endpoint vale: parou, o peso some
+    if stats.get("xhr_replay_docs"):
+        add(W_XHR_REPLAY, f"{stats['xhr_replay_docs']} documentos via replay XHR")
+
+    if stats.get("wp_media_docs"):
+        add(W_WP_MEDIA, f"{stats['wp_media_docs']} documentos da mídia WordPress")
+
+    if stats.get("accordion_years"):
+        add(W_ACCORDION, "accordion de anos")
+
+    density = stats.get("scripts", 0) / max(1, pages)
+    if density >= SCRIPT_DENSITY_HIGH:
+        add(W_SCRIPT_DENSITY, f"{density:.0f} scripts/página")
+
+    empty = min(stats.get("empty_containers", 0), MAX_EMPTY_CONTAINERS)
+    if empty:
+        add(W_EMPTY_CONTAINERS * empty, f"{stats['empty_containers']} containers vazios")
+
+    xhr = min(len(stats.get("xhr_endpoints", ())), MAX_XHR_ENDPOINTS)
+    if xhr:
+        add(W_XHR * xhr, f"{len(stats['xhr_endpoints'])} endpoints XHR em scripts")
+
+    if last_browser:
+        last_yield = last_browser.get("docs", 0)
+        age = _days_since(last_browser.get("at"))
+        if last_yield:
+            weight = _decay(W_LAST_YIELD, age, BROWSER_YIELD_TTL_DAYS)
+            if weight:
+                add(weight, f"browser gravou {last_yield} itens novos há {age:.0f} dias")
+        else:
+            weight = _decay(W_LAST_NO_YIELD, age, BROWSER_RECHECK_DAYS)
+            if weight:
+                add(weight, f"browser não rendeu há {age:.0f} dias")
+
+    return score, reasons
+
+
+def should_escalate(stats, last_browser=None, logger=None):
+    """
+    `last_browser`: State.get_browser_yield(entidade) (None = nunca rodou).
+    """
+    score, reasons = escalation_score(stats, last_browser)
+    escalate = score >= ESCALATION_THRESHOLD
+
+    (logger or _logger).info(
+        f"[ESCALADA] {'SIM' if escalate else 'NÃO'} "
+        f"(ganho={score:.1f}, limiar={ESCALATION_THRESHOLD}): "
+        + ("; ".join(reasons) or "nenhum sinal")
+    )
+
+    return escalate
 
 def should_try_sitemap(stats: dict) -> bool:
     """
@@ -31,4 +150,4 @@ def should_try_sitemap(stats: dict) -> bool:
         return False
 
     # pouco conteúdo + nada encontrado
-    return True
\ No newline at end of file
+    return True
@@ -0,0 +1,93 @@
+"""
+modulo que ordena as paginas candidatas ao browser fallback usando os
+sinais coletados pelo crawler HTML (JS, accordion de anos, documentos,
+profundidade, caminho): o orçamento do browser vai para as páginas com
+mais chance de render documentos.
+"""
+import math
+from urllib.parse import urlparse
+
+from config import PATH_INTEREST_HINTS
+
+
+# =========================================================
+# CONFIG (PESOS)
+# =========================================================
+# página que o HTML nunca buscou (ex: de outra execução): sem sinais
+UNKNOWN_PAGE_SCORE = 0.0
+
+W_SCRIPTS = 1.0          # * log(1 + scripts): conteúdo montado por JS
+W_YEARS_ACCORDION = 3.0  # 4+ anos soltos na página = accordion/abas por ano
+W_DOCS = 1.5             # * log(1 + docs): página já é fonte de documentos
+W_OLD_DOCS = 0.5         # só documentos antigos: os recentes podem estar escondidos
+W_DEPTH = -0.5           # * profundidade
+W_PATH_HINT = 2.0
+W_ANCHOR = 2.0           # dentro do seed_anchor_path
+
+ACCORDION_MIN_YEARS = 4
+
+LOW_VALUE_PATH_HINTS = (
+    "politica",
+    "privacidade",
+    "lgpd",
+    "termos",
+    "cookie",
+    "contato",
+    "noticia",
+    "blog",
+)
+
+
+def score_page(url: str, signals: dict | None, anchor: str | None = None) -> float:
+    path = urlparse(url).path.lower()
+
+    score = UNKNOWN_PAGE_SCORE
+
+    if signals:
+        score += W_SCRIPTS * math.log1p(signals.get("scripts", 0))
+
+        if signals.get("years", 0) >= ACCORDION_MIN_YEARS:
+            score += W_YEARS_ACCORDION
+
+        docs = signals.get("docs", 0)
+        score += W_DOCS * math.log1p(docs)
+
+        if not docs and signals.get("old_docs", 0):
+            score += W_OLD_DOCS
+
+        score += W_DEPTH * signals.get("depth", 0)
+
+    if any(h in path for h in PATH_INTEREST_HINTS):
+        score += W_PATH_HINT
+
+    if any(h in path for h in LOW_VALUE_PATH_HINTS):
+        score -= W_PATH_HINT
+
+    if anchor and path.startswith(anchor.lower()):
+        score += W_ANCHOR
+
+    return score
+
+
+def rank_browser_pages(seed_cfg: dict, candidates, page_signals: dict, logger) -> list[str]:
+    """
+    Seed primeiro; o resto por score (desc), empate pela ordem de chegada.
+    """
+    entidade = seed_cfg.get("entidade", "DESCONHECIDA")
+    seed = seed_cfg["seed"]
+    anchor = seed_cfg.get("seed_anchor_path")
+
+    scored = []
+    for order, url in enumerate(dict.fromkeys(candidates)):
+        if url == seed:
+            continue
+        scored.append((-score_page(url, page_signals.get(url), anchor), order, url))
+
+    scored.sort()
+
+    ranked = [seed] + [url for _, _, url in scored]
+
+    for neg_score, _, url in scored[:10]:
+        logger.info(f"[{entidade}] [RANK] {-neg_score:5.2f} {url}")
+
+    return ranked
@@ -1,8 +1,12 @@
 # discovery/patterns.py
 
+import threading
+import weakref
 from dataclasses import dataclass
+
 from playwright.sync_api import Page
-import re
+
+from browser.settle import DOM_OBSERVER_JS
 
 
 @dataclass
@@ -13,6 +17,9 @@ class PagePatterns:
     has_table: bool = False
     has_popup_links: bool = False
 
+    # 🧭 seletor de vários planos (ex: MultiPrev)
+    has_plan_selector: bool = False
+
     # 🧾 form + botão (já existe)
     has_form_download: bool = False
 
@@ -23,95 +30,178 @@ class PagePatterns:
     is_powerbi: bool = False
 
 
-def detect_patterns(page: Page) -> PagePatterns:
+# ------------------------------------------------------
+# Todos os sinais em um único script dentro da página.
+# Recebe o (token, version) do último resultado: se o DOM não mudou
+# desde então, devolve só {unchanged: true} e nada é recalculado.
+# ------------------------------------------------------
+DETECT_JS = """
+([token, version]) => {
+    (""" + DOM_OBSERVER_JS + """)();
+
+    const st = window.__efpcDom;
+    if (st.token === token && st.version === version) {
+        return {token, version, unchanged: true};
+    }
+
+    const body = document.body;
+    const text = body ? (body.innerText || '').toLowerCase() : '';
+    const allText = body ? (body.textContent || '').toLowerCase() : '';
+    const count = (sel) => document.querySelectorAll(sel).length;
+
+    // elementos cujo texto próprio contém "plano" (equivale a text=Plano)
+    let planoElements = 0;
+    if (body) {
+        const seen = new Set();
+        const walker = document.createTreeWalker(body, NodeFilter.SHOW_TEXT);
+        while (walker.nextNode()) {
+            const node = walker.currentNode;
+            if (node.nodeValue.toLowerCase().includes('plano') && !seen.has(node.parentElement)) {
+                seen.add(node.parentElement);
+                planoElements++;
+            }
+        }
+    }
+
+    let baixarButtons = 0;
+    for (const b of document.querySelectorAll('button')) {
+        if ((b.textContent || '').toLowerCase().includes('baixar')) baixarButtons++;
+    }
+
+    // Power BI: iframes/embeds e scripts (sem serializar o HTML inteiro)
+    const PBI = ['powerbi', 'reportembed'];
+    const hasPbi = (s) => PBI.some(p => (s || '').toLowerCase().includes(p));
+    let powerbiRefs = false;
+    for (const el of document.querySelectorAll('iframe, embed, object, script')) {
+        if (hasPbi(el.getAttribute('src')) || hasPbi(el.getAttribute('data'))
+            || (el.tagName === 'SCRIPT' && hasPbi(el.textContent))) {
+            powerbiRefs = true;
+            break;
+        }
+    }
+
+    return {
+        token: st.token,
+        version: st.version,
+        unchanged: false,
+        signals: {
+            yearText: /\\b20\\d{2}\\b/.test(text),
+            downloadText: ['download', 'baixar', 'visualizar'].some(k => allText.includes(k)),
+            selects: count('select'),
+            tables: count('table'),
+            popupLinks: count("a[target='_blank']"),
+            planoElements,
+            clickables: count('a, button, div'),
+            baixarButtons,
+            selectOptions: count('select option'),
+            fileLinks: count(
+                "a[href$='.pdf'], a[href$='.xls'], a[href$='.xlsx'], "
+                + "a[href$='.doc'], a[href$='.docx'], a[href$='.zip']"
+            ),
+            powerbiRefs,
+            grids: count("[role='grid']"),
+        },
+    };
+}
+"""
+
+
+# página -> (token, version, PagePatterns)
+_cache = weakref.WeakKeyDictionary()
+_cache_lock = threading.Lock()
+
+
+def _patterns_from_signals(s: dict) -> PagePatterns:
     patterns = PagePatterns()
 
-    try:
-        text = page.inner_text("body").lower()
-    except Exception:
-        text = ""
-
-    html = ""
-    try:
-        html = page.content().lower()
-    except Exception:
-        pass
-
     # ------------------------------------------------------
     # Accordion por ano
     # ------------------------------------------------------
-    if re.search(r"\b20\d{2}\b", text):
-        patterns.has_accordion_years = True
+    patterns.has_accordion_years = s["yearText"]
 
     # ------------------------------------------------------
     # Botões de download
     # ------------------------------------------------------
-    if (
-        page.locator("text=Download").count() > 0
-        or page.locator("text=Baixar").count() > 0
-        or page.locator("text=Visualizar").count() > 0
-    ):
-        patterns.has_download_buttons = True
-
-    # ------------------------------------------------------
-    # Dropdown
-    # ------------------------------------------------------
-    if page.locator("select").count() > 0:
-        patterns.has_dropdown = True
+    patterns.has_download_buttons = s["downloadText"]
 
     # ------------------------------------------------------
-    # Tabela
+    # Dropdown / Tabela / Popup
     # ------------------------------------------------------
-    if page.locator("table").count() > 0:
-        patterns.has_table = True
-
-    # ------------------------------------------------------
-    # Popup
-    # ------------------------------------------------------
-    if page.locator("a[target='_blank']").count() > 0:
-        patterns.has_popup_links = True
+    patterns.has_dropdown = s["selects"] > 0
+    patterns.has_table = s["tables"] > 0
+    patterns.has_popup_links = s["popupLinks"] > 0
 
     # ------------------------------------------------------
     # MULTI-PLAN SELECTOR (ex: MultiPrev)
     # ------------------------------------------------------
-    if (
-        page.locator("text=Plano").count() >= 3
-        and page.locator("a, button, div").count() > 10
-    ):
-        patterns.has_plan_selector = True
+    patterns.has_plan_selector = (
+        s["planoElements"] >= 3
+        and s["clickables"] > 10
+    )
 
     # ------------------------------------------------------
     # FORM-DRIVEN DOWNLOAD (mais restritivo)
     # ------------------------------------------------------
-    if (
+    patterns.has_form_download = (
         patterns.has_dropdown
-        and page.locator("button:has-text('Baixar')").count() > 0
-        and page.locator("select option").count() >= 4
-    ):
-        patterns.has_form_download = True
+        and s["baixarButtons"] > 0
+        and s["selectOptions"] >= 4
+    )
 
     # ------------------------------------------------------
     # DOCUMENT LIBRARY (lista grande de PDFs)
     # ------------------------------------------------------
-    file_links = page.locator(
-        "a[href$='.pdf'], a[href$='.xls'], a[href$='.xlsx'], a[href$='.doc'], a[href$='.docx'], a[href$='.zip']"
-    )
-
-    if file_links.count() >= 5:
-        patterns.has_document_library = True
+    patterns.has_document_library = s["fileLinks"] >= 5
 
     # ------------------------------------------------------
     # POWER BI
     # ------------------------------------------------------
-    if (
-        "powerbi" in html
-        or "app.powerbi.com" in html
-        or "reportembed" in html
-        or page.locator("iframe[src*='powerbi']").count() > 0
-        or page.locator("[role='grid']").count() > 0
-    ):
+    if s["powerbiRefs"] or s["grids"] > 0:
         patterns.is_powerbi = True
         patterns.has_dropdown = True
         patterns.has_table = True
 
     return patterns
+
+
+def _cached(page):
+    with _cache_lock:
+        return _cache.get(page) or (None, None, None)
+
+
+def _update_cache(page, result, patterns) -> PagePatterns:
+    if result.get("unchanged") and patterns is not None:
+        return patterns
+
+    patterns = _patterns_from_signals(result["signals"])
+
+    with _cache_lock:
+        _cache[page] = (result["token"], result["version"], patterns)
+
+    return patterns
+
+
+def detect_patterns(page: Page) -> PagePatterns:
+    """
+    Um único evaluate por chamada; com o DOM inalterado desde a última
+    detecção nesta página, o resultado em cache é devolvido.
+    """
+    token, version, patterns = _cached(page)
+
+    try:
+        result = page.evaluate(DETECT_JS, [token, version])
+    except Exception:
+        return PagePatterns()
+
+    return _update_cache(page, result, patterns)
+
+
+async def detect_patterns_async(page) -> PagePatterns:
+    token, version, patterns = _cached(page)
+
+    try:
+        result = await page.evaluate(DETECT_JS, [token, version])
+    except Exception:
+        return PagePatterns()
+
+    return _update_cache(page, result, patterns)
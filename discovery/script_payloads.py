@@ -0,0 +1,167 @@
+"""
+modulo que extrai URLs de documentos embutidas em scripts e atributos
+data-* (sem browser): __NEXT_DATA__, JSON-LD, dados localizados do
+WordPress (var x = {...}), configs do Elementor/JetEngine e literais
+de string JS. Cada URL vem com o rótulo mais próximo (title/name/label)
+para o filtro de relevância do crawler.
+"""
+import json
+import re
+from urllib.parse import urljoin
+
+from config import FILE_EXTENSIONS
+
+
+# mesma ideia do PDF_REGEX de js_pdf_links, para todas as extensões
+# aceitas e com barras escapadas de JSON (\/); a query string faz parte
+# da URL (download.php?arquivo.pdf&token=... / .pdf?ver=2).
+# Caminho relativo sem "/" inicial (uploads/2024/a.pdf) só casa no início
+# do literal / atributo ou depois de um delimitador (e sem atravessar
+# = , ; ?): inteiro, nunca a partir da primeira barra do meio
+_EXT = "|".join(re.escape(e.lstrip(".")) for e in FILE_EXTENSIONS)
+
+DOC_URL_REGEX = re.compile(
+    rf"((?:(?:https?:)?(?:\\?/)[^\s'\"()<>]*?"
+    rf"|(?<![^\s'\"()<>,;=\[\{{])[\w.%~-][^\s'\"()<>,;=?]*?)"
+    rf"\.(?:{_EXT})(?:[?&][^\s'\"()<>#,;\]\}}]*)?)"
+    rf"(?=$|[\s'\"()<>#,;\]\}}])",
+    re.IGNORECASE,
+)
+
+# literais de string JS ("..." / '...' / `...`) que contêm documento
+STRING_LITERAL_RE = re.compile(
+    r"""(["'`])((?:\\.|(?!\1).){4,2000}?)\1""",
+    re.S,
+)
+
+# var dados = {...};  window.x = [...];  (wp_localize_script e afins)
+ASSIGNED_JSON_RE = re.compile(
+    r"(?:var|let|const|window\.)\s*[\w$.]+\s*=\s*(\{.*?\}|\[.*?\])\s*;\s*(?:\n|$)",
+    re.S,
+)
+
+JSON_SCRIPT_TYPES = ("application/json", "application/ld+json")
+
+LABEL_KEYS = ("title", "titulo", "name", "nome", "label", "text", "caption", "description")
+
+MAX_PAYLOAD_BYTES = 5 * 1024 * 1024
+
+
+def _unescape(value: str) -> str:
+    value = value.replace("\\/", "/")
+    if "\\u" in value:
+        try:
+            value = value.encode("utf-8").decode("unicode_escape")
+        except UnicodeDecodeError:
+            pass
+    return value
+
+
+def _label_of(obj: dict) -> str:
+    for key in LABEL_KEYS:
+        value = obj.get(key)
+        if isinstance(value, dict):
+            # WordPress REST: {"title": {"rendered": "..."}}
+            value = value.get("rendered")
+        if isinstance(value, str) and value.strip():
+            return value.strip()[:200]
+    return ""
+
+
+def _urls_in(text: str) -> list[str]:
+    return [_unescape(m) for m in DOC_URL_REGEX.findall(_unescape(text))]
+
+
+def _walk_json(node, label, found: dict):
+    """
+    Percorre o JSON levando o rótulo do objeto mais próximo.
+    """
+    if isinstance(node, dict):
+        label = _label_of(node) or label
+        for value in node.values():
+            _walk_json(value, label, found)
+    elif isinstance(node, list):
+        for value in node:
+            _walk_json(value, label, found)
+    elif isinstance(node, str):
+        for url in _urls_in(node):
+            found.setdefault(url, label)
+
+
+def _parse_json(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _scan_script(code: str, found: dict):
+    # 1. payloads JSON atribuídos a variáveis
+    for m in ASSIGNED_JSON_RE.finditer(code):
+        data = _parse_json(m.group(1))
+        if data is not None:
+            _walk_json(data, "", found)
+
+    # 2. qualquer literal de string com documento (configs não-JSON)
+    for m in STRING_LITERAL_RE.finditer(code):
+        for url in _urls_in(m.group(2)):
+            found.setdefault(url, "")
+
+
+def extract_json_documents(data, base_url: str) -> list[tuple[str, str]]:
+    """
+    [(url absoluta, rótulo)] de um JSON já decodificado (ex: resposta XHR).
+    """
+    found = {}
+    _walk_json(data, "", found)
+    return [(urljoin(base_url, url), label) for url, label in found.items()]
+
+
+def extract_script_documents(soup, page_url: str) -> list[tuple[str, str]]:
+    """
+    [(url absoluta, rótulo)] dos documentos em <script> e data-*.
+    """
+    found = {}
+
+    # =========================================================
+    # <script> inline
+    # =========================================================
+    for script in soup.find_all("script", src=False):
+        code = script.string or script.get_text() or ""
+        if not code or len(code) > MAX_PAYLOAD_BYTES:
+            continue
+
+        script_type = (script.get("type") or "").lower()
+
+        if script_type in JSON_SCRIPT_TYPES or script.get("id") == "__NEXT_DATA__":
+            data = _parse_json(code)
+            if data is not None:
+                _walk_json(data, "", found)
+                continue
+
+        _scan_script(code, found)
+
+    # =========================================================
+    # data-* (data-url, data-file, data-settings JSON do Elementor...)
+    # =========================================================
+    for el in soup.find_all(True):
+        for attr, value in el.attrs.items():
+            if not attr.startswith("data-") or not isinstance(value, str):
+                continue
+            if "." not in value:
+                continue
+
+            stripped = value.strip()
+            data = _parse_json(stripped) if stripped[:1] in "{[" else None
+
+            if data is not None:
+                _walk_json(data, el.get_text(strip=True)[:200], found)
+            else:
+                label = el.get("title") or el.get_text(strip=True)[:200]
+                for url in _urls_in(stripped):
+                    found.setdefault(url, label)
+
+    return [
+        (urljoin(page_url, url), label)
+        for url, label in found.items()
+    ]
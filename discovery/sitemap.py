@@ -1,52 +1,292 @@
-import requests
-from xml.etree import ElementTree
+'''
+modulo de descoberta via sitemap: robots.txt (Sitemap:) e caminhos comuns,
+<sitemapindex> seguido recursivamente com filhos buscados em paralelo,
+.xml.gz suportado e parse em streaming (iterparse) — sitemaps com
+centenas de milhares de URLs não são carregados inteiros na memória.
+'''
+import gzip
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator
 from urllib.parse import urlparse
+from xml.etree.ElementTree import iterparse
 
 from discovery.domain_guard import is_blocked_domain, is_external_page
+from downloader.http_client import get_http_session
 
 
+# =========================================================
+# CONFIG
+# =========================================================
 COMMON_SITEMAP_PATHS = [
     "/sitemap.xml",
     "/sitemap_index.xml",
     "/wp-sitemap.xml",
+    "/sitemap-index.xml",
+    "/sitemap.xml.gz",
 ]
 
+# arquivos de sitemap buscados em paralelo
+SITEMAP_CONCURRENCY = 4
 
-def discover_sitemap_urls(seed_url: str, logger) -> list[str]:
-    base = f"{urlparse(seed_url).scheme}://{urlparse(seed_url).netloc}"
-    urls = []
+# profundidade máxima de <sitemapindex> aninhados
+MAX_INDEX_DEPTH = 3
 
-    for path in COMMON_SITEMAP_PATHS:
-        url = base + path
-        try:
-            r = requests.get(url, timeout=15)
-            if r.status_code != 200 or "xml" not in r.headers.get("Content-Type", ""):
-                continue
+# teto de arquivos de sitemap por site
+MAX_SITEMAPS = 500
+
+# entradas em trânsito entre os workers e o consumidor (backpressure)
+ENTRY_BUFFER = 5000
+
+CHUNK_SIZE = 64 * 1024
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass(frozen=True, slots=True)
+class SitemapEntry:
+    url: str
+    lastmod: str | None = None
+
+
+_DONE = object()
+
+
+class _NotFound(Exception):
+    """
+    Sitemap inexistente (status != 200): não conta como erro.
+    """
+
+
+# =========================================================
+# LEITURA EM STREAMING
+# =========================================================
+class _ChunkReader:
+    """
+    File-like sobre response.iter_content (serve também respostas já
+    lidas, como as do arquivo de rede).
+    """
 
-            tree = ElementTree.fromstring(r.text)
-            for loc in tree.findall(".//{*}loc"):
-                if loc.text:
-                    urls.append(loc.text.strip())
+    def __init__(self, chunks: Iterator[bytes], head: bytes = b""):
+        self._chunks = chunks
+        self._buffer = head
 
-            if urls:
-                logger.info(f"[SITEMAP] {len(urls)} URLs encontradas em {url}")
+    def read(self, size=-1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
                 break
+            self._buffer += chunk
 
-        except Exception:
-            continue
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _open_stream(response):
+    chunks = response.iter_content(CHUNK_SIZE)
+    head = next(chunks, b"")
+
+    reader = _ChunkReader(chunks, head)
+
+    # .xml.gz servido como arquivo (o Content-Encoding o requests já resolve)
+    if head[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=reader)
+    return reader
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_sitemap(session, url: str, stop: threading.Event):
+    """
+    Gera ("sitemap", loc, lastmod) para filhos de <sitemapindex> e
+    ("url", loc, lastmod) para entradas de <urlset>.
+    """
+    r = session.get(url, timeout=20, stream=True)
+    try:
+        if r.status_code != 200:
+            raise _NotFound(r.status_code)
+
+        root = None
+        depth = 0
+        loc = lastmod = None
+
+        for event, elem in iterparse(_open_stream(r), events=("start", "end")):
+            if stop.is_set():
+                return
+
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = elem
+                continue
 
-    return urls
+            tag = _local(elem.tag)
+
+            # só filhos diretos de <url>/<sitemap> (image:loc, video:loc... não)
+            if depth == 3 and tag == "loc":
+                loc = (elem.text or "").strip()
+            elif depth == 3 and tag == "lastmod":
+                lastmod = (elem.text or "").strip() or None
+            elif depth == 2 and tag in ("url", "sitemap"):
+                if loc:
+                    yield tag, loc, lastmod
+                loc = lastmod = None
+                # memória limitada: descarta o que já foi lido
+                root.clear()
+
+            depth -= 1
+    finally:
+        r.close()
+
+
+# =========================================================
+# DESCOBERTA
+# =========================================================
+def _robots_sitemaps(session, base: str) -> list[str]:
+    try:
+        r = session.get(base + "/robots.txt", timeout=15)
+        if r.status_code != 200:
+            return []
+    except Exception:
+        return []
+
+    return [
+        line.split(":", 1)[1].strip()
+        for line in r.text.splitlines()
+        if line.lower().startswith("sitemap:") and line.split(":", 1)[1].strip()
+    ]
+
+
+def _root_sitemaps(session, base: str, logger) -> list[list[str]]:
+    """
+    Cadeias de raízes: cada cadeia é tentada em ordem até um sitemap
+    ser lido por inteiro; cadeias diferentes rodam em paralelo.
+    """
+    roots = _robots_sitemaps(session, base)
+    if roots:
+        logger.info(f"[SITEMAP] {len(roots)} sitemaps no robots.txt de {base}")
+        return [[root] for root in roots]
+
+    # sem robots: os caminhos comuns um de cada vez, até o primeiro que
+    # existir (no WordPress vários apontam para as mesmas URLs)
+    return [[base + path for path in COMMON_SITEMAP_PATHS]]
+
+
+def iter_sitemap_entries(seed_url: str, logger, session=None) -> Iterator[SitemapEntry]:
+    """
+    Todas as entradas <url> dos sitemaps do site, em streaming. Os
+    arquivos (índices e filhos) são buscados em paralelo; a fila limitada
+    segura os workers se o consumidor for mais lento.
+    """
+    session = session or get_http_session()
+    parsed = urlparse(seed_url)
+    base = f"{parsed.scheme}://{parsed.netloc}"
+
+    results = queue.Queue(maxsize=ENTRY_BUFFER)
+    stop = threading.Event()
+    lock = threading.Lock()
+    seen = set()
+    pending = 0
+    stats = {"sitemaps": 0, "entries": 0, "errors": 0}
+
+    ex = ThreadPoolExecutor(max_workers=SITEMAP_CONCURRENCY)
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def submit(url, depth, fallbacks=()):
+        nonlocal pending
+        # sob o lock: o consumidor marca `stop` (também sob o lock) antes
+        # do shutdown, então nenhum submit chega num executor encerrado
+        with lock:
+            if stop.is_set() or url in seen or len(seen) >= MAX_SITEMAPS:
+                return
+            seen.add(url)
+            pending += 1
+            ex.submit(worker, url, depth, fallbacks)
+
+    def worker(url, depth, fallbacks):
+        ok = False
+        try:
+            for kind, loc, lastmod in _parse_sitemap(session, url, stop):
+                if kind == "sitemap":
+                    if depth < MAX_INDEX_DEPTH:
+                        submit(loc, depth + 1)
+                else:
+                    put(SitemapEntry(loc, lastmod))
+            with lock:
+                stats["sitemaps"] += 1
+            ok = True
+        except _NotFound:
+            pass
+        except Exception as e:
+            # XML quebrado, gzip truncado, timeout...
+            logger.debug(f"[SITEMAP] Falha em {url}: {e}")
+            with lock:
+                stats["errors"] += 1
+        finally:
+            # raiz que não rendeu: próxima da cadeia (antes do _DONE,
+            # para o consumidor não ver pending == 0 no meio)
+            if not ok and fallbacks:
+                submit(fallbacks[0], depth, fallbacks[1:])
+            put(_DONE)
+
+    try:
+        for chain in _root_sitemaps(session, base, logger):
+            submit(chain[0], 0, tuple(chain[1:]))
+
+        while True:
+            with lock:
+                if not pending:
+                    break
+
+            item = results.get()
+            if item is _DONE:
+                with lock:
+                    pending -= 1
+                continue
+
+            stats["entries"] += 1
+            yield item
+    finally:
+        # consumidor parou antes do fim: libera os workers
+        with lock:
+            stop.set()
+        ex.shutdown(wait=False, cancel_futures=True)
+
+        logger.info(
+            f"[SITEMAP] {stats['entries']} URLs em {stats['sitemaps']} sitemaps "
+            f"({stats['errors']} com erro) de {base}"
+        )
 
 
 def filter_sitemap_urls(
-    urls: list[str],
+    entries: Iterable[SitemapEntry],
     seed_base_domain: str,
     allowed_paths: list[str],
-) -> list[str]:
+) -> list[SitemapEntry]:
 
     filtered = []
+    kept = set()
+
+    for entry in entries:
+        url = entry.url
+
+        if url in kept:
+            continue
 
-    for url in urls:
         if is_blocked_domain(url):
             continue
 
@@ -69,6 +309,7 @@ def filter_sitemap_urls(
         ):
             continue
 
-        filtered.append(url)
+        kept.add(url)
+        filtered.append(entry)
 
-    return filtered
\ No newline at end of file
+    return filtered
@@ -0,0 +1,167 @@
+"""
+modulo do atalho WordPress: a biblioteca de mídia (/wp-json/wp/v2/media)
+lista em poucas chamadas paginadas os uploads que o crawler HTML levaria
+dezenas de páginas para achar.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+from config import KEYWORDS, MIN_YEAR
+from discovery.heuristics import is_relevant
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+MEDIA_ENDPOINT = "wp/v2/media"
+MEDIA_PER_PAGE = 100
+MEDIA_MIME_TYPES = ("application/pdf",)
+
+# páginas da API buscadas em paralelo
+MEDIA_CONCURRENCY = 4
+
+# teto de segurança (100 por página = 20 mil arquivos)
+MAX_MEDIA_PAGES = 200
+
+# só os campos usados (respostas bem menores)
+MEDIA_FIELDS = "source_url,title,date,modified"
+
+API_LINK_REL = "https://api.w.org/"
+
+GENERATOR_RE = re.compile(r"wordpress", re.I)
+LINK_HEADER_RE = re.compile(r'<([^>]+)>\s*;\s*rel="https://api\.w\.org/"')
+
+
+# =========================================================
+# DETECÇÃO
+# =========================================================
+def detect_wordpress(soup, page_url: str, headers=None) -> str | None:
+    """
+    Raiz da REST API (".../wp-json/") se a página é WordPress, senão None.
+    Sinais: header Link / <link rel="https://api.w.org/">, meta generator,
+    caminhos /wp-content/ ou /wp-json/ no HTML.
+    """
+    # 1. a própria API se anuncia (header ou <link>)
+    m = LINK_HEADER_RE.search((headers or {}).get("Link", ""))
+    if m:
+        return m.group(1)
+
+    link = soup.find("link", rel=API_LINK_REL, href=True)
+    if link:
+        return urljoin(page_url, link["href"])
+
+    # 2. generator / uploads: raiz padrão do site
+    generator = soup.find("meta", attrs={"name": "generator"})
+    is_wp = bool(generator and GENERATOR_RE.search(generator.get("content") or ""))
+
+    if not is_wp:
+        is_wp = any(
+            "/wp-content/" in (el.get("src") or el.get("href") or "")
+            or "/wp-json/" in (el.get("href") or "")
+            for el in soup.find_all(["link", "script", "img", "a"], limit=300)
+        )
+
+    if not is_wp:
+        return None
+
+    parsed = urlparse(page_url)
+    return f"{parsed.scheme}://{parsed.netloc}/wp-json/"
+
+
+# =========================================================
+# ENUMERAÇÃO
+# =========================================================
+def _year_of(value) -> int | None:
+    # "2024-03-01T10:00:00"
+    if isinstance(value, str) and value[:4].isdigit():
+        return int(value[:4])
+    return None
+
+
+def _title_of(item: dict) -> str:
+    title = item.get("title")
+    if isinstance(title, dict):
+        title = title.get("rendered")
+    return (title or "").strip()
+
+
+def _fetch_page(session, api_root, mime_type, page):
+    r = session.get(
+        urljoin(api_root, MEDIA_ENDPOINT),
+        params={
+            "per_page": MEDIA_PER_PAGE,
+            "page": page,
+            "mime_type": mime_type,
+            # WP >= 5.7; versões antigas ignoram (o filtro local segue valendo)
+            "modified_after": f"{MIN_YEAR}-01-01T00:00:00",
+            "_fields": MEDIA_FIELDS,
+        },
+        timeout=20,
+    )
+    r.raise_for_status()
+    return r
+
+
+def list_media_documents(session, api_root: str, logger, entidade="") -> list[tuple[str, str]]:
+    """
+    [(url, título)] da biblioteca de mídia, já filtrados por data
+    (date/modified >= MIN_YEAR) e relevância. Lista vazia se a API
+    estiver fechada.
+    """
+    items = []
+
+    for mime_type in MEDIA_MIME_TYPES:
+        # página 1 revela o total (X-WP-TotalPages); o resto vai em paralelo
+        try:
+            first = _fetch_page(session, api_root, mime_type, 1)
+            items.extend(first.json())
+            total_pages = int(first.headers.get("X-WP-TotalPages") or 1)
+        except Exception as e:
+            logger.info(f"[{entidade}] [WP] API de mídia indisponível em {api_root}: {e}")
+            return []
+
+        total_pages = min(total_pages, MAX_MEDIA_PAGES)
+
+        def fetch(page):
+            try:
+                return _fetch_page(session, api_root, mime_type, page).json()
+            except Exception as e:
+                logger.warning(f"[{entidade}] [WP] Falha na página {page} da mídia: {e}")
+                return []
+
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=MEDIA_CONCURRENCY) as ex:
+                for page_items in ex.map(fetch, range(2, total_pages + 1)):
+                    items.extend(page_items)
+
+    documents = []
+    ignored_old = 0
+    ignored_irrelevant = 0
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+
+        url = item.get("source_url")
+        if not url:
+            continue
+
+        years = [y for y in (_year_of(item.get("date")), _year_of(item.get("modified"))) if y]
+        if years and max(years) < MIN_YEAR:
+            ignored_old += 1
+            continue
+
+        title = _title_of(item)
+        if not is_relevant(title, url, KEYWORDS):
+            ignored_irrelevant += 1
+            continue
+
+        documents.append((url, title))
+
+    logger.info(
+        f"[{entidade}] [WP] Mídia: {len(items)} arquivos, {len(documents)} relevantes "
+        f"(antigos={ignored_old}, irrelevantes={ignored_irrelevant})"
+    )
+
+    return documents
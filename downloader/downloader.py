@@ -10,8 +10,11 @@ from pathlib import Path
 from urllib.parse import urlparse, unquote
 from datetime import datetime
 from config import FILES_DIR
+from storage.archive import archive_output_dir
 from config import MIN_YEAR
 from storage.writer import store
+from storage.blobs import CHUNK_SIZE, iter_chunks, write_blob
+from downloader.http_client import record_transfer
 
 
 def sha256(b: bytes) -> str:
@@ -57,11 +60,31 @@ def download(
         return
     
     # =========================================================
-    # OBTENÇÃO DO CONTEÚDO
+    # NOME ORIGINAL
+    # =========================================================
+    parsed = urlparse(url)
+
+    if parsed.scheme == "browser":
+        original = sanitize(parsed.path)
+    else:
+        original = sanitize(Path(unquote(parsed.path)).name)
+
+    # replay: arquivos vão para a saída do replay, não para data/files
+    output_dir = archive_output_dir()
+    files_dir = output_dir / "files" if output_dir else FILES_DIR
+
+    base_dir = files_dir
+
+    if entidade:
+        safe_entidade = sanitize(entidade)
+        base_dir = files_dir / safe_entidade
+
+    # =========================================================
+    # OBTENÇÃO DO CONTEÚDO (STREAM → BLOB STORE, HASH INCREMENTAL)
     # =========================================================
     if content_override is not None:
         # conteúdo vindo do Playwright
-        content = content_override
+        blob = write_blob(iter_chunks(content_override), base_dir, original)
 
     else:
         if session is None:
@@ -73,18 +96,21 @@ def download(
         for attempt in range(3):
             try:
                 try:
-                    r = session.get(url, timeout=40)
+                    r = session.get(url, timeout=40, stream=True)
                 except SSLError:
                     # 🔥 PATCH: retry automático sem verificação SSL
-                    r = session.get(url, timeout=40, verify=False)
+                    r = session.get(url, timeout=40, stream=True, verify=False)
+
+                with r:
+                    r.raise_for_status()
+                    blob = write_blob(r.iter_content(CHUNK_SIZE), base_dir, original)
 
-                r.raise_for_status()
-                content = r.content
+                record_transfer(url, "http")
                 break
 
             except requests.HTTPError as e:
                 last_exc = e
-                status = e.response.status_code if e.response else None
+                status = e.response.status_code if e.response is not None else None
 
                 # erros comuns em sites institucionais
                 if status in (404, 403):
@@ -109,44 +135,27 @@ def download(
     # =========================================================
     # DEDUPE POR HASH
     # =========================================================
-    h = sha256(content)
-    if h in state.hashes:
+    # checagem + registro atômicos: dois workers com o mesmo conteúdo
+    # não gravam o arquivo duas vezes
+    h = blob.sha256
+    if not state.save_hash(h):
+        blob.discard()
         return
 
-    # =========================================================
-    # NOME ORIGINAL
-    # =========================================================
-    parsed = urlparse(url)
-
-    if parsed.scheme == "browser":
-        original = sanitize(parsed.path)
-    else:
-        original = sanitize(Path(unquote(parsed.path)).name)
-
-    base_dir = FILES_DIR
-
-    if entidade:
-        safe_entidade = sanitize(entidade)
-        base_dir = FILES_DIR / safe_entidade
-
-    base_dir.mkdir(parents=True, exist_ok=True)
-
-    filename = f"{h}__{original}"
-    dest = base_dir / filename
+    filename = blob.path.name
+    dest = blob.path
     print(f"[DOWNLOADER] arquivo gravado -> {dest.resolve()}")
-    dest.write_bytes(content)
 
     # =========================================================
     # PERSISTÊNCIA DE ESTADO
     # =========================================================
-    state.save_hash(h)
     state.save_visited_file(url)
 
     store(
     entidade=entidade,
     source_page=source_page,
     kind="pdf",
-    content=content,
+    content=dest,
     meta={
         "filename": filename,
         "original_name": original,
@@ -156,7 +165,6 @@ def download(
         "anchor_text": anchor_text,
         "detected_year": detected_year,
         "downloaded_at": datetime.utcnow().isoformat(),
-        "size_bytes": len(content),
+        "size_bytes": blob.size,
     },
 )
-
@@ -0,0 +1,144 @@
+'''
+cliente HTTP compartilhado (pool de conexões) usado pelo crawler HTML,
+pelo browser fallback e pelos downloads concorrentes
+'''
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HEADERS
+from storage.archive import ArchiveAdapter, get_archive
+
+
+# downloads simultâneos de documentos achados pelo browser
+DOWNLOAD_CONCURRENCY = 4
+
+# conexões mantidas abertas por host
+POOL_MAXSIZE = 16
+
+
+_session = None
+_session_lock = threading.Lock()
+
+# url -> quantas vezes o documento atravessou a rede (deve ser sempre 1)
+_transfers = {}
+_transfers_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+
+            # record/replay: o adapter grava ou responde do arquivo de rede
+            archive = get_archive()
+            if archive is not None:
+                adapter = ArchiveAdapter(
+                    archive, pool_connections=32, pool_maxsize=POOL_MAXSIZE
+                )
+            else:
+                adapter = HTTPAdapter(pool_connections=32, pool_maxsize=POOL_MAXSIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+
+        return _session
+
+
+def sync_browser_context(context, session: requests.Session):
+    """
+    Copia cookies e User-Agent do BrowserContext para a session, para que
+    documentos achados no browser possam ser baixados direto via HTTP.
+    """
+    apply_browser_cookies(context.cookies(), session)
+
+    for page in context.pages:
+        try:
+            ua = page.evaluate("() => navigator.userAgent")
+        except Exception:
+            continue
+
+        # headless denuncia o bot; o UA padrão do config segue valendo
+        if ua and "Headless" not in ua:
+            session.headers["User-Agent"] = ua
+        break
+
+
+def apply_browser_cookies(cookies: list[dict], session: requests.Session):
+    """
+    Cookies no formato do playwright (context.cookies()) -> session.
+    """
+    for c in cookies:
+        session.cookies.set(
+            c["name"],
+            c["value"],
+            domain=c.get("domain", ""),
+            path=c.get("path", "/"),
+            secure=c.get("secure", False),
+        )
+
+
+def download_many(jobs: list[dict], downloader, session, logger=None, workers=DOWNLOAD_CONCURRENCY):
+    """
+    Roda `downloader(session=session, **job)` para cada job em paralelo.
+    Cada job tem os mesmos kwargs do downloader (url, state, source_page...).
+    """
+    if not jobs:
+        return
+
+    def run(job):
+        try:
+            downloader(session=session, **job)
+        except Exception as e:
+            if logger:
+                logger.error(f"[HTTP] Falha ao baixar {job.get('url')}: {e}")
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+        list(ex.map(run, jobs))
+
+
+# =========================================================
+# CONTADOR DE TRANSFERÊNCIAS (PROVA DE "UMA VEZ SÓ")
+# =========================================================
+def record_transfer(url: str, origin: str):
+    """
+    Registra que o corpo de um documento foi transferido pela rede
+    (origin: "http" = downloader, "browser_route" = interceptação).
+    """
+    with _transfers_lock:
+        counts = _transfers.setdefault(url, {})
+        counts[origin] = counts.get(origin, 0) + 1
+
+
+def transfer_summary() -> dict:
+    with _transfers_lock:
+        totals = [sum(c.values()) for c in _transfers.values()]
+        by_origin = {}
+        for c in _transfers.values():
+            for origin, n in c.items():
+                by_origin[origin] = by_origin.get(origin, 0) + n
+
+    return {
+        "documents": len(totals),
+        "transfers": sum(totals),
+        "duplicated": sum(1 for t in totals if t > 1),
+        "by_origin": by_origin,
+    }
+
+
+def log_transfer_summary(logger):
+    summary = transfer_summary()
+    if not summary["documents"]:
+        return
+
+    log = logger.warning if summary["duplicated"] else logger.info
+    log(
+        f"[TRANSFERS] documentos={summary['documents']} "
+        f"transferências={summary['transfers']} "
+        f"duplicadas={summary['duplicated']} "
+        f"por_origem={summary['by_origin']}"
+    )
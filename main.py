@@ -1,19 +1,34 @@
-import requests
 from pathlib import Path
 from urllib.parse import urlparse
 
-from config import HEADERS
 from logger import setup_logger
 from state.state import State
+from state.strategy_memory import save_strategy_memory
+from state.endpoint_registry import save_endpoint_registry
+from state.page_cache import save_page_cache
 
 from discovery.crawler import crawl
 from discovery.evaluator import should_escalate, should_try_sitemap
+from discovery.page_ranking import rank_browser_pages
 from discovery.browser_fallback import crawl_browser
-from discovery.sitemap import discover_sitemap_urls, filter_sitemap_urls
+from discovery.browser_fallback_async import crawl_browser_async
+from discovery.sitemap import iter_sitemap_entries, filter_sitemap_urls
 from discovery.domain_guard import get_base_domain
+from browser.pool import shutdown_browser_pools
+from browser.pool_async import shutdown_async_engine
+from browser.budget import log_budget_summary
+from browser.settle import log_settle_summary
 
 from downloader.downloader import download
+from downloader.http_client import get_http_session, log_transfer_summary
 from storage.index import append_index
+from storage.archive import (
+    archive_mode,
+    archive_state_dir,
+    begin_archive_entity,
+    close_archive,
+)
+from config import BROWSER_ENGINE, INCREMENTAL_CRAWL
 
 
 # ==================================================
@@ -30,6 +45,37 @@ def is_html_page(url: str) -> bool:
     return not url.lower().endswith(NON_HTML_EXTS)
 
 
+def browser_crawler_for(cfg: dict):
+    """
+    crawl_browser (sync) ou crawl_browser_async, mesma assinatura.
+    """
+    if cfg.get("browser_engine", BROWSER_ENGINE) == "async":
+        return crawl_browser_async
+    return crawl_browser
+
+
+def save_browser_yield(state, entidade: str, hashes_before: int):
+    """
+    Rendimento do browser fallback, lido pelo evaluator na próxima execução:
+    tudo o que o browser gravou de novo (hash inédito no State): documentos
+    via HTTP / interceptação / evento de download e PNG / CSV / tabelas.
+    Jobs enfileirados e conteúdo reencontrado não contam.
+    """
+    state.save_browser_yield(entidade, len(state.hashes) - hashes_before)
+
+
+def sitemap_entries_for(cfg: dict, session, logger) -> list:
+    """
+    Entradas (url, lastmod) do sitemap do seed, já filtradas.
+    """
+    # streaming: só as entradas que passam no filtro ficam em memória
+    return filter_sitemap_urls(
+        iter_sitemap_entries(cfg["seed"], logger, session=session),
+        seed_base_domain=get_base_domain(cfg["seed"]),
+        allowed_paths=cfg.get("allowed_paths", [])
+    )
+
+
 def filter_pages_for_seed(pages: list[str], seed_url: str) -> list[str]:
     seed_host = urlparse(seed_url).hostname or ""
     return [
@@ -55,159 +101,175 @@ SEEDS = [
 
 def main():
     logger = setup_logger(Path("data/logs"))
-    state = State(Path("data"))
-
-    session = requests.Session()
-    session.headers.update(HEADERS)
-
-    for cfg in SEEDS:
-        if not isinstance(cfg, dict):
-            logger.error(f"Seed inválido: {cfg}")
-            continue
-
-        entidade = cfg.get("entidade", "DESCONHECIDA")
-        seed_url = cfg["seed"]
-        mode = cfg.get("mode")
-
-        logger.info("=" * 60)
-        logger.info(f"Iniciando entidade: {entidade}")
-        logger.info(f"Seed: {seed_url}")
-
-        # ==================================================
-        # 🚨 POWER BI MODE (FORÇADO)
-        # ==================================================
-        if mode == "powerbi":
-            logger.warning(
-                f"[{entidade}] Seed marcada como POWER BI. "
-                f"Pulando HTML crawler e indo direto para browser."
-            )
 
-            crawl_browser(
-                seed_cfg=cfg,
-                state=state,
-                pages=[seed_url],
-                downloader=download,
-                storage=append_index,
-                logger=logger
-            )
-            continue
-
-        # ==================================================
-        # 1️⃣ HTML FIRST
-        # ==================================================
-        stats = crawl(
-            session=session,
-            seed_cfg=cfg,
-            state=state,
-            downloader=download,
-            storage=append_index,
-            logger=logger
-        )
-
-        # ==================================================
-        # 1️⃣.5 SITEMAP (APENAS DESCOBERTA)
-        # ==================================================
-        if should_try_sitemap(stats):
-            logger.warning(f"[{entidade}] HTML fraco. Tentando sitemap.")
-
-            seed_base = get_base_domain(seed_url)
-
-            sitemap_urls = discover_sitemap_urls(seed_url, logger)
-            sitemap_urls = filter_sitemap_urls(
-                sitemap_urls,
-                seed_base_domain=seed_base,
-                allowed_paths=cfg.get("allowed_paths", [])
-            )
+    # replay: State próprio do arquivo (o real já "lembra" as URLs gravadas)
+    state = State(archive_state_dir() or Path("data"))
+
+    if archive_mode() != "off":
+        logger.warning(f"[ARCHIVE] Modo {archive_mode()}")
 
-            # 🔥 FILTRO CRÍTICO: sitemap só fornece HTML
-            sitemap_urls = [u for u in sitemap_urls if is_html_page(u)]
+    # mesmo cliente (pool de conexões) do browser fallback
+    session = get_http_session()
+
+    try:
+        for cfg in SEEDS:
+            if not isinstance(cfg, dict):
+                logger.error(f"Seed inválido: {cfg}")
+                continue
 
-            new_pages = [
-                u for u in sitemap_urls
-                if u not in state.visited_pages
-            ]
+            entidade = cfg.get("entidade", "DESCONHECIDA")
+            seed_url = cfg["seed"]
+            mode = cfg.get("mode")
 
-            if new_pages:
+            begin_archive_entity(entidade)
+
+            logger.info("=" * 60)
+            logger.info(f"Iniciando entidade: {entidade}")
+            logger.info(f"Seed: {seed_url}")
+
+            # ==================================================
+            # 🚨 POWER BI MODE (FORÇADO)
+            # ==================================================
+            if mode == "powerbi":
                 logger.warning(
-                    f"[{entidade}] Sitemap adicionou {len(new_pages)} novas páginas."
+                    f"[{entidade}] Seed marcada como POWER BI. "
+                    f"Pulando HTML crawler e indo direto para browser."
                 )
 
-                for u in new_pages:
-                    state.visited_pages.add(u)
-
-                stats = crawl(
-                    session=session,
+                hashes_before = len(state.hashes)
+                browser_crawler_for(cfg)(
                     seed_cfg=cfg,
                     state=state,
+                    pages=[seed_url],
                     downloader=download,
                     storage=append_index,
                     logger=logger
                 )
-            else:
-                logger.info(f"[{entidade}] Sitemap não trouxe páginas úteis.")
+                save_browser_yield(state, entidade, hashes_before)
+                continue
 
-        # ==================================================
-        # 2️⃣ BROWSER FALLBACK (EXECUÇÃO REAL)
-        # ==================================================
-        if should_escalate(stats):
             # ==================================================
-            # 🎯 PÁGINAS PARA BROWSER FALLBACK (ORDEM IMPORTA)
+            # 1️⃣ HTML FIRST
             # ==================================================
+            # incremental: o lastmod do sitemap decide o que nem precisa de GET
+            incremental = cfg.get("incremental", INCREMENTAL_CRAWL)
+            sitemap_entries = None
+            if incremental:
+                sitemap_entries = sitemap_entries_for(cfg, session, logger)
+
+            stats = crawl(
+                session=session,
+                seed_cfg=cfg,
+                state=state,
+                downloader=download,
+                storage=append_index,
+                logger=logger,
+                lastmods={e.url: e.lastmod for e in sitemap_entries or () if e.lastmod},
+            )
 
-            seed = seed_url
-
-            # 1️⃣ sempre começar pela seed
-            pages = [seed]
+            # ==================================================
+            # 1️⃣.5 SITEMAP (APENAS DESCOBERTA)
+            # ==================================================
+            if should_try_sitemap(stats):
+                logger.warning(f"[{entidade}] HTML fraco. Tentando sitemap.")
+
+                if sitemap_entries is None:
+                    sitemap_entries = sitemap_entries_for(cfg, session, logger)
+
+                # 🔥 FILTRO CRÍTICO: sitemap só fornece HTML
+                sitemap_urls = [e.url for e in sitemap_entries if is_html_page(e.url)]
+
+                # páginas que o crawl ainda não visitou (incremental: nesta
+                # execução; senão, em qualquer execução anterior)
+                visited = stats["crawled_pages"] if incremental else state.visited_pages
+                new_pages = [u for u in sitemap_urls if u not in visited]
+
+                if new_pages:
+                    logger.warning(
+                        f"[{entidade}] Sitemap adicionou {len(new_pages)} novas páginas."
+                    )
+
+                    # mesma fila / mesmo loop do crawl HTML, a partir das
+                    # páginas do sitemap; stats somam às da primeira fase
+                    stats = crawl(
+                        session=session,
+                        seed_cfg=cfg,
+                        state=state,
+                        downloader=download,
+                        storage=append_index,
+                        logger=logger,
+                        lastmods={e.url: e.lastmod for e in sitemap_entries if e.lastmod},
+                        frontier=[(u, 1) for u in new_pages],
+                        stats=stats,
+                    )
+                else:
+                    logger.info(f"[{entidade}] Sitemap não trouxe páginas úteis.")
 
-            # 2️⃣ páginas HTML visitadas que estejam no mesmo escopo
-            anchor = cfg.get("seed_anchor_path")
+            # ==================================================
+            # 2️⃣ BROWSER FALLBACK (EXECUÇÃO REAL)
+            # ==================================================
+            if should_escalate(
+                stats,
+                last_browser=state.get_browser_yield(entidade),
+                logger=logger,
+            ):
+                # ==================================================
+                # 🎯 PÁGINAS PARA BROWSER FALLBACK (RANKING)
+                # ==================================================
+                # seed primeiro; o resto (HTML do mesmo host) ordenado pelos
+                # sinais do crawl HTML. O corte (browser_max_pages /
+                # browser_time_budget_sec) fica com o crawl_browser.
+                candidates = filter_pages_for_seed(
+                    [p for p in state.visited_pages if is_html_page(p)],
+                    seed_url,
+                )
 
-            derived_pages = [
-                p for p in state.visited_pages
-                if p != seed
-                and is_html_page(p)
-                and (
-                    not anchor
-                    or urlparse(p).path.startswith(anchor)
+                pages = rank_browser_pages(
+                    cfg,
+                    candidates,
+                    stats["page_signals"],
+                    logger,
                 )
-            ]
-
-            # 3️⃣ sitemap / resto entra só depois
-            fallback_pages = [
-                p for p in state.visited_pages
-                if p not in pages
-                and p not in derived_pages
-                and is_html_page(p)
-            ]
-
-            pages.extend(derived_pages)
-            pages.extend(fallback_pages)
-
-            logger.warning(
-                f"[{entidade}] HTML insuficiente "
-                f"(pages={stats['visited_pages']}, pdfs={stats['found_pdfs']}). "
-                f"Usando browser fallback com {len(pages)} páginas."
-            )
 
-            if not pages:
                 logger.warning(
-                    f"[{entidade}] Nenhuma página HTML válida para fallback."
+                    f"[{entidade}] HTML insuficiente "
+                    f"(pages={stats['visited_pages']}, pdfs={stats['found_pdfs']}). "
+                    f"Usando browser fallback com {len(pages)} páginas."
                 )
-                continue
 
-            crawl_browser(
-                seed_cfg=cfg,
-                state=state,
-                pages=pages,
-                downloader=download,
-                storage=append_index,
-                logger=logger
-            )
-        else:
-            logger.info(
-                f"[{entidade}] HTML crawler suficiente "
-                f"(pdfs={stats['found_pdfs']})."
-            )
+                if not pages:
+                    logger.warning(
+                        f"[{entidade}] Nenhuma página HTML válida para fallback."
+                    )
+                    continue
+
+                hashes_before = len(state.hashes)
+                browser_crawler_for(cfg)(
+                    seed_cfg=cfg,
+                    state=state,
+                    pages=pages,
+                    downloader=download,
+                    storage=append_index,
+                    logger=logger
+                )
+                save_browser_yield(state, entidade, hashes_before)
+            else:
+                logger.info(
+                    f"[{entidade}] HTML crawler suficiente "
+                    f"(pdfs={stats['found_pdfs']})."
+                )
+    finally:
+        # 🧹 Chromium é compartilhado entre entidades: fecha uma vez só
+        shutdown_browser_pools(logger)
+        shutdown_async_engine(logger)
+        # HARs do Playwright são escritos no context.close() (acima)
+        close_archive(logger)
+        save_strategy_memory(logger)
+        save_endpoint_registry(logger)
+        save_page_cache(logger)
+        log_settle_summary(logger)
+        log_budget_summary(logger)
+        log_transfer_summary(logger)
 
     logger.info("Scraper finalizado para todas as entidades.")
 
@@ -0,0 +1,156 @@
+'''
+registro de endpoints XHR/JSON por dominio: chamadas que o browser viu
+trazendo URLs de documentos. O crawl() HTML repete essas chamadas via
+HTTP nas execucoes seguintes; o browser so volta quando o replay para
+de render.
+'''
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+
+from config import DATA_DIR
+from storage.archive import archive_state_dir
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+ENDPOINT_REGISTRY_FILE = "endpoint_registry.json"
+
+# replays seguidos sem documento até o endpoint sair do registro
+MAX_REPLAY_MISSES = 3
+
+# headers da requisição original que o replay reenvia
+# (cookies/autorização ficam de fora: vêm da session)
+REPLAY_HEADERS = (
+    "accept",
+    "content-type",
+    "x-requested-with",
+    "referer",
+    "origin",
+)
+
+
+def _domain(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def _key(method: str, url: str, body: str | None) -> str:
+    return f"{method.upper()} {url}" + (f" {body}" if body else "")
+
+
+class EndpointRegistry:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    # =========================================================
+    # API pública
+    # =========================================================
+    def record(self, method, url, headers: dict, body, docs: int, source_page: str):
+        """
+        Chamada vista no browser que trouxe `docs` URLs de documentos.
+        """
+        kept = {
+            k.lower(): v for k, v in (headers or {}).items()
+            if k.lower() in REPLAY_HEADERS
+        }
+
+        with self._lock:
+            endpoints = self._data.setdefault(_domain(source_page), {})
+            endpoints[_key(method, url, body)] = {
+                "method": method.upper(),
+                "url": url,
+                "headers": kept,
+                "body": body,
+                "source_page": source_page,
+                "docs": docs,
+                "misses": 0,
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self._dirty = True
+
+    def endpoints_for(self, url: str) -> list[dict]:
+        with self._lock:
+            return [dict(e) for e in self._data.get(_domain(url), {}).values()]
+
+    def replayed(self, endpoint: dict, docs: int) -> bool:
+        """
+        Resultado de um replay HTTP. False = endpoint descartado
+        (parou de render; o browser volta a ser necessário).
+        """
+        key = _key(endpoint["method"], endpoint["url"], endpoint.get("body"))
+
+        with self._lock:
+            endpoints = self._data.get(_domain(endpoint["source_page"]), {})
+            entry = endpoints.get(key)
+            if entry is None:
+                return False
+
+            self._dirty = True
+
+            if docs:
+                entry["docs"] = docs
+                entry["misses"] = 0
+                return True
+
+            entry["misses"] += 1
+            if entry["misses"] >= MAX_REPLAY_MISSES:
+                del endpoints[key]
+                return False
+
+            return True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(
+                json.dumps(self._data, ensure_ascii=False, indent=1),
+                encoding="utf-8",
+            )
+            tmp.replace(self.path)
+            self._dirty = False
+
+
+# =========================================================
+# INSTÂNCIA DO PROCESSO
+# =========================================================
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_endpoint_registry() -> EndpointRegistry:
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            base = archive_state_dir() or DATA_DIR
+            base.mkdir(parents=True, exist_ok=True)
+            _registry = EndpointRegistry(base / ENDPOINT_REGISTRY_FILE)
+        return _registry
+
+
+def save_endpoint_registry(logger=None):
+    with _registry_lock:
+        registry = _registry
+
+    if registry is None:
+        return
+
+    registry.save()
+    if logger:
+        logger.info(f"[XHR] Registro de endpoints salvo em {registry.path}")
@@ -0,0 +1,159 @@
+'''
+cache de paginas HTML para o re-crawl incremental: validadores HTTP
+(ETag / Last-Modified), lastmod do sitemap, hash do conteudo e o grafo
+de links de saida de cada pagina. Pagina inalterada nao e re-parseada:
+o crawler reaproveita os links e sinais guardados aqui.
+'''
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import DATA_DIR
+from storage.archive import archive_state_dir
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+PAGE_CACHE_FILE = "page_cache.json"
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+class PageCache:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    # =========================================================
+    # API pública
+    # =========================================================
+    def get(self, url: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(url)
+            return dict(entry) if entry else None
+
+    def conditional_headers(self, url: str) -> dict:
+        """
+        If-None-Match / If-Modified-Since para o GET condicional (304).
+        """
+        entry = self.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def unchanged_by_lastmod(self, url: str, lastmod: str | None) -> bool:
+        """
+        lastmod do sitemap igual ao da última visita = nem precisa de GET.
+        """
+        if not lastmod:
+            return False
+        entry = self.get(url)
+        return bool(entry and entry.get("sitemap_lastmod") == lastmod)
+
+    def store(
+        self,
+        url: str,
+        *,
+        response_headers,
+        body_hash: str,
+        links: list[str],
+        signals: dict,
+        years: list[int],
+        documents: list[tuple] = (),
+        xhr_endpoints: list[str] = (),
+        sitemap_lastmod: str | None = None,
+        wp_api: str | None = None,
+    ):
+        """
+        Página re-parseada: validadores, hash, links de saída, sinais e
+        documentos achados [(url, rótulo, ano)] — documento que ainda não
+        entrou no registro é tentado de novo mesmo com a página inalterada.
+        """
+        with self._lock:
+            self._data[url] = {
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+                "sitemap_lastmod": sitemap_lastmod,
+                "hash": body_hash,
+                "links": links,
+                "signals": signals,
+                "years": years,
+                "documents": [list(d) for d in documents],
+                "xhr_endpoints": list(xhr_endpoints),
+                "wp_api": wp_api,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self._dirty = True
+
+    def touch(self, url: str, sitemap_lastmod: str | None = None):
+        """
+        Página confirmada inalterada (304 / mesmo hash / mesmo lastmod).
+        """
+        with self._lock:
+            entry = self._data.get(url)
+            if entry is None:
+                return
+            if sitemap_lastmod:
+                entry["sitemap_lastmod"] = sitemap_lastmod
+            entry["checked_at"] = datetime.now(timezone.utc).isoformat()
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(
+                json.dumps(self._data, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            tmp.replace(self.path)
+            self._dirty = False
+
+
+# =========================================================
+# INSTÂNCIA DO PROCESSO
+# =========================================================
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            base = archive_state_dir() or DATA_DIR
+            base.mkdir(parents=True, exist_ok=True)
+            _cache = PageCache(base / PAGE_CACHE_FILE)
+        return _cache
+
+
+def save_page_cache(logger=None):
+    with _cache_lock:
+        cache = _cache
+
+    if cache is None:
+        return
+
+    cache.save()
+    if logger:
+        logger.info(f"[INCREMENTAL] Cache de páginas salvo em {cache.path}")
@@ -2,6 +2,9 @@
 modulo que basicamente é a memoria do sistema,
 tudo que ele "lembra" é por causa desse arquivo
 '''
+import json
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
@@ -13,6 +16,7 @@ class State:
         self.hashes_path = data_dir / "hashes.txt"
         self.failed_path = data_dir / "failed.txt"
         self.queue_path = data_dir / "queue.txt"
+        self.browser_yield_path = data_dir / "browser_yield.json"
 
         # memória global (compatibilidade)
         self.visited_pages = self._load(self.visited_pages_path)
@@ -21,8 +25,14 @@ class State:
         self.failed = self._load(self.failed_path)
         self.queue = self._load(self.queue_path)
 
+        # rendimento do último browser fallback por entidade (evaluator)
+        self.browser_yield = self._load_json(self.browser_yield_path)
+
         self.visited_pages_by_entity: dict[str, set[str]] = {}
 
+        # o browser fallback grava a partir de vários workers
+        self._lock = threading.Lock()
+
     # =========================================================
     # helpers internos
     # =========================================================
@@ -31,42 +41,72 @@ class State:
             return set()
         return set(path.read_text(encoding="utf-8").splitlines())
 
-    def _append(self, path: Path, value: str):
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(value + "\n")
+    def _load_json(self, path: Path) -> dict:
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            return {}
+
+    def _add(self, values: set[str], path: Path, value: str) -> bool:
+        """
+        Checa e grava sob o lock (download_many chama de várias threads).
+        True = valor novo.
+        """
+        with self._lock:
+            if value in values:
+                return False
+            values.add(value)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(value + "\n")
+            return True
 
     # =========================================================
     # API pública
     # =========================================================
     def save_visited_page(self, url: str, entidade: Optional[str] = None):
         # memória global (como antes)
-        if url not in self.visited_pages:
-            self.visited_pages.add(url)
-            self._append(self.visited_pages_path, url)
+        self._add(self.visited_pages, self.visited_pages_path, url)
 
         # memória por entidade
         if entidade:
             self.visited_pages_by_entity.setdefault(entidade, set()).add(url)
 
-    def save_visited_file(self, url: str):
-        if url not in self.visited_files:
-            self.visited_files.add(url)
-            self._append(self.visited_files_path, url)
+    def save_visited_file(self, url: str) -> bool:
+        return self._add(self.visited_files, self.visited_files_path, url)
 
-    def save_hash(self, h: str):
-        if h not in self.hashes:
-            self.hashes.add(h)
-            self._append(self.hashes_path, h)
+    def save_hash(self, h: str) -> bool:
+        """
+        False = outro download já registrou o mesmo conteúdo.
+        """
+        return self._add(self.hashes, self.hashes_path, h)
 
-    def save_failed(self, url: str):
-        if url not in self.failed:
-            self.failed.add(url)
-            self._append(self.failed_path, url)
+    def save_failed(self, url: str) -> bool:
+        return self._add(self.failed, self.failed_path, url)
 
     def save_queue(self, queue: list[str]):
         self.queue = set(queue)
         self.queue_path.write_text("\n".join(queue), encoding="utf-8")
 
+    def get_browser_yield(self, entidade: str) -> Optional[dict]:
+        """
+        {"docs", "at"} do último browser fallback da entidade
+        (docs = itens novos gravados, deduplicados por hash).
+        """
+        return self.browser_yield.get(entidade)
+
+    def save_browser_yield(self, entidade: str, docs: int):
+        with self._lock:
+            self.browser_yield[entidade] = {
+                "docs": docs,
+                "at": datetime.now(timezone.utc).isoformat(),
+            }
+            self.browser_yield_path.write_text(
+                json.dumps(self.browser_yield, ensure_ascii=False, indent=1),
+                encoding="utf-8",
+            )
+
     # =========================================================
     # helpers novos (uso no browser fallback)
     # =========================================================
@@ -0,0 +1,217 @@
+'''
+memoria de estrategias: por dominio + template de caminho, quais
+estrategias do router ja renderam documentos e quanto custaram.
+O router usa isso para tentar primeiro a vencedora e pular as que
+nunca renderam, refazendo a cadeia completa de tempos em tempos.
+'''
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlparse
+
+from config import DATA_DIR
+from storage.archive import archive_state_dir
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+STRATEGY_MEMORY_FILE = "strategy_memory.json"
+
+# tentativas sem nenhum item até a estratégia ser pulada
+MIN_ATTEMPTS_TO_SKIP = 3
+
+# a cada N páginas do template, roda a cadeia completa de novo
+REPROBE_EVERY_PAGES = 20
+
+# rendimento da página abaixo desta fração da média = re-sonda
+YIELD_DROP_RATIO = 0.25
+
+# peso da página nova na média móvel de itens por página
+YIELD_EMA_ALPHA = 0.3
+
+
+_SEGMENT_NUMERIC = re.compile(r"^\d+$")
+_SEGMENT_ID = re.compile(r"^(?=.*\d)[\w-]{16,}$")
+
+
+def path_template(url: str) -> tuple[str, str]:
+    """
+    (domínio, template): segmentos numéricos/ids viram placeholders.
+    /transparencia/2023/balancete-123.pdf -> /transparencia/:n/:file
+    """
+    p = urlparse(url)
+    segments = []
+
+    for seg in p.path.strip("/").split("/"):
+        if not seg:
+            continue
+        if _SEGMENT_NUMERIC.match(seg):
+            segments.append(":n")
+        elif _SEGMENT_ID.match(seg):
+            segments.append(":id")
+        elif "." in seg:
+            segments.append(":file")
+        else:
+            segments.append(seg.lower())
+
+    return p.netloc.lower(), "/" + "/".join(segments)
+
+
+@dataclass
+class StrategyPlan:
+    """
+    `order`: estratégias na ordem a tentar; `skip`: não tentar.
+    `full_probe`: cadeia completa (sem memória ou re-sondagem).
+    """
+    order: list = field(default_factory=list)
+    skip: set = field(default_factory=set)
+    full_probe: bool = True
+
+    def allows(self, strategy: str) -> bool:
+        return strategy not in self.skip
+
+
+class StrategyMemory:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _entry(self, url: str) -> dict:
+        domain, template = path_template(url)
+        return (
+            self._data
+            .setdefault(domain, {})
+            .setdefault(template, {
+                "pages": 0,
+                "since_probe": 0,
+                "yield_avg": 0.0,
+                "reprobe": False,
+                "strategies": {},
+            })
+        )
+
+    # =========================================================
+    # API pública
+    # =========================================================
+    def plan(self, url: str, chain: list[str]) -> StrategyPlan:
+        """
+        Ordem/pulos para `chain` (a ordem padrão do router).
+        """
+        with self._lock:
+            entry = self._entry(url)
+            stats = entry["strategies"]
+
+            if (
+                not stats
+                or entry["reprobe"]
+                or entry["since_probe"] >= REPROBE_EVERY_PAGES
+            ):
+                return StrategyPlan(order=list(chain), full_probe=True)
+
+            def hit_rate(name):
+                s = stats.get(name)
+                return s["hits"] / s["attempts"] if s and s["attempts"] else 0.0
+
+            # vencedoras primeiro; empate mantém a ordem padrão
+            order = sorted(chain, key=lambda name: -hit_rate(name))
+
+            skip = {
+                name for name in chain
+                if (s := stats.get(name))
+                and s["attempts"] >= MIN_ATTEMPTS_TO_SKIP
+                and s["hits"] == 0
+            }
+
+            return StrategyPlan(order=order, skip=skip, full_probe=False)
+
+    def record(self, url: str, strategy: str, items: int, elapsed_ms: int):
+        with self._lock:
+            s = self._entry(url)["strategies"].setdefault(
+                strategy,
+                {"attempts": 0, "hits": 0, "items": 0, "ms": 0},
+            )
+            s["attempts"] += 1
+            s["hits"] += 1 if items else 0
+            s["items"] += items
+            s["ms"] += elapsed_ms
+            self._dirty = True
+
+    def end_page(self, url: str, plan: StrategyPlan, items: int):
+        """
+        Fecha a página: atualiza a média de rendimento e decide se a
+        próxima página do template precisa da cadeia completa.
+        """
+        with self._lock:
+            entry = self._entry(url)
+            entry["pages"] += 1
+
+            if plan.full_probe:
+                entry["since_probe"] = 0
+                entry["reprobe"] = False
+            else:
+                entry["since_probe"] += 1
+                # rendeu bem menos que o normal: o layout pode ter mudado
+                if items < entry["yield_avg"] * YIELD_DROP_RATIO:
+                    entry["reprobe"] = True
+
+            entry["yield_avg"] = (
+                YIELD_EMA_ALPHA * items
+                + (1 - YIELD_EMA_ALPHA) * entry["yield_avg"]
+            )
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(
+                json.dumps(self._data, ensure_ascii=False, indent=1),
+                encoding="utf-8",
+            )
+            tmp.replace(self.path)
+            self._dirty = False
+
+
+# =========================================================
+# INSTÂNCIA DO PROCESSO
+# =========================================================
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_strategy_memory() -> StrategyMemory:
+    global _memory
+
+    with _memory_lock:
+        if _memory is None:
+            # replay: memória isolada junto do estado da execução gravada
+            base = archive_state_dir() or DATA_DIR
+            base.mkdir(parents=True, exist_ok=True)
+            _memory = StrategyMemory(base / STRATEGY_MEMORY_FILE)
+        return _memory
+
+
+def save_strategy_memory(logger=None):
+    with _memory_lock:
+        memory = _memory
+
+    if memory is None:
+        return
+
+    memory.save()
+    if logger:
+        logger.info(f"[STRATEGY] Memória de estratégias salva em {memory.path}")
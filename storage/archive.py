@@ -0,0 +1,431 @@
+'''
+arquivo de rede por execução e entidade (gravar / reproduzir):
+
+  record -> toda troca HTTP (session requests + Playwright) é gravada
+  replay -> crawl() e crawl_browser() são servidos do disco, sem rede
+
+layout: data/archive/{run}/{entidade}/
+  http.har.gz        índice HAR 1.2 das trocas da session (e documentos
+                     interceptados no browser)
+  bodies/<sha>.gz    corpos, um arquivo por conteúdo
+  browser-*.har.zip  HAR do Playwright (um por BrowserContext)
+  replay/            estado e saída do replay (recriado a cada replay)
+'''
+import gzip
+import hashlib
+import io
+import json
+import re
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from requests import ConnectionError as RequestsConnectionError
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from config import ARCHIVE_DIR, ARCHIVE_MODE, ARCHIVE_RUN
+
+
+# cabeçalhos que não valem para o corpo já decodificado
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w\-.]+", "_", name)[:100]
+
+
+def _headers_list(headers) -> list[dict]:
+    return [{"name": k, "value": v} for k, v in headers.items()]
+
+
+# =========================================================
+# ARQUIVO DE UMA EXECUÇÃO
+# =========================================================
+class NetworkArchive:
+    def __init__(self, mode: str, run: str | None = None):
+        self.mode = mode
+        self.run = run or self._default_run()
+        self.run_dir = ARCHIVE_DIR / self.run
+
+        self.entidade = None
+        self._entries = []                 # record: entradas da entidade atual
+        self._index = {}                   # replay: (method, url) -> [entry, ...]
+        self._served = {}                  # replay: (method, url) -> próximo índice
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._replay_dir = None
+        self._replay_dir_lock = threading.Lock()
+
+    def _default_run(self) -> str:
+        if self.mode == "record":
+            return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+        # replay sem run explícito: a gravação mais recente
+        runs = sorted(p.name for p in ARCHIVE_DIR.glob("*") if p.is_dir())
+        if not runs:
+            raise RuntimeError(f"Nenhum arquivo de rede em {ARCHIVE_DIR}")
+        return runs[-1]
+
+    @property
+    def entity_dir(self):
+        return self.dir_for(self.entidade or "_")
+
+    def dir_for(self, entidade: str):
+        return self.run_dir / _safe_name(entidade)
+
+    def replay_dir(self):
+        """
+        Raiz do replay, apagada e recriada uma vez por processo: cada
+        replay da mesma gravação parte do zero (reprodutível).
+        """
+        with self._replay_dir_lock:
+            if self._replay_dir is None:
+                path = self.run_dir / "replay"
+                shutil.rmtree(path, ignore_errors=True)
+                # layout antigo (estado persistente entre replays)
+                shutil.rmtree(self.run_dir / "replay_state", ignore_errors=True)
+                path.mkdir(parents=True)
+                self._replay_dir = path
+            return self._replay_dir
+
+    def state_dir(self):
+        """
+        Replay usa um State próprio: o State real já "lembra" tudo.
+        """
+        path = self.replay_dir() / "state"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def output_dir(self):
+        """
+        Arquivos baixados / índice do replay: fora da árvore data/ real.
+        """
+        path = self.replay_dir() / "output"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    # -----------------------------------------------------
+    # ENTIDADE ATUAL
+    # -----------------------------------------------------
+    def begin_entity(self, entidade: str):
+        self.flush()
+
+        with self._lock:
+            self.entidade = entidade
+            self._entries = []
+            self._index = {}
+            self._served = {}
+
+        if self.mode == "replay":
+            self._load_index()
+
+    def flush(self):
+        if self.mode != "record":
+            return
+
+        with self._lock:
+            entries, self._entries = self._entries, []
+
+        if not entries or self.entidade is None:
+            return
+
+        har = {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "web-scrapper-efpc", "version": "1"},
+                "entries": entries,
+            }
+        }
+
+        path = self.entity_dir / "http.har.gz"
+
+        # entidade repetida na mesma execução: soma às entradas anteriores
+        if path.exists():
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                har["log"]["entries"] = json.load(f)["log"]["entries"] + entries
+
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(har, f)
+
+    def _load_index(self):
+        path = self.entity_dir / "http.har.gz"
+        if not path.exists():
+            return
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entries = json.load(f)["log"]["entries"]
+
+        with self._lock:
+            for entry in entries:
+                key = (entry["request"]["method"], entry["request"]["url"])
+                self._index.setdefault(key, []).append(entry)
+
+    # -----------------------------------------------------
+    # GRAVAÇÃO
+    # -----------------------------------------------------
+    def record(self, method, url, status, reason, req_headers, resp_headers, body, elapsed_ms=0):
+        body = body or b""
+        sha = hashlib.sha256(body).hexdigest()
+
+        bodies = self.entity_dir / "bodies"
+        bodies.mkdir(parents=True, exist_ok=True)
+
+        body_path = bodies / f"{sha}.gz"
+        if not body_path.exists():
+            tmp = bodies / f".{uuid.uuid4().hex}.part"
+            with gzip.open(tmp, "wb") as f:
+                f.write(body)
+            tmp.replace(body_path)
+
+        entry = {
+            "startedDateTime": datetime.now(timezone.utc).isoformat(),
+            "time": elapsed_ms,
+            "request": {
+                "method": method,
+                "url": url,
+                "headers": _headers_list(req_headers or {}),
+            },
+            "response": {
+                "status": status,
+                "statusText": reason or "",
+                "headers": _headers_list(resp_headers or {}),
+                "content": {
+                    "size": len(body),
+                    "mimeType": (resp_headers or {}).get("content-type", ""),
+                    "_file": body_path.name,
+                },
+            },
+        }
+
+        with self._lock:
+            self._entries.append(entry)
+
+    # -----------------------------------------------------
+    # REPRODUÇÃO
+    # -----------------------------------------------------
+    def lookup(self, method, url):
+        """
+        (status, reason, headers, body) gravados para o request, ou None.
+        Gravações repetidas da mesma URL são servidas em ordem.
+        """
+        key = (method, url)
+
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+
+            i = self._served.get(key, 0)
+            self._served[key] = i + 1
+            entry = entries[min(i, len(entries) - 1)]
+
+        response = entry["response"]
+        body_path = self.entity_dir / "bodies" / response["content"]["_file"]
+
+        with gzip.open(body_path, "rb") as f:
+            body = f.read()
+
+        headers = {
+            h["name"]: h["value"]
+            for h in response["headers"]
+            if h["name"].lower() not in DROPPED_HEADERS
+        }
+
+        return response["status"], response["statusText"], headers, body
+
+    # -----------------------------------------------------
+    # PLAYWRIGHT
+    # -----------------------------------------------------
+    def browser_hars(self, entidade: str) -> list:
+        return sorted(self.dir_for(entidade).glob("browser-*.har.zip"))
+
+    def new_browser_har(self, entidade: str):
+        path = self.dir_for(entidade)
+        path.mkdir(parents=True, exist_ok=True)
+        return path / f"browser-{uuid.uuid4().hex[:8]}.har.zip"
+
+
+# =========================================================
+# ADAPTER DA SESSION (requests)
+# =========================================================
+class ArchiveAdapter(HTTPAdapter):
+    """
+    HTTPAdapter que grava (record) ou responde do disco (replay).
+    Redirects continuam com a Session: cada salto é uma troca gravada.
+    """
+
+    def __init__(self, archive: NetworkArchive, **kwargs):
+        self.archive = archive
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        if self.archive.mode == "replay":
+            return self._replay(request)
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        # lê o corpo (decodificado) uma vez; iter_content serve da memória
+        self.archive.record(
+            request.method,
+            request.url,
+            response.status_code,
+            response.reason,
+            request.headers,
+            response.headers,
+            response.content,
+            elapsed_ms=int(response.elapsed.total_seconds() * 1000),
+        )
+        return response
+
+    def _replay(self, request):
+        hit = self.archive.lookup(request.method, request.url)
+        if hit is None:
+            raise RequestsConnectionError(
+                f"[ARCHIVE] não arquivado: {request.method} {request.url}",
+                request=request,
+            )
+
+        status, reason, headers, body = hit
+
+        response = Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.raw = io.BytesIO(body)
+        response._content = body
+        response._content_consumed = True
+        return response
+
+
+# =========================================================
+# API DO MÓDULO
+# =========================================================
+def get_archive() -> NetworkArchive | None:
+    """
+    Arquivo da execução atual (None com EFPC_ARCHIVE_MODE=off).
+    """
+    global _archive
+
+    if ARCHIVE_MODE not in ("record", "replay"):
+        return None
+
+    with _archive_lock:
+        if _archive is None:
+            _archive = NetworkArchive(ARCHIVE_MODE, ARCHIVE_RUN)
+        return _archive
+
+
+def archive_mode() -> str:
+    archive = get_archive()
+    return archive.mode if archive else "off"
+
+
+def begin_archive_entity(entidade: str):
+    archive = get_archive()
+    if archive:
+        archive.begin_entity(entidade)
+
+
+def record_exchange(method, url, status, headers, body):
+    """
+    Grava uma troca feita fora da session (ex: route.fetch do interceptador).
+    """
+    archive = get_archive()
+    if archive and archive.mode == "record":
+        archive.record(method, url, status, "", {}, headers, body)
+
+
+def replay_exchange(method, url):
+    archive = get_archive()
+    if archive and archive.mode == "replay":
+        return archive.lookup(method, url)
+    return None
+
+
+def install_browser_archive(context, entidade: str):
+    """
+    record: o contexto grava um HAR próprio (escrito no context.close()).
+    replay: serve dos HARs da entidade; o que não foi gravado é abortado.
+    """
+    archive = get_archive()
+    if archive is None:
+        return
+
+    if archive.mode == "record":
+        context.route_from_har(
+            archive.new_browser_har(entidade),
+            update=True,
+            update_content="attach",
+            update_mode="full",
+        )
+        return
+
+    # rotas registradas depois têm prioridade: o abort fica por último
+    context.route("**/*", lambda route: route.abort("internetdisconnected"))
+    for har in archive.browser_hars(entidade):
+        context.route_from_har(har, not_found="fallback")
+
+
+async def install_browser_archive_async(context, entidade: str):
+    archive = get_archive()
+    if archive is None:
+        return
+
+    if archive.mode == "record":
+        await context.route_from_har(
+            archive.new_browser_har(entidade),
+            update=True,
+            update_content="attach",
+            update_mode="full",
+        )
+        return
+
+    async def offline(route):
+        await route.abort("internetdisconnected")
+
+    await context.route("**/*", offline)
+    for har in archive.browser_hars(entidade):
+        await context.route_from_har(har, not_found="fallback")
+
+
+def archive_state_dir():
+    archive = get_archive()
+    if archive and archive.mode == "replay":
+        return archive.state_dir()
+    return None
+
+
+def archive_output_dir():
+    """
+    Raiz da saída (files/, entidades, index.jsonl) no replay; None fora dele.
+    """
+    archive = get_archive()
+    if archive and archive.mode == "replay":
+        return archive.output_dir()
+    return None
+
+
+def close_archive(logger=None):
+    archive = get_archive()
+    if archive is None:
+        return
+
+    archive.flush()
+
+    if logger:
+        logger.info(
+            f"[ARCHIVE] {archive.mode} concluído: {archive.run_dir}"
+            + (f" (não arquivados: {archive.misses})" if archive.mode == "replay" else "")
+        )
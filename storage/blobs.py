@@ -0,0 +1,67 @@
+'''
+modulo do blob store: grava documentos em disco em pedaços,
+calculando o sha256 enquanto escreve (sem segurar o arquivo inteiro)
+'''
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class Blob:
+    path: Path
+    sha256: str
+    size: int
+    created: bool
+
+    def discard(self):
+        """
+        Remove o arquivo se foi este write que o criou.
+        """
+        if self.created:
+            self.path.unlink(missing_ok=True)
+
+
+def iter_chunks(content: bytes, size: int = CHUNK_SIZE):
+    view = memoryview(content)
+    for i in range(0, len(view), size):
+        yield view[i:i + size]
+
+
+def write_blob(chunks, dest_dir: Path, original_name: str) -> Blob:
+    """
+    Escreve os chunks num arquivo temporário, hash incremental,
+    e renomeia para `<sha256>__<original_name>` no fim.
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+
+    tmp = dest_dir / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    h = digest.hexdigest()
+    final = dest_dir / f"{h}__{original_name}"
+
+    if final.exists():
+        tmp.unlink(missing_ok=True)
+        return Blob(path=final, sha256=h, size=size, created=False)
+
+    os.replace(tmp, final)
+    return Blob(path=final, sha256=h, size=size, created=True)
@@ -5,10 +5,15 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from storage.archive import archive_output_dir
+
 INDEX_PATH = Path("data/index.jsonl")
 
 def append_index(meta: dict):
     meta["indexed_at"] = datetime.utcnow().isoformat()
 
-    with open(INDEX_PATH, "a", encoding="utf-8") as f:
+    output_dir = archive_output_dir()
+    path = output_dir / INDEX_PATH.name if output_dir else INDEX_PATH
+
+    with open(path, "a", encoding="utf-8") as f:
         f.write(json.dumps(meta, ensure_ascii=False) + "\n")
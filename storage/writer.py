@@ -1,6 +1,8 @@
+import shutil
 from pathlib import Path
 from datetime import datetime
 from storage.index import append_index
+from storage.archive import archive_output_dir
 
 
 BASE_DIR = Path("data")
@@ -11,13 +13,14 @@ def store(
     entidade: str,
     source_page: str,
     kind: str,                 # "pdf" | "table" | "csv" | "png"
-    content,
+    content,                   # bytes / objeto JSON (pdf/png aceitam Path)
     meta: dict | None = None
 ):
     meta = meta or {}
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
 
-    entidade_dir = BASE_DIR / entidade
+    # replay: saída isolada dentro do arquivo da execução
+    entidade_dir = (archive_output_dir() or BASE_DIR) / entidade
     entidade_dir.mkdir(parents=True, exist_ok=True)
 
     # =====================================================
@@ -30,8 +33,12 @@ def store(
         fname = meta.get("filename") or f"{ts}.pdf"
         path = out_dir / fname
 
-        with open(path, "wb") as f:
-            f.write(content)
+        # content pode ser o arquivo já gravado no blob store
+        if isinstance(content, Path):
+            shutil.copyfile(content, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(content)
 
         append_index({
             "entidade": entidade,
@@ -94,8 +101,12 @@ def store(
         fname = meta.get("filename") or f"{ts}.png"
         path = out_dir / fname
 
-        with open(path, "wb") as f:
-            f.write(content)
+        # content pode ser o PNG temporário do stitcher
+        if isinstance(content, Path):
+            shutil.move(content, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(content)
 
         append_index({
             "entidade": entidade,
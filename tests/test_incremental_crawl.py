@@ -0,0 +1,203 @@
+import logging
+
+import pytest
+
+import discovery.crawler as crawler
+from state.page_cache import PageCache, content_hash
+from state.state import State
+
+
+SEED = "https://x.org/transparencia/"
+CHILD = "https://x.org/transparencia/planos/"
+DOC = "https://x.org/wp-content/uploads/2024/relatorio-2024.pdf"
+
+SEED_HTML = f"""
+<html><body>
+<script>fetch("/api/docs");</script>
+<div class="lista-documentos"></div>
+<a href="{DOC}">Relatório 2024</a>
+<a href="{CHILD}">Planos</a>
+</body></html>
+""".encode()
+
+CHILD_HTML = b"<html><body><p>sem documentos</p></body></html>"
+
+logger = logging.getLogger("test")
+
+
+# =========================================================
+# STUBS
+# =========================================================
+class StubResponse:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.content = body
+        self.text = body.decode()
+        self.headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+
+
+class StubSession:
+    """
+    `mode`: "fresh" (200 com corpo), "304" ou "same" (200, mesmo corpo).
+    """
+
+    def __init__(self, mode="fresh"):
+        self.mode = mode
+        self.gets = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.gets.append((url, headers))
+        if self.mode == "304":
+            return StubResponse(304)
+        body = SEED_HTML if url == SEED else CHILD_HTML
+        return StubResponse(200, body, {"ETag": f'"{content_hash(body)}"'})
+
+
+class StubDownloader:
+    """
+    Não grava nada: simula download que falhou (fora do registro).
+    """
+
+    def __init__(self):
+        self.urls = []
+
+    def __call__(self, **job):
+        self.urls.append(job["url"])
+
+
+class NoEndpoints:
+    def endpoints_for(self, url):
+        return []
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PageCache(tmp_path / "page_cache.json")
+    monkeypatch.setattr(crawler, "get_page_cache", lambda: cache)
+    monkeypatch.setattr(crawler, "get_endpoint_registry", lambda: NoEndpoints())
+    monkeypatch.setattr(crawler, "REQUEST_DELAY", 0)
+    return cache
+
+
+@pytest.fixture
+def state(tmp_path):
+    return State(tmp_path)
+
+
+def _crawl(session, state, downloader, lastmods=None):
+    seed_cfg = {
+        "entidade": "TESTE",
+        "seed": SEED,
+        "incremental": True,
+        "wordpress_media": False,
+    }
+    return crawler.crawl(
+        session, seed_cfg, state, downloader, None, logger, lastmods=lastmods
+    )
+
+
+# =========================================================
+# PAGE CACHE
+# =========================================================
+def _store(cache, url, **kw):
+    cache.store(
+        url,
+        response_headers=kw.pop("headers", {}),
+        body_hash=kw.pop("body_hash", "h"),
+        links=kw.pop("links", []),
+        signals=kw.pop("signals", {}),
+        years=kw.pop("years", []),
+        **kw,
+    )
+
+
+def test_conditional_headers(tmp_path):
+    cache = PageCache(tmp_path / "c.json")
+    assert cache.conditional_headers(SEED) == {}
+
+    _store(cache, SEED, headers={"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024"})
+    assert cache.conditional_headers(SEED) == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 01 Jan 2024",
+    }
+
+
+def test_unchanged_by_lastmod(tmp_path):
+    cache = PageCache(tmp_path / "c.json")
+    assert not cache.unchanged_by_lastmod(SEED, "2024-05-01")
+
+    _store(cache, SEED, sitemap_lastmod="2024-05-01")
+    assert cache.unchanged_by_lastmod(SEED, "2024-05-01")
+    assert not cache.unchanged_by_lastmod(SEED, "2024-06-01")
+    assert not cache.unchanged_by_lastmod(SEED, None)
+
+
+# =========================================================
+# CRAWLER: RAMO "PÁGINA SEM MUDANÇA"
+# =========================================================
+@pytest.mark.parametrize("mode", ["304", "same"])
+def test_unchanged_page_reuses_links_and_signals(cache, state, mode):
+    first = _crawl(StubSession(), state, StubDownloader())
+    assert first["unchanged_pages"] == 0
+
+    session = StubSession(mode)
+    stats = _crawl(session, state, StubDownloader())
+
+    # GET condicional com o ETag guardado
+    assert session.gets[0] == (SEED, {"If-None-Match": f'"{content_hash(SEED_HTML)}"'})
+
+    # links do cache: a página filha é visitada sem re-parse da seed
+    assert stats["crawled_pages"] == {SEED, CHILD}
+    assert stats["unchanged_pages"] == 2
+
+    # mesmos sinais de JS da primeira execução
+    assert stats["js_signals"]
+    assert stats["scripts"] == first["scripts"]
+    assert stats["empty_containers"] == first["empty_containers"]
+    assert stats["xhr_endpoints"] == first["xhr_endpoints"]
+
+
+def test_unchanged_page_retries_unregistered_document(cache, state):
+    _crawl(StubSession(), state, StubDownloader())
+
+    downloader = StubDownloader()
+    stats = _crawl(StubSession("304"), state, downloader)
+
+    assert downloader.urls == [DOC]
+    assert stats["new_docs"] == 1
+
+
+def test_unchanged_page_skips_registered_document(cache, state):
+    _crawl(StubSession(), state, StubDownloader())
+    state.save_visited_file(DOC)
+
+    downloader = StubDownloader()
+    stats = _crawl(StubSession("304"), state, downloader)
+
+    assert downloader.urls == []
+    assert stats["known_docs"] == 1
+
+
+def test_lastmod_match_skips_the_request(cache, state):
+    lastmods = {SEED: "2024-05-01"}
+    _crawl(StubSession(), state, StubDownloader(), lastmods)
+
+    session = StubSession()
+    stats = _crawl(session, state, StubDownloader(), lastmods)
+
+    assert SEED not in [url for url, _ in session.gets]
+    assert stats["unchanged_pages"] == 2
+
+
+def test_old_cache_entry_without_documents(cache, state):
+    _crawl(StubSession(), state, StubDownloader())
+    del cache._data[SEED]["documents"]
+
+    downloader = StubDownloader()
+    stats = _crawl(StubSession("304"), state, downloader)
+
+    # contagem antiga: documentos da página tratados como conhecidos
+    assert downloader.urls == []
+    assert stats["found_pdfs"] == 1
+    assert stats["known_docs"] == 1
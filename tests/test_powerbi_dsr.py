@@ -0,0 +1,33 @@
+from browser.strategies.powerbi_dsr import merge_tables
+
+
+def _window(rows, complete):
+    return {"columns": ["Ano", "Valor"], "rows": rows, "complete": complete}
+
+
+def test_merge_keeps_duplicate_rows_inside_window():
+    merged = merge_tables([
+        _window([[2023, 10], [2023, 10], [2024, 5]], False),
+        _window([[2025, 7]], True),
+    ])
+
+    assert merged[0]["rows"] == [[2023, 10], [2023, 10], [2024, 5], [2025, 7]]
+    assert merged[0]["complete"]
+
+
+def test_merge_drops_header_and_boundary_overlap():
+    merged = merge_tables([
+        _window([[2023, 10], [2024, 5]], False),
+        _window([["Ano", "Valor"], [2024, 5], [2025, 7], [2025, 7]], True),
+    ])
+
+    assert merged[0]["rows"] == [[2023, 10], [2024, 5], [2025, 7], [2025, 7]]
+
+
+def test_merge_separates_complete_tables():
+    merged = merge_tables([
+        _window([[2023, 10]], True),
+        _window([[2023, 10]], True),
+    ])
+
+    assert len(merged) == 2
@@ -0,0 +1,85 @@
+from bs4 import BeautifulSoup
+
+from discovery.script_payloads import (
+    DOC_URL_REGEX,
+    extract_json_documents,
+    extract_script_documents,
+)
+
+
+def test_doc_url_keeps_query_string():
+    assert DOC_URL_REGEX.findall("'/uploads/relatorio.pdf?ver=2&t=abc'") == [
+        "/uploads/relatorio.pdf?ver=2&t=abc"
+    ]
+
+
+def test_doc_url_query_stops_at_fragment_and_delimiters():
+    assert DOC_URL_REGEX.findall("veja /r.pdf?v=1#page=2, /s.pdf?v=3;") == [
+        "/r.pdf?v=1",
+        "/s.pdf?v=3",
+    ]
+
+
+def test_doc_url_extension_inside_query():
+    assert DOC_URL_REGEX.findall('"/download.php?arquivo.pdf&token=9"') == [
+        "/download.php?arquivo.pdf&token=9"
+    ]
+
+
+def test_doc_url_without_query_unchanged():
+    assert DOC_URL_REGEX.findall('["/a/b.pdf", "/a/c.pdfx"]') == ["/a/b.pdf"]
+
+
+def test_json_documents_keep_query_string():
+    data = {"files": [{"title": "Política 2024", "url": "https:\\/\\/x.org\\/p.pdf?v=2"}]}
+
+    assert extract_json_documents(data, "https://x.org/") == [
+        ("https://x.org/p.pdf?v=2", "Política 2024")
+    ]
+
+
+def test_script_documents_keep_query_string():
+    soup = BeautifulSoup(
+        "<script>var dados = {\"title\": \"Relatório\", "
+        "\"file\": \"\\/wp-content\\/uploads\\/r.pdf?ver=3\"};\n</script>",
+        "lxml",
+    )
+
+    assert extract_script_documents(soup, "https://x.org/pagina/") == [
+        ("https://x.org/wp-content/uploads/r.pdf?ver=3", "Relatório")
+    ]
+
+
+def test_doc_url_relative_path_kept_whole():
+    assert DOC_URL_REGEX.findall('"uploads/2024/a.pdf"') == ["uploads/2024/a.pdf"]
+    assert DOC_URL_REGEX.findall("uploads/2024/a.pdf") == ["uploads/2024/a.pdf"]
+
+
+def test_doc_url_relative_path_after_delimiter():
+    assert DOC_URL_REGEX.findall('["docs/a.pdf","../b/c.pdf"] file=d/e.pdf') == [
+        "docs/a.pdf",
+        "../b/c.pdf",
+        "d/e.pdf",
+    ]
+
+
+def test_data_attribute_relative_path_resolves_against_page():
+    soup = BeautifulSoup(
+        '<a data-file="docs/balancete-2024.pdf">Balancete</a>',
+        "lxml",
+    )
+
+    assert extract_script_documents(soup, "https://x.org/transparencia/") == [
+        ("https://x.org/transparencia/docs/balancete-2024.pdf", "Balancete")
+    ]
+
+
+def test_script_literal_relative_path_resolves_against_page():
+    soup = BeautifulSoup(
+        "<script>initViewer('uploads/2024/a.pdf');</script>",
+        "lxml",
+    )
+
+    assert extract_script_documents(soup, "https://x.org/transparencia/") == [
+        ("https://x.org/transparencia/uploads/2024/a.pdf", "")
+    ]
@@ -0,0 +1,169 @@
+import gzip
+import logging
+
+import discovery.sitemap as sitemap
+from discovery.sitemap import SitemapEntry, iter_sitemap_entries
+
+
+BASE = "https://x.org"
+
+logger = logging.getLogger("test")
+
+
+def urlset(*locs) -> bytes:
+    body = "".join(
+        f"<url><loc>{loc}</loc><lastmod>2024-05-01</lastmod>"
+        f"<image:image><image:loc>{loc}.jpg</image:loc></image:image></url>"
+        for loc in locs
+    )
+    return (
+        '<?xml version="1.0"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+        'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+        f"{body}</urlset>"
+    ).encode()
+
+
+def index(*locs) -> bytes:
+    body = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return (
+        '<?xml version="1.0"?>'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{body}</sitemapindex>"
+    ).encode()
+
+
+# =========================================================
+# STUBS
+# =========================================================
+class StubResponse:
+    def __init__(self, status_code, body=b""):
+        self.status_code = status_code
+        self.content = body
+        self.text = body.decode("utf-8", "replace")
+
+    def iter_content(self, size):
+        for i in range(0, len(self.content), size):
+            yield self.content[i:i + size]
+
+    def close(self):
+        pass
+
+
+class StubSession:
+    def __init__(self, files: dict):
+        self.files = files
+        self.gets = []
+
+    def get(self, url, timeout=None, stream=False):
+        self.gets.append(url)
+        body = self.files.get(url)
+        return StubResponse(404) if body is None else StubResponse(200, body)
+
+
+def robots(*locs) -> bytes:
+    return "\n".join(["User-agent: *"] + [f"Sitemap: {loc}" for loc in locs]).encode()
+
+
+def _entries(session) -> list:
+    entries = iter_sitemap_entries(BASE + "/", logger, session=session)
+    return sorted(entries, key=lambda e: e.url)
+
+
+# =========================================================
+# PARSE
+# =========================================================
+def test_only_direct_url_locs_are_entries():
+    session = StubSession({
+        BASE + "/robots.txt": robots(BASE + "/s.xml"),
+        BASE + "/s.xml": urlset(BASE + "/a", BASE + "/b"),
+    })
+
+    assert _entries(session) == [
+        SitemapEntry(BASE + "/a", "2024-05-01"),
+        SitemapEntry(BASE + "/b", "2024-05-01"),
+    ]
+
+
+def test_gzip_sitemap_is_detected_by_magic():
+    session = StubSession({
+        BASE + "/robots.txt": robots(BASE + "/s.xml.gz"),
+        BASE + "/s.xml.gz": gzip.compress(urlset(BASE + "/a")),
+    })
+
+    assert [e.url for e in _entries(session)] == [BASE + "/a"]
+
+
+def test_nested_index_is_followed_up_to_max_depth(monkeypatch):
+    monkeypatch.setattr(sitemap, "MAX_INDEX_DEPTH", 1)
+    session = StubSession({
+        BASE + "/robots.txt": robots(BASE + "/index.xml"),
+        BASE + "/index.xml": index(BASE + "/child.xml", BASE + "/deep-index.xml"),
+        BASE + "/child.xml": urlset(BASE + "/a"),
+        BASE + "/deep-index.xml": index(BASE + "/too-deep.xml"),
+        BASE + "/too-deep.xml": urlset(BASE + "/z"),
+    })
+
+    assert [e.url for e in _entries(session)] == [BASE + "/a"]
+    assert BASE + "/too-deep.xml" not in session.gets
+
+
+def test_max_sitemaps_caps_fetched_files(monkeypatch):
+    monkeypatch.setattr(sitemap, "MAX_SITEMAPS", 3)
+    children = [f"{BASE}/c{i}.xml" for i in range(6)]
+    files = {
+        BASE + "/robots.txt": robots(BASE + "/index.xml"),
+        BASE + "/index.xml": index(*children),
+    }
+    files.update({c: urlset(c + "-page") for c in children})
+    session = StubSession(files)
+
+    assert len(_entries(session)) == 2
+    assert len([u for u in session.gets if u.endswith(".xml")]) == 3
+
+
+# =========================================================
+# RAÍZES SEM ROBOTS.TXT
+# =========================================================
+def test_without_robots_stops_at_first_root_that_parses():
+    session = StubSession({
+        BASE + "/sitemap.xml": urlset(BASE + "/a"),
+        BASE + "/wp-sitemap.xml": urlset(BASE + "/a"),
+    })
+
+    assert [e.url for e in _entries(session)] == [BASE + "/a"]
+    assert session.gets == [BASE + "/robots.txt", BASE + "/sitemap.xml"]
+
+
+def test_without_robots_falls_through_missing_and_broken_roots():
+    session = StubSession({
+        BASE + "/sitemap_index.xml": b"<html>not xml",
+        BASE + "/wp-sitemap.xml": urlset(BASE + "/a"),
+        BASE + "/sitemap-index.xml": urlset(BASE + "/b"),
+    })
+
+    assert [e.url for e in _entries(session)] == [BASE + "/a"]
+    assert BASE + "/sitemap-index.xml" not in session.gets
+
+
+# =========================================================
+# CONSUMIDOR PARA ANTES DO FIM
+# =========================================================
+def test_early_stop_does_not_submit_after_shutdown(monkeypatch):
+    failures = []
+    monkeypatch.setattr(
+        logger, "debug", lambda msg, *a, **kw: failures.append(msg)
+    )
+    children = [f"{BASE}/c{i}.xml" for i in range(50)]
+    files = {
+        BASE + "/robots.txt": robots(BASE + "/index.xml"),
+        BASE + "/index.xml": index(*children),
+    }
+    files.update({c: urlset(*(f"{c}-{j}" for j in range(20))) for c in children})
+
+    for _ in range(20):
+        entries = iter_sitemap_entries(BASE + "/", logger, session=StubSession(files))
+        next(entries)
+        entries.close()
+
+    assert not [f for f in failures if "schedule" in f]